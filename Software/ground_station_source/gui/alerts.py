@@ -0,0 +1,226 @@
+"""
+Alert rules evaluated on every packet
+
+Author: RSX
+
+Rules are read from a JSON file once and compiled into closures, so each
+packet only runs a field lookup and a comparison per rule. A rule raises
+after `samples` consecutive violations and clears only once the value is
+back past its threshold by `hysteresis`, so a value hovering on the limit
+doesn't flood the error log. Packet gaps are checked from a timer since
+no packet arrives to trigger them. Evaluation time is tracked per rule.
+"""
+from dataclasses import dataclass
+import json
+import math
+import time
+from protocol import HandlerStats
+
+DEFAULT_ALERT_FILE = "alert_rules.json"
+
+RULE_TYPES = ("below", "above", "outside", "stuck", "gap")
+
+@dataclass(frozen=True)
+class AlertRule:
+    name: str
+    type: str
+    field: str = None
+    threshold: float = None     # below / above
+    low: float = None           # outside
+    high: float = None
+    hysteresis: float = 0.0     # distance back past the threshold needed to clear
+    samples: int = 1            # consecutive violations needed to raise
+    seconds: float = None       # stuck / gap
+    states: tuple = None        # only evaluated while STATE is one of these
+
+@dataclass
+class AlertTransition:
+    rule: AlertRule
+    raised: bool
+    message: str
+
+def parse_alert_rules(entries):
+    rules = []
+    for entry in entries:
+        if entry.get("type") not in RULE_TYPES:
+            raise ValueError(f"Alert rule {entry.get('name')!r}: unknown type {entry.get('type')!r}")
+        if "states" in entry:
+            entry = dict(entry, states=tuple(entry["states"]))
+        try:
+            rule = AlertRule(**entry)
+        except TypeError as e:
+            raise ValueError(f"Alert rule {entry.get('name')!r}: {e}") from None
+        needs = {
+            "below": ("field", "threshold"),
+            "above": ("field", "threshold"),
+            "outside": ("field", "low", "high"),
+            "stuck": ("field", "seconds"),
+            "gap": ("seconds",),
+        }[rule.type]
+        missing = [name for name in needs if getattr(rule, name) is None]
+        if missing:
+            raise ValueError(f"Alert rule {rule.name!r}: missing {', '.join(missing)}")
+        rules.append(rule)
+    return rules
+
+def load_alert_rules(path=DEFAULT_ALERT_FILE):
+    with open(path, "r") as file:
+        return parse_alert_rules(json.load(file))
+
+# Field lookup: extra values (derived channels, estimates) first, then the packet
+def compile_getter(field, numeric):
+    def get(data, extra):
+        value = extra[field] if field in extra else getattr(data, field, None)
+        if not numeric or value is None:
+            return value
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+        return None if math.isnan(value) else value
+    return get
+
+# Predicates take (value, active) and return True while the rule is violated,
+# the active flag selects the clear threshold for hysteresis
+def compile_predicate(rule):
+    h = rule.hysteresis
+    if rule.type == "below":
+        on, off = rule.threshold, rule.threshold + h
+        return lambda v, active: v < (off if active else on)
+    if rule.type == "above":
+        on, off = rule.threshold, rule.threshold - h
+        return lambda v, active: v > (off if active else on)
+    if rule.type == "outside":
+        low, high = rule.low, rule.high
+        return lambda v, active: (v < low + h or v > high - h) if active else (v < low or v > high)
+    raise ValueError(rule.type)
+
+# Value unchanged for longer than rule.seconds
+class StuckCheck:
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.reset()
+
+    def reset(self):
+        self.value, self.since = None, None
+
+    def __call__(self, t, value):
+        if value != self.value or self.since is None:
+            self.value, self.since = value, t
+        return t - self.since > self.seconds
+
+class CompiledRule:
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.active = False
+        self.count = 0
+        self.value = None
+        if rule.type != "gap":
+            self.get = compile_getter(rule.field, numeric=rule.type != "stuck")
+        if rule.type == "stuck":
+            self.stuck = StuckCheck(rule.seconds)
+        elif rule.type != "gap":
+            self.predicate = compile_predicate(rule)
+
+    def reset(self):
+        self.active = False
+        self.count = 0
+        self.value = None
+        if self.rule.type == "stuck":
+            self.stuck.reset()
+
+    # Returns an AlertTransition when the rule raises or clears
+    def check(self, t, data, extra):
+        rule = self.rule
+        if rule.states is not None and getattr(data, "STATE", None) not in rule.states:
+            # The value has to stay put for the whole time again once the rule applies
+            if rule.type == "stuck":
+                self.stuck.reset()
+            return self.set(False)
+        value = self.get(data, extra)
+        if value is None:
+            return None
+        self.value = value
+        if rule.type == "stuck":
+            return self.set(self.stuck(t, value))
+        return self.set(self.predicate(value, self.active))
+
+    def set(self, violated):
+        if violated:
+            self.count += 1
+            if not self.active and self.count >= self.rule.samples:
+                self.active = True
+                return AlertTransition(self.rule, True, self.describe())
+        else:
+            self.count = 0
+            if self.active:
+                self.active = False
+                return AlertTransition(self.rule, False, f"{self.rule.name} cleared")
+        return None
+
+    def describe(self):
+        rule = self.rule
+        if rule.type == "below":
+            return f"{rule.name}: {rule.field} {self.value:g} < {rule.threshold:g}"
+        if rule.type == "above":
+            return f"{rule.name}: {rule.field} {self.value:g} > {rule.threshold:g}"
+        if rule.type == "outside":
+            return f"{rule.name}: {rule.field} {self.value:g} outside [{rule.low:g}, {rule.high:g}]"
+        if rule.type == "stuck":
+            return f"{rule.name}: {rule.field} stuck at {self.value} for {rule.seconds:g} s"
+        return f"{rule.name}: no packet for {self.value:.1f} s"
+
+class AlertEngine:
+
+    def __init__(self, rules=(), clock=time.monotonic):
+        self.clock = clock
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        self.rules = [CompiledRule(rule) for rule in rules]
+        self.__packet_rules = [r for r in self.rules if r.rule.type != "gap"]
+        self.__gap_rules = [r for r in self.rules if r.rule.type == "gap"]
+        self.stats = {}
+        self.__last_packet = None
+
+    def reset(self):
+        for compiled in self.rules:
+            compiled.reset()
+        self.__last_packet = None
+
+    @property
+    def active(self):
+        return [compiled for compiled in self.rules if compiled.active]
+
+    # One packet, t is mission time in seconds, extra is {name: value} for non packet channels
+    def evaluate(self, t, data, extra=None):
+        extra = extra or {}
+        self.__last_packet = self.clock()
+        transitions = []
+        for compiled in self.__packet_rules:
+            start = time.perf_counter()
+            transition = compiled.check(t, data, extra)
+            self.stats.setdefault(compiled.rule.name, HandlerStats()).add(time.perf_counter() - start)
+            if transition is not None:
+                transitions.append(transition)
+        transitions.extend(self.check_gaps())
+        return transitions
+
+    # Call periodically, packet gaps can't be seen from evaluate()
+    def check_gaps(self):
+        if self.__last_packet is None:
+            return []
+        gap = self.clock() - self.__last_packet
+        transitions = []
+        for compiled in self.__gap_rules:
+            compiled.value = gap
+            transition = compiled.set(gap > compiled.rule.seconds)
+            if transition is not None:
+                transitions.append(transition)
+        return transitions
+
+    def stats_summary(self):
+        return [f"{name}: n={stats.count} mean={1000.0 * stats.mean_ms:.1f} us max={1e6 * stats.max_s:.1f} us"
+                for name, stats in self.stats.items()]
@@ -0,0 +1,214 @@
+"""
+Ground-side altitude / vertical velocity estimator
+
+Author: RSX
+
+Kalman filter with state [altitude, vertical velocity, vertical accel, GPS
+altitude offset]. Barometric ALTITUDE and GPS_ALTITUDE (MSL, so it carries
+an offset to the calibrated baro altitude) are fused as altitude readings
+and the accelerometer as a vertical acceleration reading. Every packet is
+one predict and up to three scalar updates on a 4x4 covariance, so the cost
+per sample is constant. Readings whose innovation is far outside the
+expected spread are rejected instead of pulling the estimate.
+"""
+from dataclasses import dataclass
+import math
+import numpy as np
+
+GRAVITY = 9.80665
+
+# Logged / plotted like derived channels
+ESTIMATE_CHANNELS = ("KF_ALTITUDE", "KF_VELOCITY", "KF_LANDING_TIME")
+
+# altitude, velocity, acceleration, GPS offset
+INITIAL_VARIANCE = (100.0, 400.0, 100.0, 1e6)
+
+@dataclass(frozen=True)
+class EstimatorConfig:
+    jerk_noise: float = 20.0            # process noise on acceleration change, (m/s^3)^2 per s
+    offset_noise: float = 0.05          # GPS offset random walk, m^2 per s
+    baro_var: float = 1.0               # m^2
+    gps_var: float = 25.0               # m^2
+    accel_var: float = 4.0              # (m/s^2)^2
+    gate_sigma: float = 5.0             # reject readings further than this many std devs
+    max_baro_rejects: int = 3           # then re-acquire from the baro, the model is what's off
+    min_gps_sats: int = 4
+    apogee_min_alt: float = 10.0        # m, ignore bumps on the pad
+    apogee_drop: float = 2.0            # m below the peak before apogee is called
+    landing_min_rate: float = 0.5       # m/s descent needed to predict landing
+
+@dataclass(frozen=True)
+class AltitudeEstimate:
+    t: float
+    altitude: float
+    velocity: float
+    acceleration: float
+    landing_time: float     # predicted t of touchdown, nan if not descending
+    apogee_time: float      # nan until apogee is detected
+    apogee_altitude: float
+
+    def as_channels(self):
+        return {
+            "KF_ALTITUDE": float(self.altitude),
+            "KF_VELOCITY": float(self.velocity),
+            "KF_LANDING_TIME": float(self.landing_time),
+        }
+
+# Vertical specific force from the accelerometer magnitude: +g at rest, 0 in free fall,
+# so |a| - g is the vertical acceleration while the CanSat is roughly upright
+def vertical_accel(ax, ay, az):
+    return math.sqrt(ax * ax + ay * ay + az * az) - GRAVITY
+
+class AltitudeEstimator:
+
+    def __init__(self, config=EstimatorConfig()):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.x = [0.0, 0.0, 0.0, 0.0]
+        self.P = [[variance if i == j else 0.0 for j, variance in enumerate(INITIAL_VARIANCE)] for i in range(4)]
+        self.t = None
+        self.initialized = False
+        self.gps_initialized = False
+        self.peak_altitude = -math.inf
+        self.peak_time = math.nan
+        self.apogee_time = math.nan
+        self.apogee_altitude = math.nan
+        self.rejected = 0
+        self.baro_rejects = 0
+        self.__noise_dt = None
+
+    # Process noise over dt, rows of Q. Packets mostly come at a fixed interval, so the
+    # last one is kept.
+    def __noise(self, dt):
+        if dt != self.__noise_dt:
+            q = self.config.jerk_noise
+            dt2 = dt * dt
+            dt3 = dt2 * dt
+            self.__noise_dt = dt
+            self.__noise_rows = ((q * dt3 * dt2 / 20, q * dt2 * dt2 / 8, q * dt3 / 6, 0.0),
+                                 (q * dt2 * dt2 / 8, q * dt3 / 3, q * dt2 / 2, 0.0),
+                                 (q * dt3 / 6, q * dt2 / 2, q * dt, 0.0),
+                                 (0.0, 0.0, 0.0, self.config.offset_noise * dt))
+        return self.__noise_rows
+
+    # x = F x, P = F P F' + Q with F the constant-jerk kinematics. Plain floats, numpy's
+    # per-call overhead on 4x4 arrays is most of the cost when a whole log is replayed.
+    def __predict(self, dt):
+        half = 0.5 * dt * dt
+        x = self.x
+        self.x = [x[0] + dt * x[1] + half * x[2], x[1] + dt * x[2], x[2], x[3]]
+        p0, p1, p2, p3 = self.P
+        FP = ([a + dt * b + half * c for a, b, c in zip(p0, p1, p2)],
+              [b + dt * c for b, c in zip(p1, p2)],
+              p2, p3)
+        self.P = [[r[0] + dt * r[1] + half * r[2] + q[0], r[1] + dt * r[2] + q[1], r[2] + q[2], r[3] + q[3]]
+                  for r, q in zip(FP, self.__noise(dt))]
+
+    # Scalar measurement z = H x + noise(var), H given as the indices of the state entries
+    # the reading is the sum of (all its weights are 1)
+    def __update(self, H, z, var, gate=True):
+        P = self.P
+        PH = [row[H[0]] for row in P]
+        for index in H[1:]:
+            PH = [ph + row[index] for ph, row in zip(PH, P)]
+        innovation = z - sum(self.x[index] for index in H)
+        S = sum(PH[index] for index in H) + var
+        if gate and innovation * innovation > self.config.gate_sigma ** 2 * S:
+            self.rejected += 1
+            return False
+        K = [ph / S for ph in PH]
+        self.x = [x + k * innovation for x, k in zip(self.x, K)]
+        self.P = [[p - k * ph for p, ph in zip(row, PH)] for row, k in zip(P, K)]
+        return True
+
+    def update(self, t, altitude=None, gps_altitude=None, accel=None, gps_sats=None):
+        if not self.initialized:
+            if altitude is None or math.isnan(altitude):
+                return None
+            self.x[0] = altitude
+            self.t = t
+            self.initialized = True
+        elif t > self.t:
+            self.__predict(t - self.t)
+            self.t = t
+
+        if altitude is not None and not math.isnan(altitude):
+            gate = self.baro_rejects < self.config.max_baro_rejects
+            if not gate:
+                # Forget the kinematic state and take the next reading as is
+                offset_var = max(self.P[3][3], self.config.gps_var)
+                self.P = [[INITIAL_VARIANCE[i] if i == j else 0.0 for j in range(4)] for i in range(4)]
+                self.P[3][3] = offset_var
+            if self.__update((0,), altitude, self.config.baro_var, gate):
+                self.baro_rejects = 0
+            else:
+                self.baro_rejects += 1
+
+        gps_ok = gps_altitude is not None and not math.isnan(gps_altitude) and gps_altitude != 0.0
+        if gps_ok and (gps_sats is None or gps_sats >= self.config.min_gps_sats):
+            if not self.gps_initialized:
+                self.x[3] = gps_altitude - self.x[0]
+                self.P[3][3] = self.config.gps_var
+                self.gps_initialized = True
+            else:
+                self.__update((0, 3), gps_altitude, self.config.gps_var)
+
+        if accel is not None and not any(a is None or math.isnan(a) for a in accel):
+            self.__update((2,), vertical_accel(*accel), self.config.accel_var)
+
+        self.__detect_apogee()
+        return self.estimate()
+
+    def __detect_apogee(self):
+        altitude = self.x[0]
+        if altitude > self.peak_altitude:
+            self.peak_altitude, self.peak_time = altitude, self.t
+        if (math.isnan(self.apogee_time) and self.peak_altitude > self.config.apogee_min_alt
+                and self.x[1] < 0 and altitude < self.peak_altitude - self.config.apogee_drop):
+            self.apogee_time, self.apogee_altitude = self.peak_time, self.peak_altitude
+
+    @property
+    def apogee_detected(self):
+        return not math.isnan(self.apogee_time)
+
+    def estimate(self):
+        altitude, velocity, acceleration = self.x[0], self.x[1], self.x[2]
+        landing = math.nan
+        if velocity < -self.config.landing_min_rate and altitude > 0:
+            landing = self.t + altitude / -velocity
+        return AltitudeEstimate(self.t, altitude, velocity, acceleration, landing,
+                                self.apogee_time, self.apogee_altitude)
+
+# Replay a stored flight, returns {"altitude", "velocity", "acceleration", "landing_time"} arrays
+# and the detected apogee as (time, altitude)
+def estimate_batch(t, altitude, gps_altitude=None, accel=None, gps_sats=None, config=EstimatorConfig()):
+    t = np.asarray(t, dtype=float)
+    n = len(t)
+    altitude = np.asarray(altitude, dtype=float)
+    gps_altitude = np.full(n, np.nan) if gps_altitude is None else np.asarray(gps_altitude, dtype=float)
+    accel = np.full((n, 3), np.nan) if accel is None else np.asarray(accel, dtype=float)
+    gps_sats = np.full(n, np.nan) if gps_sats is None else np.asarray(gps_sats, dtype=float)
+
+    out = {name: np.full(n, np.nan) for name in ("altitude", "velocity", "acceleration", "landing_time")}
+    estimator = AltitudeEstimator(config)
+    # Lists so the filter works on floats, not numpy scalars
+    rows = zip(t.tolist(), altitude.tolist(), gps_altitude.tolist(), accel.tolist(), gps_sats.tolist())
+    for i, (time_s, alt, gps_alt, acc, sats) in enumerate(rows):
+        estimate = estimator.update(time_s, alt, gps_alt, acc, None if math.isnan(sats) else sats)
+        if estimate is None:
+            continue
+        out["altitude"][i] = estimate.altitude
+        out["velocity"][i] = estimate.velocity
+        out["acceleration"][i] = estimate.acceleration
+        out["landing_time"][i] = estimate.landing_time
+    return out, (estimator.apogee_time, estimator.apogee_altitude)
+
+# ESTIMATE_CHANNELS of a logged session, for files without them (onboard logs, backfilled packets)
+def estimate_columns(t, columns):
+    accel = None
+    if all(name in columns for name in ("ACCEL_R", "ACCEL_P", "ACCEL_Y")):
+        accel = np.column_stack([columns["ACCEL_R"], columns["ACCEL_P"], columns["ACCEL_Y"]])
+    out, _ = estimate_batch(t, columns["ALTITUDE"], columns.get("GPS_ALTITUDE"), accel, columns.get("GPS_SATS"))
+    return {"KF_ALTITUDE": out["altitude"], "KF_VELOCITY": out["velocity"], "KF_LANDING_TIME": out["landing_time"]}
@@ -0,0 +1,364 @@
+"""
+Post-flight mission analysis
+
+Author: RSX
+
+Loads logged sessions with the vectorized loader and prints a report per
+flight: time spent in each state, apogee, descent rate of every phase,
+packet loss and gaps, voltage sag and GPS drift. Apogee and phase rates
+use ALTITUDE through the same glitch filter as the GUI, run over the
+whole column by hampel_batch(). The statistics are whole-array NumPy
+operations and take about 60 ms for an hour at 10 Hz.
+
+Files without the Kalman estimates (onboard logs, older sessions) get them
+from estimate_batch(). That replays the filter sample by sample like the
+GUI and adds about 1.3 s per hour at 10 Hz.
+
+--plots renders the GUI's plots as PNGs without a display, with the same
+channels glitch filtered as in the GUI. Several sessions are analyzed in
+parallel processes. A single large file (an onboard log from GTLOGS, a
+long ground test) is parsed in chunks by all --jobs processes instead.
+
+    python analyze.py sessions/session_20260612_101500.csv --plots report/
+    python analyze.py sessions/ --jobs 8 --json > flights.json
+    python analyze.py cansat_logs.txt
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+import numpy as np
+from telemetry_loader import load_session, load_large, session_name, session_parts
+from session import session_files
+from derived_channels import haversine_m
+from glitch_filter import hampel_batch, DEFAULT_GLITCH_CONFIG
+from altitude_estimator import estimate_columns
+from graphs import GRAPH_INFO
+
+GAP_FACTOR = 3.0        # a gap is this many typical packet intervals without a packet
+MIN_GPS_SATS = 4
+VOLTAGE_BASELINE_PACKETS = 10
+LARGE_FILE_BYTES = 32 * 1024 * 1024     # parsed in chunks by a process pool from this size
+TRACK_TOLERANCE_M = 1.0     # ground track simplification, well under a pen width at export size
+
+# The GUI's time plot tabs, (title, unit, channels)
+TIME_PLOTS = [(entry["title"], entry["y_unit"], entry["channels"]) for entry in GRAPH_INFO if not entry["2d"]]
+PEN_COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 165, 0), (0, 255, 255), (255, 0, 255)]
+# Thinner than the GUI's pens: at export resolution they read the same and
+# wide pens cost seconds per dense plot in Qt's raster engine
+PEN_WIDTH = 1
+
+# Start and end (exclusive) of every run of equal values
+def runs(values):
+    if len(values) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    return np.concatenate([[0], change]), np.concatenate([change, [len(values)]])
+
+# Least squares slope of y over t for every run, NaN where fewer than 3 valid samples
+def run_slopes(t, y, starts, ends):
+    run = np.repeat(np.arange(len(starts)), ends - starts)
+    ok = ~np.isnan(y)
+    x = np.where(ok, t - t[starts][run], 0.0)
+    y = np.where(ok, y, 0.0)
+    n = np.bincount(run, weights=ok, minlength=len(starts))
+    sx = np.bincount(run, weights=x, minlength=len(starts))
+    sy = np.bincount(run, weights=y, minlength=len(starts))
+    sxx = np.bincount(run, weights=x * x, minlength=len(starts))
+    sxy = np.bincount(run, weights=x * y, minlength=len(starts))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    return np.where(n >= 3, slope, np.nan)
+
+def finite(value):
+    return None if value is None or math.isnan(value) else float(value)
+
+def phase_report(t, state, altitude):
+    starts, ends = runs(state)
+    # A phase lasts until the first packet of the next one
+    stop = np.append(t[starts[1:]], t[-1]) if len(starts) else np.empty(0)
+    durations = stop - t[starts]
+    rates = run_slopes(t, altitude, starts, ends) if altitude is not None else np.full(len(starts), np.nan)
+    phases = [{"state": str(state[s]), "start_s": float(t[s]), "duration_s": float(d), "packets": int(e - s),
+               "vertical_rate_mps": finite(r)} for s, e, d, r in zip(starts, ends, durations, rates)]
+    totals = {}
+    for phase in phases:
+        totals[phase["state"]] = totals.get(phase["state"], 0.0) + phase["duration_s"]
+    return phases, totals
+
+def apogee_report(t, session, altitude):
+    if not np.isfinite(altitude).any():
+        return None
+    i = int(np.nanargmax(altitude))
+    report = {"altitude_m": float(altitude[i]), "time_s": float(t[i])}
+    if "STATE" in session:
+        report["state"] = str(session["STATE"][i])
+    if "KF_ALTITUDE" in session and np.isfinite(session["KF_ALTITUDE"]).any():
+        report["kf_altitude_m"] = float(np.nanmax(session["KF_ALTITUDE"]))
+    return report
+
+def packet_report(t, packet_count):
+    ok = ~np.isnan(packet_count)
+    counts = packet_count[ok]
+    times = t[ok]
+    step = np.diff(counts)
+    missing = int(np.sum(step[step > 1] - 1))
+    report = {"received": int(len(counts)), "missing": missing, "duplicates_or_resets": int(np.sum(step <= 0)),
+              "loss_percent": 100.0 * missing / (missing + len(counts)) if len(counts) else 0.0, "gaps": []}
+    if len(times) > 2:
+        dt = np.diff(times)
+        typical = float(np.median(dt))
+        report["typical_interval_s"] = typical
+        gaps = np.flatnonzero(dt > max(GAP_FACTOR * typical, 1e-9))
+        # Longest first
+        for i in gaps[np.argsort(dt[gaps])[::-1]][:10]:
+            report["gaps"].append({"start_s": float(times[i]), "seconds": float(dt[i]),
+                                   "packets_missing": int(max(0, step[i] - 1))})
+        report["gap_count"] = int(len(gaps))
+    return report
+
+def voltage_report(t, session):
+    voltage = session["VOLTAGE"]
+    ok = np.flatnonzero(~np.isnan(voltage))
+    if len(ok) == 0:
+        return None
+    baseline = float(np.median(voltage[ok[:VOLTAGE_BASELINE_PACKETS]]))
+    i = ok[np.argmin(voltage[ok])]
+    report = {"baseline_v": baseline, "min_v": float(voltage[i]), "min_time_s": float(t[i]),
+              "sag_v": baseline - float(voltage[i]), "end_v": float(voltage[ok[-1]])}
+    if "STATE" in session:
+        report["min_state"] = str(session["STATE"][i])
+        states = session["STATE"][ok]
+        report["min_by_state"] = {str(state): float(np.min(voltage[ok][states == state]))
+                                  for state in dict.fromkeys(states)}
+    return report
+
+def gps_report(t, session, apogee_time):
+    lat, lon = session["GPS_LATITUDE"], session["GPS_LONGITUDE"]
+    fix = ~np.isnan(lat) & ~np.isnan(lon) & ~((lat == 0.0) & (lon == 0.0))
+    if "GPS_SATS" in session:
+        fix &= ~(session["GPS_SATS"] < MIN_GPS_SATS)
+    ok = np.flatnonzero(fix)
+    if len(ok) == 0:
+        return None
+    first, last = ok[0], ok[-1]
+    from_start = haversine_m(lat[first], lon[first], lat[ok], lon[ok])
+    report = {"fixes": int(len(ok)), "start": [float(lat[first]), float(lon[first])],
+              "end": [float(lat[last]), float(lon[last])], "drift_m": float(from_start[-1]),
+              "max_distance_m": float(np.max(from_start))}
+    if apogee_time is not None:
+        after = ok[t[ok] >= apogee_time]
+        if len(after):
+            report["descent_drift_m"] = float(haversine_m(lat[after[0]], lon[after[0]], lat[last], lon[last]))
+    return report
+
+# Kalman estimates for a session logged without them, as the GUI would have computed them
+def add_estimates(session):
+    if "ALTITUDE" in session and not ("KF_ALTITUDE" in session and np.isfinite(session["KF_ALTITUDE"]).any()):
+        session.columns.update(estimate_columns(session.t, session.columns))
+
+def analyze(session):
+    t = session.t
+    report = {"session": session.name, "files": session.paths, "packets": len(session),
+              "duration_s": float(t[-1] - t[0]) if len(t) else 0.0, "messages": len(session.messages)}
+    if not len(t):
+        return report
+    altitude = None
+    if "ALTITUDE" in session:
+        altitude, glitches = hampel_batch(t, session["ALTITUDE"], DEFAULT_GLITCH_CONFIG["ALTITUDE"])
+        report["altitude_glitches"] = int(np.sum(glitches))
+    if "STATE" in session:
+        report["phases"], report["state_durations_s"] = phase_report(t, session["STATE"], altitude)
+    if altitude is not None:
+        report["apogee"] = apogee_report(t, session, altitude)
+    if "PACKET_COUNT" in session:
+        report["packets_report"] = packet_report(t, session["PACKET_COUNT"])
+    if "VOLTAGE" in session:
+        report["voltage"] = voltage_report(t, session)
+    if "GPS_LATITUDE" in session and "GPS_LONGITUDE" in session:
+        apogee = report.get("apogee")
+        report["gps"] = gps_report(t, session, apogee["time_s"] if apogee else None)
+    return report
+
+# ------ PLOTS ------ #
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+# Min and max of every bucket of samples, so hours of data draw as fast as a screen
+# width of it and spikes survive. All-NaN buckets stay NaN and still draw as gaps.
+def peak_decimate(t, y, buckets):
+    if len(y) <= 2 * buckets:
+        return t, y
+    edges = np.linspace(0, len(y), buckets, endpoint=False).astype(int)
+    low = np.fmin.reduceat(y, edges)
+    high = np.fmax.reduceat(y, edges)
+    times = t[edges]
+    return np.repeat(times, 2), np.column_stack([low, high]).ravel()
+
+def export_plot(plot, path, width):
+    import pyqtgraph.exporters
+    exporter = pyqtgraph.exporters.ImageExporter(plot.plotItem)
+    exporter.parameters()["width"] = width
+    exporter.export(path)
+    return path
+
+def new_plot(pg, title, x_unit, y_unit, width, height):
+    plot = pg.PlotWidget()
+    plot.setBackground('w')
+    plot.showGrid(x=True, y=True)
+    plot.setTitle(title, color='k', size='14pt', bold=True)
+    plot.getAxis('bottom').setLabel(x_unit)
+    plot.getAxis('left').setLabel(y_unit)
+    # The widget is never shown, so the plot item is sized directly, after the title is laid out
+    plot.resize(width, height)
+    plot.plotItem.setGeometry(0, 0, width, height)
+    return plot
+
+# Every GUI plot of a session as PNGs, headless, returns the file paths
+def render_plots(session, directory, width=1600, height=900):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import pyqtgraph as pg
+    from ground_track import to_mercator, douglas_peucker
+    from spectral import stft_batch
+    pg.mkQApp()
+    os.makedirs(directory, exist_ok=True)
+    prefix = os.path.join(directory, session.name)
+    files = []
+    filtered = {name: hampel_batch(session.t, session[name], config)[0]
+                for name, config in DEFAULT_GLITCH_CONFIG.items() if name in session}
+
+    for title, unit, names in TIME_PLOTS:
+        names = [name for name in names if name in session]
+        if not names:
+            continue
+        plot = new_plot(pg, title, "s", unit, width, height)
+        if len(names) > 1:
+            plot.addLegend()
+        for i, name in enumerate(names):
+            pen = pg.mkPen(PEN_COLORS[i % len(PEN_COLORS)], width=PEN_WIDTH)
+            values = filtered.get(name, session[name])
+            plot.plot(*peak_decimate(session.t, values, width), pen=pen, name=name, connect='finite')
+        files.append(export_plot(plot, f"{prefix}_{slug(title)}.png", width))
+
+    if "GPS_LATITUDE" in session and "GPS_LONGITUDE" in session:
+        lat, lon = filtered["GPS_LATITUDE"], filtered["GPS_LONGITUDE"]
+        fix = ~np.isnan(lat) & ~np.isnan(lon) & ~((lat == 0.0) & (lon == 0.0))
+        if fix.any():
+            x, y = to_mercator(lat[fix], lon[fix])
+            # Mercator stretches distances by 1 / cos(lat)
+            kept = douglas_peucker(x, y, TRACK_TOLERANCE_M / math.cos(math.radians(lat[fix][0])))
+            x, y = x[kept], y[kept]
+            plot = new_plot(pg, "GPS Ground Track", "Web Mercator m", "Web Mercator m", width, height)
+            plot.setAspectLocked(True)
+            plot.plot(x - x[0], y - y[0], pen=pg.mkPen(PEN_COLORS[0], width=PEN_WIDTH))
+            plot.plot([0.0, x[-1] - x[0]], [0.0, y[-1] - y[0]], pen=None, symbol='o', symbolBrush=PEN_COLORS[2])
+            files.append(export_plot(plot, f"{prefix}_{slug('GPS Ground Track')}.png", width))
+
+    if "AUTO_GYRO_ROTATION_RATE" in session:
+        times, rates, amplitude = stft_batch(session.t, session["AUTO_GYRO_ROTATION_RATE"])
+        if len(times) > 1:
+            plot = new_plot(pg, "Spectrogram AUTO_GYRO_ROTATION_RATE", "s", "Hz", width, height)
+            image = pg.ImageItem()
+            image.setColorMap(pg.colormap.get('viridis'))
+            image.setImage(20 * np.log10(amplitude + 1e-6), autoLevels=True)
+            nyquist = float(np.nanmedian(rates)) / 2
+            image.setRect(float(times[0]), 0.0, float(times[-1] - times[0]), nyquist)
+            plot.addItem(image)
+            files.append(export_plot(plot, f"{prefix}_spectrogram.png", width))
+    return files
+
+# ------ CLI ------ #
+def print_progress(done, total):
+    print(f"\rloading {100 * done / total:5.1f} %", end="" if done < total else "\n", file=sys.stderr, flush=True)
+
+def analyze_file(path, plot_dir=None, jobs=1):
+    start = time.perf_counter()
+    if jobs > 1 and sum(os.path.getsize(part) for part in session_parts(path)) >= LARGE_FILE_BYTES:
+        session = load_large(path, jobs, print_progress if sys.stderr.isatty() else None)
+    else:
+        session = load_session(path)
+    loaded = time.perf_counter()
+    add_estimates(session)
+    report = analyze(session)
+    report["load_ms"] = 1000 * (loaded - start)
+    report["analysis_ms"] = 1000 * (time.perf_counter() - loaded)
+    if plot_dir:
+        report["plots"] = render_plots(session, plot_dir)
+    return report
+
+def format_report(report):
+    lines = [f"== {report['session']} ({len(report['files'])} file(s)): {report['packets']} packets, "
+             f"{report['duration_s']:.1f} s, {report['messages']} messages "
+             f"[load {report['load_ms']:.0f} ms, analysis {report['analysis_ms']:.0f} ms]"]
+    totals = report.get("state_durations_s")
+    if totals:
+        lines.append("States:   " + ", ".join(f"{state} {seconds:.1f} s" for state, seconds in totals.items()))
+        for phase in report["phases"]:
+            rate = phase["vertical_rate_mps"]
+            lines.append(f"  {phase['state']:<16} T+{phase['start_s']:8.1f} s  {phase['duration_s']:8.1f} s  "
+                         f"{phase['packets']:6d} pkts  " + ("" if rate is None else f"{rate:+8.2f} m/s"))
+    apogee = report.get("apogee")
+    if apogee:
+        lines.append(f"Apogee:   {apogee['altitude_m']:.1f} m at T+{apogee['time_s']:.1f} s"
+                     + (f" in {apogee['state']}" if "state" in apogee else "")
+                     + (f" (KF {apogee['kf_altitude_m']:.1f} m)" if "kf_altitude_m" in apogee else "")
+                     + (f", {report['altitude_glitches']} altitude glitches filtered"
+                        if report.get("altitude_glitches") else ""))
+    packets = report.get("packets_report")
+    if packets:
+        lines.append(f"Packets:  {packets['received']} received, {packets['missing']} missing "
+                     f"({packets['loss_percent']:.2f} %), {packets['duplicates_or_resets']} duplicates/resets, "
+                     f"{packets.get('gap_count', 0)} gaps")
+        for gap in packets["gaps"][:5]:
+            lines.append(f"  gap at T+{gap['start_s']:.1f} s: {gap['seconds']:.1f} s, "
+                         f"{gap['packets_missing']} packets missing")
+    voltage = report.get("voltage")
+    if voltage:
+        lines.append(f"Voltage:  {voltage['baseline_v']:.2f} V at start, min {voltage['min_v']:.2f} V at "
+                     f"T+{voltage['min_time_s']:.1f} s" + (f" in {voltage['min_state']}" if "min_state" in voltage else "")
+                     + f", sag {voltage['sag_v']:.2f} V, end {voltage['end_v']:.2f} V")
+    gps = report.get("gps")
+    if gps:
+        lines.append(f"GPS:      {gps['fixes']} fixes, drift {gps['drift_m']:.0f} m, max {gps['max_distance_m']:.0f} m "
+                     f"from start" + (f", {gps['descent_drift_m']:.0f} m after apogee" if "descent_drift_m" in gps else ""))
+    for path in report.get("plots", []):
+        lines.append(f"  plot {path}")
+    return "\n".join(lines)
+
+# Session files and directories to one path per session
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        files.extend(session_files(path) if os.path.isdir(path) else [path])
+    return list({session_name(path): path for path in files}.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze logged CANSAT sessions")
+    parser.add_argument("paths", nargs="*", default=["sessions"], help="session CSVs or directories of them")
+    parser.add_argument("--plots", metavar="DIR", help="render the plots of every session as PNGs into DIR")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="parallel processes")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no session files found")
+    start = time.perf_counter()
+    if len(paths) == 1 or args.jobs <= 1:
+        reports = [analyze_file(path, args.plots, args.jobs) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(paths))) as pool:
+            reports = list(pool.map(analyze_file, paths, [args.plots] * len(paths)))
+    if args.json:
+        print(json.dumps(reports, indent=1))
+    else:
+        for report in reports:
+            print(format_report(report))
+        print(f"{len(reports)} session(s) in {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Attitude estimate from the gyro, accelerometer and magnetometer
+
+Author: RSX
+
+Mahony complementary filter on a unit quaternion: the gyro rate is
+integrated exactly over the packet interval (telemetry is slow and the
+autogyro spins fast, a first order step would fall apart), then nudged by
+the cross product between the measured and predicted gravity and magnetic
+field directions. Outputs roll, pitch, yaw and compass heading in degrees.
+
+attitude_batch() does all normalization and unit conversion for a whole log
+with NumPy and runs the filter recursion, which is sequential by nature, in
+a scalar loop. Run this file with --benchmark to see the sample rates.
+"""
+from dataclasses import dataclass
+import argparse
+import math
+import time
+import numpy as np
+
+ATTITUDE_CHANNELS = ("ROLL", "PITCH", "YAW", "HEADING")
+
+@dataclass(frozen=True)
+class AttitudeConfig:
+    kp: float = 1.0             # proportional feedback, 1/s
+    ki: float = 0.0             # integral feedback (gyro bias), 1/s^2
+    declination: float = 0.0    # degrees, added to yaw for the compass heading
+    max_dt: float = 5.0         # s, longer gaps re-initialize from accel/mag
+
+# Roll, pitch, yaw in radians from gravity and the tilt compensated magnetic field
+# (vectorized, accel reads +g on z when level)
+def accel_mag_attitude(ax, ay, az, mx, my, mz):
+    roll = np.arctan2(ay, az)
+    pitch = np.arctan2(-ax, np.sqrt(ay * ay + az * az))
+    sr, cr, sp, cp = np.sin(roll), np.cos(roll), np.sin(pitch), np.cos(pitch)
+    xh = mx * cp + my * sp * sr + mz * sp * cr
+    yh = my * cr - mz * sr
+    yaw = np.arctan2(-yh, xh)
+    return roll, pitch, yaw
+
+def euler_to_quaternion(roll, pitch, yaw):
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    return (cr * cp * cy + sr * sp * sy,
+            sr * cp * cy - cr * sp * sy,
+            cr * sp * cy + sr * cp * sy,
+            cr * cp * sy - sr * sp * cy)
+
+def quaternion_to_euler(q0, q1, q2, q3):
+    roll = math.atan2(2 * (q0 * q1 + q2 * q3), 1 - 2 * (q1 * q1 + q2 * q2))
+    pitch = math.asin(max(-1.0, min(1.0, 2 * (q0 * q2 - q3 * q1))))
+    yaw = math.atan2(2 * (q0 * q3 + q1 * q2), 1 - 2 * (q2 * q2 + q3 * q3))
+    return roll, pitch, yaw
+
+# q rotated by body rate (wx, wy, wz) for dt, exactly
+def rotate(q, wx, wy, wz, dt):
+    q0, q1, q2, q3 = q
+    rate = math.sqrt(wx * wx + wy * wy + wz * wz)
+    angle = rate * dt
+    if angle > 1e-12:
+        s = math.sin(angle / 2) / rate
+        dw, dx, dy, dz = math.cos(angle / 2), wx * s, wy * s, wz * s
+        q0, q1, q2, q3 = (q0 * dw - q1 * dx - q2 * dy - q3 * dz,
+                          q0 * dx + q1 * dw + q2 * dz - q3 * dy,
+                          q0 * dy - q1 * dz + q2 * dw + q3 * dx,
+                          q0 * dz + q1 * dy - q2 * dx + q3 * dw)
+    norm = 1.0 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+    return q0 * norm, q1 * norm, q2 * norm, q3 * norm
+
+# Error between measured unit vectors a, m (m may be None) and the directions q predicts
+def mahony_error(q, a, m):
+    q0, q1, q2, q3 = q
+    ax, ay, az = a
+
+    # Predicted gravity direction (half)
+    vx = q1 * q3 - q0 * q2
+    vy = q0 * q1 + q2 * q3
+    vz = q0 * q0 - 0.5 + q3 * q3
+    ex = ay * vz - az * vy
+    ey = az * vx - ax * vz
+    ez = ax * vy - ay * vx
+
+    if m is not None:
+        mx, my, mz = m
+        # Field in the earth frame, flattened onto north / vertical
+        hx = 2 * (mx * (0.5 - q2 * q2 - q3 * q3) + my * (q1 * q2 - q0 * q3) + mz * (q1 * q3 + q0 * q2))
+        hy = 2 * (mx * (q1 * q2 + q0 * q3) + my * (0.5 - q1 * q1 - q3 * q3) + mz * (q2 * q3 - q0 * q1))
+        bx = math.sqrt(hx * hx + hy * hy)
+        bz = 2 * (mx * (q1 * q3 - q0 * q2) + my * (q2 * q3 + q0 * q1) + mz * (0.5 - q1 * q1 - q2 * q2))
+        wx = bx * (0.5 - q2 * q2 - q3 * q3) + bz * (q1 * q3 - q0 * q2)
+        wy = bx * (q1 * q2 - q0 * q3) + bz * (q0 * q1 + q2 * q3)
+        wz = bx * (q0 * q2 + q1 * q3) + bz * (0.5 - q1 * q1 - q2 * q2)
+        ex += my * wz - mz * wy
+        ey += mz * wx - mx * wz
+        ez += mx * wy - my * wx
+    return ex, ey, ez
+
+# One Mahony step, gyro in rad/s. The gyro is integrated first and the error is taken
+# against the propagated attitude: at the telemetry rate the CanSat turns a lot between
+# packets, the error against the previous attitude would be mostly that motion.
+# Returns the new quaternion and gyro bias integral.
+def mahony_step(q, integral, gx, gy, gz, a, m, dt, kp, ki):
+    ix, iy, iz = integral
+    q = rotate(q, gx + ix, gy + iy, gz + iz, dt)
+    ex, ey, ez = mahony_error(q, a, m)
+    if ki > 0:
+        ix, iy, iz = ix + 2 * ki * ex * dt, iy + 2 * ki * ey * dt, iz + 2 * ki * ez * dt
+    # Correction gain is capped so one slow packet can't overshoot
+    gain = min(2 * kp, 1.0 / dt)
+    return rotate(q, gain * ex, gain * ey, gain * ez, dt), (ix, iy, iz)
+
+def unit_vector(x, y, z):
+    norm = math.sqrt(x * x + y * y + z * z)
+    if norm == 0 or math.isnan(norm):
+        return None
+    return x / norm, y / norm, z / norm
+
+def heading_of(yaw, declination):
+    return (math.degrees(yaw) + declination) % 360.0
+
+def none_to_nan(values):
+    return [math.nan if v is None else float(v) for v in values]
+
+class AttitudeEstimator:
+
+    def __init__(self, config=AttitudeConfig()):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.q = None
+        self.integral = (0.0, 0.0, 0.0)
+        self.t = None
+
+    # gyro in deg/s, accel in any unit, mag in any unit (all zeros = no mag)
+    def update(self, t, gyro, accel, mag):
+        gx, gy, gz = none_to_nan(gyro)
+        a = unit_vector(*none_to_nan(accel))
+        m = unit_vector(*none_to_nan(mag))
+
+        if self.q is None or t - self.t > self.config.max_dt:
+            if a is None:
+                return self.channels()
+            mx, my, mz = m if m is not None else (1.0, 0.0, 0.0)
+            roll, pitch, yaw = accel_mag_attitude(*a, mx, my, mz)
+            self.q = euler_to_quaternion(float(roll), float(pitch), float(yaw))
+            self.integral = (0.0, 0.0, 0.0)
+            self.t = t
+            return self.channels()
+
+        dt = t - self.t
+        if dt <= 0 or a is None or math.isnan(gx + gy + gz):
+            return self.channels()
+        self.t = t
+        self.q, self.integral = mahony_step(self.q, self.integral, math.radians(gx), math.radians(gy),
+                                            math.radians(gz), a, m, dt, self.config.kp, self.config.ki)
+        return self.channels()
+
+    def channels(self):
+        if self.q is None:
+            return {name: math.nan for name in ATTITUDE_CHANNELS}
+        roll, pitch, yaw = quaternion_to_euler(*self.q)
+        return {
+            "ROLL": math.degrees(roll),
+            "PITCH": math.degrees(pitch),
+            "YAW": math.degrees(yaw),
+            "HEADING": heading_of(yaw, self.config.declination),
+        }
+
+# Whole log: gyro, accel, mag are (n, 3) arrays, returns {channel: array} in degrees
+def attitude_batch(t, gyro, accel, mag, config=AttitudeConfig()):
+    t = np.asarray(t, dtype=float)
+    n = len(t)
+    gyro = np.radians(np.asarray(gyro, dtype=float))
+    accel = np.asarray(accel, dtype=float)
+    mag = np.asarray(mag, dtype=float)
+    out = {name: np.full(n, np.nan) for name in ATTITUDE_CHANNELS}
+
+    # Everything that doesn't depend on the filter state, in one pass
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a_norm = np.linalg.norm(accel, axis=1)
+        m_norm = np.linalg.norm(mag, axis=1)
+        a_unit = accel / a_norm[:, None]
+        m_unit = mag / m_norm[:, None]
+    a_ok = (a_norm > 0) & ~np.isnan(a_norm)
+    m_ok = (m_norm > 0) & ~np.isnan(m_norm)
+    g_ok = ~np.isnan(gyro).any(axis=1)
+    init_mag = np.where(m_ok[:, None], m_unit, (1.0, 0.0, 0.0))
+    roll0, pitch0, yaw0 = accel_mag_attitude(a_unit[:, 0], a_unit[:, 1], a_unit[:, 2],
+                                             init_mag[:, 0], init_mag[:, 1], init_mag[:, 2])
+    dts = np.diff(t, prepend=np.nan)
+
+    a_list, m_list, g_list = a_unit.tolist(), m_unit.tolist(), gyro.tolist()
+    q, integral, last_t = None, (0.0, 0.0, 0.0), None
+    quats = np.full((n, 4), np.nan)
+    for i in range(n):
+        if q is None or t[i] - last_t > config.max_dt:
+            if not a_ok[i]:
+                continue
+            q = euler_to_quaternion(roll0[i], pitch0[i], yaw0[i])
+            integral, last_t = (0.0, 0.0, 0.0), t[i]
+        else:
+            dt = t[i] - last_t
+            if dt > 0 and a_ok[i] and g_ok[i]:
+                gx, gy, gz = g_list[i]
+                q, integral = mahony_step(q, integral, gx, gy, gz, a_list[i],
+                                          m_list[i] if m_ok[i] else None, dt, config.kp, config.ki)
+                last_t = t[i]
+        quats[i] = q
+
+    # Euler angles for every sample at once
+    q0, q1, q2, q3 = quats.T
+    roll = np.arctan2(2 * (q0 * q1 + q2 * q3), 1 - 2 * (q1 * q1 + q2 * q2))
+    pitch = np.arcsin(np.clip(2 * (q0 * q2 - q3 * q1), -1.0, 1.0))
+    yaw = np.arctan2(2 * (q0 * q3 + q1 * q2), 1 - 2 * (q2 * q2 + q3 * q3))
+    out["ROLL"], out["PITCH"], out["YAW"] = np.degrees(roll), np.degrees(pitch), np.degrees(yaw)
+    out["HEADING"] = (np.degrees(yaw) + config.declination) % 360.0
+    return out
+
+# Synthetic spinning, nodding descent for benchmarking
+def synthetic_flight(n, rate_hz=1.0, spin_dps=300.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / rate_hz
+    gyro = np.column_stack([5 * np.sin(0.3 * t), 5 * np.cos(0.2 * t), np.full(n, spin_dps)]) + rng.normal(0, 1, (n, 3))
+    accel = np.column_stack([rng.normal(0, 0.3, n), rng.normal(0, 0.3, n), np.full(n, 9.81)])
+    heading = np.radians(spin_dps) * t
+    mag = np.column_stack([0.2 * np.cos(heading), -0.2 * np.sin(heading), np.full(n, 0.4)])
+    return t, gyro, accel, mag
+
+def benchmark(n=20000):
+    t, gyro, accel, mag = synthetic_flight(n)
+    estimator = AttitudeEstimator()
+    start = time.perf_counter()
+    for i in range(n):
+        estimator.update(t[i], gyro[i], accel[i], mag[i])
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    attitude_batch(t, gyro, accel, mag)
+    batch = time.perf_counter() - start
+    return n / incremental, n / batch
+
+def main():
+    parser = argparse.ArgumentParser(description="Attitude filter")
+    parser.add_argument("--benchmark", action="store_true", help="measure samples per second")
+    parser.add_argument("-n", type=int, default=20000, help="benchmark samples")
+    args = parser.parse_args()
+    if args.benchmark:
+        incremental, batch = benchmark(args.n)
+        print(f"incremental: {incremental:,.0f} samples/s")
+        print(f"batch:       {batch:,.0f} samples/s")
+        print("telemetry:   1 sample/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Onboard log backfill
+
+Author: RSX
+
+Packets lost over the radio are still in the payload's own log, which
+GTLOGS downloads to cansat_logs.txt. backfill() aligns that log with a
+ground session: every packet is keyed by its MISSION_TIME and
+PACKET_COUNT, the keys of both logs go through one stable sort, and a key
+only the onboard log has is a packet the ground station missed. Both logs
+are already in packet order, so the sort only merges a few sorted runs
+(two, plus one per processor restart or clock change) and the join is
+linear in the length of the flight.
+
+The merged session keeps every ground row, adds the missing packets marked
+ONBOARD in a SOURCE column, and recomputes the derived channels over the
+whole of it. The Kalman estimates (KF_*) are re-run over the merged packets
+with estimate_batch(). PACKET_RECV only exists live and stays empty for
+backfilled rows.
+
+Two files are written next to the session: backfilled_<session>.csv has the
+competition columns with every value as the payload sent it, plus SOURCE,
+and backfilled_<session>_full.csv has every column of the merged session.
+
+    python backfill.py sessions/session_20260612_101500.csv cansat_logs.txt --plots report/
+"""
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from mission_db import column_affinity
+from timebase import parse_hms_batch, SECONDS_PER_DAY
+from derived_channels import DerivedChannelEngine
+from altitude_estimator import estimate_columns, ESTIMATE_CHANNELS
+from telemetry_loader import load_session, build_session, PACKET_FIELDS
+
+GROUND, ONBOARD = "GROUND", "ONBOARD"
+# Columns of the competition CSV (csv_fields of the GUI) and where each row came from
+COMPETITION_FIELDS = PACKET_FIELDS + ["PACKET_RECV", "SOURCE"]
+COUNT_BITS = 24     # PACKET_COUNT in the low bits of a key, MISSION_TIME in centiseconds above it
+
+# Sortable int64 key per packet and whether it could be built
+def packet_keys(columns):
+    n = len(columns["PACKET_COUNT"])
+    seconds = parse_hms_batch(columns["MISSION_TIME"]) if n else np.empty(0)
+    count = columns["PACKET_COUNT"]
+    valid = np.isfinite(seconds) & np.isfinite(count) & (count >= 0) & (count < 2 ** COUNT_BITS)
+    # Across midnight the mission time starts over, keys keep growing
+    wraps = np.zeros(n)
+    times = seconds[valid]
+    wraps[valid] = np.concatenate([[0.0], np.cumsum(np.diff(times) < -SECONDS_PER_DAY / 2)])[:len(times)]
+    centiseconds = np.round((np.where(valid, seconds, 0.0) + wraps * SECONDS_PER_DAY) * 100).astype(np.int64)
+    keys = (centiseconds << COUNT_BITS) | np.where(valid, count, 0).astype(np.int64)
+    return keys, valid
+
+# Ground rows without a usable key take the key of the row before them, so they stay in place
+def fill_keys(keys, valid):
+    index = np.maximum.accumulate(np.where(valid, np.arange(len(keys)), -1))
+    return np.where(index >= 0, keys[np.maximum(index, 0)], -1)
+
+def filler(values, count):
+    return np.full(count, "") if values.dtype.kind == "U" else np.full(count, np.nan)
+
+# A column as logged: the kept text when the session was loaded with keep_text
+def text_column(session, name):
+    if name in session.text:
+        return session.text[name]
+    if name in session.columns:
+        return np.asarray(format_column(name, session[name]), dtype=str)
+    return np.full(len(session), "")
+
+# Merged session and counts: ground packets, onboard packets, backfilled ones
+def backfill(ground, onboard):
+    ground_keys, ground_valid = packet_keys(ground.columns)
+    onboard_keys, onboard_valid = packet_keys(onboard.columns)
+    ground_keys = fill_keys(ground_keys, ground_valid)
+    onboard_rows = np.flatnonzero(onboard_valid)
+    n = len(ground_keys)
+
+    # Stable sort: for equal keys the ground row comes first, so an onboard row
+    # that starts a new key is a packet the ground never got
+    keys = np.concatenate([ground_keys, onboard_keys[onboard_rows]])
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    new_key = np.concatenate([[True], ordered[1:] != ordered[:-1]])
+    rows = order[(order < n) | new_key]
+
+    derived = set(DerivedChannelEngine().names) | set(ESTIMATE_CHANNELS)
+    columns = {}
+    names = list(ground.columns) + [name for name in onboard.columns if name not in ground.columns]
+    for name in names:
+        if name in derived:
+            continue
+        ground_part = ground.columns.get(name)
+        onboard_part = onboard.columns.get(name)
+        if ground_part is None:
+            ground_part = filler(onboard_part, n)
+        onboard_part = filler(ground_part, len(onboard_rows)) if onboard_part is None else onboard_part[onboard_rows]
+        if (ground_part.dtype.kind == "U") != (onboard_part.dtype.kind == "U"):
+            ground_part, onboard_part = ground_part.astype(str), onboard_part.astype(str)
+        columns[name] = np.concatenate([ground_part, onboard_part])[rows]
+    columns["SOURCE"] = np.where(rows < n, GROUND, ONBOARD)
+
+    text = {name: np.concatenate([text_column(ground, name), text_column(onboard, name)[onboard_rows]])[rows]
+            for name in COMPETITION_FIELDS if name != "SOURCE"}
+    text["SOURCE"] = columns["SOURCE"]
+
+    merged = build_session(f"backfilled_{ground.name}", ground.paths + onboard.paths, columns, ground.messages,
+                           text=text)
+    if "ALTITUDE" in merged.columns:
+        merged.columns.update(estimate_columns(merged.t, merged.columns))
+    # Recomputed channels back in their place, SOURCE last
+    order = [name for name in names if name in merged.columns] + ["SOURCE"]
+    merged.columns = {name: merged.columns[name] for name in order}
+    return merged, {"ground": n, "onboard": len(onboard_rows), "backfilled": int(np.sum(rows >= n))}
+
+# Values of one column as CSV text, empty for NaN
+def format_column(name, values):
+    if values.dtype.kind == "U":
+        return values.tolist()
+    if column_affinity(name) == "INTEGER":
+        return ["" if value != value else str(int(value)) for value in values.tolist()]
+    return ["" if value != value else f"{value:.15g}" for value in values.tolist()]
+
+# names are every column by default, a column kept as text is written as logged
+def write_csv(session, path, names=None):
+    names = list(session.columns) if names is None else names
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(names)
+        writer.writerows(zip(*[session.text[name].tolist() if name in session.text
+                               else format_column(name, session[name]) for name in names]))
+    return path
+
+# The competition CSV and the full merged session, returns both paths
+def write_backfilled(session, path=None):
+    path = path or backfilled_path(session)
+    full = f"{os.path.splitext(path)[0]}_full.csv"
+    return write_csv(session, path, COMPETITION_FIELDS), write_csv(session, full)
+
+# Rows from index `start` on as {field: text}, like csv.DictReader gives for a session
+def session_rows(session, start=0):
+    names = list(session.columns)
+    columns = [format_column(name, session[name][start:]) for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+# backfill() of the ground session at ground_path, both files are written when it was
+# missing packets the onboard log has. Returns (merged, counts, competition CSV or None).
+def backfill_file(ground_path, onboard):
+    merged, counts = backfill(load_session(ground_path, keep_text=True), onboard)
+    if counts["backfilled"] in (0, counts["onboard"]):
+        return merged, counts, None
+    return merged, counts, write_backfilled(merged)[0]
+
+def backfilled_path(session):
+    return os.path.join(os.path.dirname(session.paths[0]), f"{session.name}.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the gaps of a ground session from the onboard log")
+    parser.add_argument("session", help="ground session CSV")
+    parser.add_argument("log", nargs="?", default="cansat_logs.txt", help="log downloaded with GTLOGS")
+    parser.add_argument("--out", help="competition CSV (backfilled_<session>.csv next to the session by default), "
+                                      "the full merged session goes next to it as <out>_full.csv")
+    parser.add_argument("--plots", metavar="DIR", help="render the merged session's plots as PNGs into DIR")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ground, onboard = load_session(args.session, keep_text=True), load_session(args.log, keep_text=True)
+    loaded = time.perf_counter()
+    merged, counts = backfill(ground, onboard)
+    merged_at = time.perf_counter()
+    path, full = write_backfilled(merged, args.out)
+    print(f"{counts['ground']} ground packets, {counts['onboard']} onboard packets, "
+          f"{counts['backfilled']} backfilled -> {len(merged)} packets in {path} (all columns in {full})")
+    print(f"(load {1000 * (loaded - start):.0f} ms, merge {1000 * (merged_at - loaded):.0f} ms, "
+          f"write {1000 * (time.perf_counter() - merged_at):.0f} ms)")
+    if args.plots:
+        from analyze import render_plots
+        for plot in render_plots(merged, args.plots):
+            print(f"  plot {plot}")
+
+if __name__ == "__main__":
+    main()
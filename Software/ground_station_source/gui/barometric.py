@@ -0,0 +1,23 @@
+"""
+Standard atmosphere pressure/altitude conversion
+
+Author: RSX
+"""
+import numpy as np
+
+# Standard atmosphere constants (troposphere)
+SEA_LEVEL_PRESSURE_PA = 101325.0
+SEA_LEVEL_TEMPERATURE_K = 288.15
+LAPSE_RATE_K_PER_M = 0.0065
+BAROMETRIC_EXPONENT = 5.25588   # g * M / (R * L)
+
+# Pressure (Pa) at altitude_m above a ground level at ground_pressure_pa
+def altitude_to_pressure(altitude_m, ground_pressure_pa=SEA_LEVEL_PRESSURE_PA):
+    altitude_m = np.asarray(altitude_m, dtype=float)
+    ratio = 1.0 - LAPSE_RATE_K_PER_M * altitude_m / SEA_LEVEL_TEMPERATURE_K
+    return ground_pressure_pa * np.power(ratio, BAROMETRIC_EXPONENT)
+
+def pressure_to_altitude(pressure_pa, ground_pressure_pa=SEA_LEVEL_PRESSURE_PA):
+    pressure_pa = np.asarray(pressure_pa, dtype=float)
+    ratio = np.power(pressure_pa / ground_pressure_pa, 1.0 / BAROMETRIC_EXPONENT)
+    return SEA_LEVEL_TEMPERATURE_K / LAPSE_RATE_K_PER_M * (1.0 - ratio)
@@ -0,0 +1,48 @@
+"""
+Fixed-size ring buffers for plotted telemetry
+
+Author: RSX
+
+Every value is written twice, at i and i + size, so the latest `size`
+samples are always one contiguous slice of the backing array. Appending is
+O(1) and view() returns a NumPy view without copying or rolling.
+"""
+import numpy as np
+
+class RingBuffer:
+
+    def __init__(self, size, width=None, fill=np.nan, dtype=float):
+        self.size = size
+        self.width = width
+        self.fill = fill
+        shape = (2 * size,) if width is None else (2 * size, width)
+        self.__data = np.full(shape, fill, dtype=dtype)
+        self.__head = 0
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, value):
+        self.__data[self.__head] = value
+        self.__data[self.__head + self.size] = value
+        self.__head = (self.__head + 1) % self.size
+        self.count += 1
+
+    # Latest `size` samples, oldest first
+    def view(self):
+        return self.__data[self.__head:self.__head + self.size]
+
+    # Only the samples written so far (at most `size`)
+    def valid(self):
+        return self.view()[self.size - len(self):]
+
+    def last(self, default=np.nan):
+        if self.count == 0:
+            return default
+        return self.__data[self.__head + self.size - 1]
+
+    def reset(self):
+        self.__data[:] = self.fill
+        self.__head = 0
+        self.count = 0
@@ -0,0 +1,128 @@
+"""
+Rolling statistics for telemetry channels
+
+Author: RSX
+
+Each channel keeps min, max, mean, variance and rate of change over a
+sliding window of samples. Mean and variance use Welford's update with
+removal of the oldest sample, min and max use monotonic deques, so every
+sample costs O(1) (amortized for min/max) whatever the window size.
+"""
+from collections import deque
+from dataclasses import dataclass
+import math
+
+@dataclass(frozen=True)
+class ChannelSummary:
+    count: int
+    last: float
+    min: float
+    max: float
+    mean: float
+    std: float
+    rate: float     # units per second over the window
+
+class RollingStats:
+
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.__samples = deque()        # (index, t, value)
+        self.__min = deque()            # increasing values
+        self.__max = deque()            # decreasing values
+        self.__index = 0
+        self.mean = 0.0
+        self.__m2 = 0.0
+
+    def __len__(self):
+        return len(self.__samples)
+
+    def push(self, t, value):
+        if value is None or math.isnan(value):
+            return
+        idx = self.__index
+        self.__index += 1
+
+        self.__samples.append((idx, t, value))
+        n = len(self.__samples)
+        delta = value - self.mean
+        self.mean += delta / n
+        self.__m2 += delta * (value - self.mean)
+
+        while self.__min and self.__min[-1][1] >= value:
+            self.__min.pop()
+        self.__min.append((idx, value))
+        while self.__max and self.__max[-1][1] <= value:
+            self.__max.pop()
+        self.__max.append((idx, value))
+
+        if n > self.window:
+            old_idx, _, old_value = self.__samples.popleft()
+            n -= 1
+            delta = old_value - self.mean
+            self.mean -= delta / n
+            self.__m2 = max(0.0, self.__m2 - delta * (old_value - self.mean))
+            if self.__min[0][0] == old_idx:
+                self.__min.popleft()
+            if self.__max[0][0] == old_idx:
+                self.__max.popleft()
+
+    @property
+    def min(self):
+        return self.__min[0][1] if self.__min else math.nan
+
+    @property
+    def max(self):
+        return self.__max[0][1] if self.__max else math.nan
+
+    @property
+    def variance(self):
+        n = len(self.__samples)
+        return self.__m2 / (n - 1) if n > 1 else 0.0
+
+    @property
+    def rate(self):
+        if len(self.__samples) < 2:
+            return 0.0
+        _, t0, v0 = self.__samples[0]
+        _, t1, v1 = self.__samples[-1]
+        return (v1 - v0) / (t1 - t0) if t1 != t0 else 0.0
+
+    def summary(self):
+        last = self.__samples[-1][2] if self.__samples else math.nan
+        return ChannelSummary(len(self.__samples), last, self.min, self.max,
+                              self.mean, math.sqrt(self.variance), self.rate)
+
+# Rolling statistics for every numeric field of a packet
+class ChannelStatsEngine:
+
+    def __init__(self, channels, window=120, windows=None):
+        windows = windows or {}
+        self.channels = {name: RollingStats(windows.get(name, window)) for name in channels}
+
+    def push(self, t, data):
+        for name, stats in self.channels.items():
+            value = getattr(data, name, None)
+            if value is None:
+                continue
+            try:
+                stats.push(t, float(value))
+            except ValueError:
+                continue
+
+    # Values that aren't packet fields, e.g. derived channels {name: value}
+    def push_values(self, t, values):
+        for name, value in values.items():
+            stats = self.channels.get(name)
+            if stats is not None and value is not None:
+                stats.push(t, float(value))
+
+    def reset(self):
+        for stats in self.channels.values():
+            stats.reset()
+
+    def summary(self, name):
+        stats = self.channels.get(name)
+        return stats.summary() if stats is not None else None
@@ -0,0 +1,207 @@
+"""
+Non-blocking command scheduler for the ground station uplink
+
+Author: RSX
+
+Commands are queued instead of written straight to the port. poll() is
+called from a GUI timer and sends at most one command per call, keeping a
+minimum gap between writes on the link. Commands that expect an answer stay
+in flight until the payload echoes them (CMD_ECHO telemetry field) or sends
+a matching '$' reply, and are resent after a timeout. Round trip times are
+kept in a histogram per command type.
+
+A '$' reply matches when its text starts with one of the command's reply
+words, so mission info like {SIM|LAUNCH_PAD} in an unrelated message is no
+answer. CMD_ECHO keeps showing the last command the payload ran, so the
+first packet after a send, which may have left before the command got
+there, can't acknowledge it. Commands that aren't safe to run twice (camera
+toggles) are sent with retries=0: a lost answer must not toggle again.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+import re
+import time
+
+# Upper bucket edges in ms, last bucket catches everything above
+LATENCY_BUCKETS_MS = (50, 100, 200, 500, 1000, 2000, 5000)
+
+# "CMD,3114,CX,ON" -> ("CX", "CXON")
+def command_type_and_echo(cmd):
+    parts = cmd.strip().split(',')
+    if len(parts) < 3:
+        return cmd.strip(), cmd.strip()
+    return parts[2], "".join(parts[2:])
+
+def normalize_echo(echo):
+    return echo.replace(',', '').replace(' ', '').upper()
+
+# Text of a '$' line without its {MODE|STATE} info: "$I MSG:CX ON {F|ASCENT}" -> "CX ON"
+def reply_text(msg):
+    _, _, text = msg.partition("MSG:")
+    return re.sub(r'\{.*?\}', '', text if text else msg).strip()
+
+# Reply words to patterns anchored at the start of the reply text
+def reply_patterns(replies):
+    return tuple(re.compile(re.escape(reply) + r'\b') for reply in replies)
+
+@dataclass
+class QueuedCommand:
+    cmd: str
+    cmd_type: str
+    echo: str
+    expect_ack: bool = True
+    retries: int = 2
+    timeout_s: float = 3.0
+    replies: tuple = ()             # compiled patterns, see reply_patterns()
+    packets_since_send: int = 0
+    attempts: int = 0
+    first_sent: float = None
+    last_sent: float = None
+
+# Fixed-bucket latency histogram for one command type
+@dataclass
+class LatencyHistogram:
+    counts: list = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    total_ms: float = 0.0
+    min_ms: float = None
+    max_ms: float = None
+
+    def add(self, latency_ms):
+        idx = 0
+        while idx < len(LATENCY_BUCKETS_MS) and latency_ms > LATENCY_BUCKETS_MS[idx]:
+            idx += 1
+        self.counts[idx] += 1
+        self.total_ms += latency_ms
+        self.min_ms = latency_ms if self.min_ms is None else min(self.min_ms, latency_ms)
+        self.max_ms = latency_ms if self.max_ms is None else max(self.max_ms, latency_ms)
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+class CommandScheduler:
+
+    def __init__(self, send, min_gap_s=0.2, timeout_s=3.0, retries=2, clock=time.monotonic):
+        self.send = send
+        self.min_gap_s = min_gap_s
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.clock = clock
+        self.histograms = {}
+        self.on_ack = None      # (QueuedCommand, latency_ms)
+        self.on_retry = None    # (QueuedCommand)
+        self.on_fail = None     # (QueuedCommand)
+        self.__queue = deque()
+        self.__in_flight = None
+        self.__last_write = None
+
+    def __len__(self):
+        return len(self.__queue) + (1 if self.__in_flight is not None else 0)
+
+    @property
+    def in_flight(self):
+        return self.__in_flight
+
+    def submit(self, cmd, expect_ack=True, retries=None, timeout_s=None, replies=None):
+        cmd_type, echo = command_type_and_echo(cmd)
+        queued = QueuedCommand(
+            cmd=cmd,
+            cmd_type=cmd_type,
+            echo=normalize_echo(echo),
+            expect_ack=expect_ack,
+            retries=self.retries if retries is None else retries,
+            timeout_s=self.timeout_s if timeout_s is None else timeout_s,
+            replies=reply_patterns(replies if replies is not None else (cmd_type,)),
+        )
+        self.__queue.append(queued)
+        return queued
+
+    def clear(self):
+        self.__queue.clear()
+        self.__in_flight = None
+
+    # Called from a timer, sends at most one command per call
+    def poll(self):
+        now = self.clock()
+
+        if self.__in_flight is not None and now - self.__in_flight.last_sent >= self.__in_flight.timeout_s:
+            pending = self.__in_flight
+            if pending.attempts > pending.retries:
+                self.__in_flight = None
+                if self.on_fail:
+                    self.on_fail(pending)
+            elif self.__gap_elapsed(now):
+                if self.on_retry:
+                    self.on_retry(pending)
+                self.__write(pending, now)
+                return
+
+        if not self.__queue or not self.__gap_elapsed(now):
+            return
+
+        # Commands waiting for an answer go out one at a time
+        head = self.__queue[0]
+        if head.expect_ack and self.__in_flight is not None:
+            return
+
+        self.__queue.popleft()
+        if self.__write(head, now) and head.expect_ack:
+            self.__in_flight = head
+
+    def __gap_elapsed(self, now):
+        return self.__last_write is None or now - self.__last_write >= self.min_gap_s
+
+    def __write(self, queued, now):
+        queued.attempts += 1
+        queued.packets_since_send = 0
+        queued.last_sent = now
+        if queued.first_sent is None:
+            queued.first_sent = now
+        self.__last_write = now
+        return self.send(queued.cmd)
+
+    # CMD_ECHO field of every telemetry packet, None when the packet has none
+    def on_telemetry_echo(self, echo):
+        pending = self.__in_flight
+        if pending is None:
+            return False
+        pending.packets_since_send += 1
+        # The first packet after the send may still show an identical earlier command
+        if echo is None or pending.packets_since_send < 2:
+            return False
+        if normalize_echo(echo) != pending.echo:
+            return False
+        return self.__acknowledge()
+
+    # '$' message from the payload
+    def on_message(self, msg):
+        pending = self.__in_flight
+        if pending is None:
+            return False
+        text = reply_text(msg)
+        if not any(reply.match(text) for reply in pending.replies):
+            return False
+        return self.__acknowledge()
+
+    def __acknowledge(self):
+        pending = self.__in_flight
+        self.__in_flight = None
+        # Latency is measured from the most recent (re)send
+        latency_ms = (self.clock() - pending.last_sent) * 1000.0
+        self.histograms.setdefault(pending.cmd_type, LatencyHistogram()).add(latency_ms)
+        if self.on_ack:
+            self.on_ack(pending, latency_ms)
+        return True
+
+    def latency_summary(self):
+        edges = [f"<={edge}" for edge in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        lines = []
+        for cmd_type, hist in sorted(self.histograms.items()):
+            buckets = " ".join(f"{edge}:{count}" for edge, count in zip(edges, hist.counts) if count)
+            lines.append(f"{cmd_type}: n={hist.count} mean={hist.mean_ms:.0f} ms "
+                         f"min={hist.min_ms:.0f} ms max={hist.max_ms:.0f} ms [{buckets}]")
+        return lines
@@ -0,0 +1,157 @@
+"""
+Derived telemetry channels
+
+Author: RSX
+
+A derived channel is declared once as a function of raw TelemetryData
+columns, with two implementations: an incremental state updated with each
+packet in O(1), and a vectorized NumPy function for a whole loaded log.
+Both give the same values for the same samples.
+"""
+from dataclasses import dataclass
+import math
+import numpy as np
+from barometric import pressure_to_altitude
+
+EARTH_RADIUS_M = 6371000.0
+
+# ------ INCREMENTAL STATES ------ #
+# Backward difference dv/dt between consecutive samples
+class Derivative:
+
+    def __init__(self):
+        self.last_t, self.last_v = None, None
+
+    def update(self, t, v):
+        if v is None or math.isnan(v):
+            return math.nan
+        rate = math.nan
+        if self.last_t is not None and t > self.last_t:
+            rate = (v - self.last_v) / (t - self.last_t)
+        self.last_t, self.last_v = t, v
+        return rate
+
+# Altitude above the first valid pressure reading (telemetry pressure is in kPa)
+class PressureAltitude:
+
+    def __init__(self):
+        self.ground_pa = None
+
+    def update(self, t, pressure_kpa):
+        if pressure_kpa is None or not pressure_kpa > 0:
+            return math.nan
+        if self.ground_pa is None:
+            self.ground_pa = pressure_kpa * 1000.0
+        return float(pressure_to_altitude(pressure_kpa * 1000.0, self.ground_pa))
+
+class GroundSpeed:
+
+    def __init__(self):
+        self.last = None
+
+    def update(self, t, lat, lon):
+        if lat is None or lon is None or math.isnan(lat) or math.isnan(lon) or (lat == 0.0 and lon == 0.0):
+            return math.nan
+        speed = math.nan
+        if self.last is not None and t > self.last[0]:
+            distance = float(haversine_m(self.last[1], self.last[2], lat, lon))
+            speed = distance / (t - self.last[0])
+        self.last = (t, lat, lon)
+        return speed
+
+# ------ VECTORIZED VERSIONS ------ #
+def derivative_batch(t, v):
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    out = np.full(len(v), np.nan)
+    if len(v) < 2:
+        return out
+    # Same as Derivative: skip missing samples, difference against the last valid one
+    valid = np.flatnonzero(~np.isnan(v))
+    if len(valid) < 2:
+        return out
+    dt = np.diff(t[valid])
+    dv = np.diff(v[valid])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(dt > 0, dv / dt, np.nan)
+    out[valid[1:]] = rate
+    return out
+
+def pressure_altitude_batch(t, pressure_kpa):
+    pressure_pa = np.asarray(pressure_kpa, dtype=float) * 1000.0
+    pressure_pa = np.where(pressure_pa > 0, pressure_pa, np.nan)
+    valid = np.flatnonzero(~np.isnan(pressure_pa))
+    if len(valid) == 0:
+        return np.full(len(pressure_pa), np.nan)
+    return pressure_to_altitude(pressure_pa, pressure_pa[valid[0]])
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def ground_speed_batch(t, lat, lon):
+    t = np.asarray(t, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    out = np.full(len(t), np.nan)
+    fix = ~np.isnan(lat) & ~np.isnan(lon) & ~((lat == 0.0) & (lon == 0.0))
+    valid = np.flatnonzero(fix)
+    if len(valid) < 2:
+        return out
+    dt = np.diff(t[valid])
+    distance = haversine_m(lat[valid[:-1]], lon[valid[:-1]], lat[valid[1:]], lon[valid[1:]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[valid[1:]] = np.where(dt > 0, distance / dt, np.nan)
+    return out
+
+@dataclass(frozen=True)
+class DerivedChannel:
+    name: str
+    unit: str
+    inputs: tuple
+    state: type         # incremental: state().update(t, *inputs)
+    batch: object       # vectorized: batch(t, *input_columns)
+
+DEFAULT_CHANNELS = (
+    DerivedChannel("VERTICAL_VELOCITY", "m/s", ("ALTITUDE",), Derivative, derivative_batch),
+    DerivedChannel("ANGULAR_ACCEL_R", "deg/s^2", ("GYRO_R",), Derivative, derivative_batch),
+    DerivedChannel("ANGULAR_ACCEL_P", "deg/s^2", ("GYRO_P",), Derivative, derivative_batch),
+    DerivedChannel("ANGULAR_ACCEL_Y", "deg/s^2", ("GYRO_Y",), Derivative, derivative_batch),
+    DerivedChannel("PRESSURE_ALTITUDE", "m", ("PRESSURE",), PressureAltitude, pressure_altitude_batch),
+    DerivedChannel("GPS_GROUND_SPEED", "m/s", ("GPS_LATITUDE", "GPS_LONGITUDE"), GroundSpeed, ground_speed_batch),
+)
+
+class DerivedChannelEngine:
+
+    def __init__(self, channels=DEFAULT_CHANNELS):
+        self.channels = list(channels)
+        self.values = {}
+        self.reset()
+
+    @property
+    def names(self):
+        return [channel.name for channel in self.channels]
+
+    def add_channel(self, channel):
+        self.channels.append(channel)
+        self.__states[channel.name] = channel.state()
+        self.values[channel.name] = math.nan
+
+    def reset(self):
+        self.__states = {channel.name: channel.state() for channel in self.channels}
+        self.values = {channel.name: math.nan for channel in self.channels}
+
+    # One packet, returns {name: value} (NaN when it can't be computed yet)
+    def update(self, t, data):
+        for channel in self.channels:
+            inputs = [getattr(data, name, None) for name in channel.inputs]
+            self.values[channel.name] = self.__states[channel.name].update(t, *inputs)
+        return self.values
+
+    # Whole log in one pass per channel, columns is {field name: array}
+    def compute(self, t, columns):
+        return {
+            channel.name: channel.batch(t, *[columns[name] for name in channel.inputs])
+            for channel in self.channels
+        }
@@ -0,0 +1,253 @@
+"""
+Streaming glitch filter for plotted telemetry
+
+Author: RSX
+
+Causal Hampel filter on the rate of change, so a climbing or falling
+signal is not mistaken for a run of glitches. The window holds the rates
+between the last `window` accepted samples; its median is the local trend
+and its MAD the noise. A sample is a glitch when it is further from the
+last accepted sample extrapolated along the trend than
+
+    k * 1.4826 * max(MAD * dt, min_mad) + max_rate * dt
+
+where max_rate is the fastest real change the trend may miss (a launch
+going from 0 to 100+ m/s). The window is kept sorted, so the median is
+O(1) and the MAD is the k-th smallest of two sorted distance sequences,
+found in O(log w). After max_run glitches in a row the signal has really
+moved (a recalibration, a GPS fix jumping) and the filter starts over from
+the new value.
+
+Glitches are replaced by the extrapolated value in the plots only; the
+estimators and the log get the raw values. hampel_batch() gives the same
+flags over a whole log with whole-array NumPy passes.
+"""
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+MIN_DT = 0.01       # s, packets logged with the same time
+MAX_BATCH_PASSES = 32
+
+@dataclass(frozen=True)
+class GlitchConfig:
+    window: int = 15
+    k: float = 4.0
+    min_mad: float = 0.0    # floor so a flat signal doesn't flag every change
+    max_rate: float = 0.0   # per second, change off the trend that is still real
+    max_run: int = 3        # glitches in a row before the filter follows the signal
+
+    @property
+    def min_count(self):
+        return max(3, self.window // 2)
+
+# Default thresholds per channel, min_mad and max_rate are in the channel's own units
+DEFAULT_GLITCH_CONFIG = {
+    "ALTITUDE": GlitchConfig(15, 4.0, 0.5, 250.0),
+    "PRESSURE": GlitchConfig(15, 4.0, 0.01, 3.0),
+    "TEMPERATURE": GlitchConfig(15, 4.0, 0.2, 2.0),
+    "VOLTAGE": GlitchConfig(15, 4.0, 0.05, 1.0),
+    "AUTO_GYRO_ROTATION_RATE": GlitchConfig(15, 5.0, 5.0, 500.0),
+    "GPS_ALTITUDE": GlitchConfig(15, 4.0, 1.0, 250.0),
+    "GPS_LATITUDE": GlitchConfig(15, 4.0, 0.00005, 0.003),
+    "GPS_LONGITUDE": GlitchConfig(15, 4.0, 0.00005, 0.003),
+}
+
+# k-th smallest (0-based) of the union of two ascending sequences a(i), b(j)
+def kth_of_two(a, na, b, nb, k):
+    lo, hi = max(0, k + 1 - nb), min(k + 1, na)
+    while lo < hi:
+        i = (lo + hi) // 2
+        j = k + 1 - i
+        if j > 0 and i < na and b(j - 1) > a(i):
+            lo = i + 1
+        else:
+            hi = i
+    i, j = lo, k + 1 - lo
+    best = -math.inf
+    if i > 0:
+        best = a(i - 1)
+    if j > 0:
+        best = max(best, b(j - 1))
+    return best
+
+def sorted_median(values):
+    n = len(values)
+    mid = n // 2
+    return values[mid] if n % 2 else 0.5 * (values[mid - 1] + values[mid])
+
+# Median absolute deviation of a sorted list around its median
+def sorted_mad(values, median):
+    n = len(values)
+    split = bisect_left(values, median)
+    # Distances below the median ascend going left, above it going right
+    below = lambda i: median - values[split - 1 - i]
+    above = lambda j: values[split + j] - median
+    nb, na = split, n - split
+    mid = n // 2
+    if n % 2:
+        return kth_of_two(below, nb, above, na, mid)
+    return 0.5 * (kth_of_two(below, nb, above, na, mid - 1) + kth_of_two(below, nb, above, na, mid))
+
+class HampelFilter:
+
+    def __init__(self, config=GlitchConfig()):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.__order = deque()      # rates between accepted samples, oldest first
+        self.__sorted = []
+        self.__last = None          # (t, value) of the last accepted sample
+        self.__run = 0
+
+    # t in seconds, returns (value to plot, is_glitch)
+    def update(self, t, value):
+        if value is None or math.isnan(value):
+            return value, False
+        if self.__last is None:
+            self.__last = (t, value)
+            return value, False
+
+        last_t, last_value = self.__last
+        dt = max(t - last_t, MIN_DT)
+        if len(self.__sorted) >= self.config.min_count:
+            trend = sorted_median(self.__sorted)
+            mad = sorted_mad(self.__sorted, trend)
+            predicted = last_value + trend * dt
+            limit = self.config.k * MAD_SCALE * max(mad * dt, self.config.min_mad) + self.config.max_rate * dt
+            if abs(value - predicted) > limit:
+                self.__run += 1
+                if self.__run < self.config.max_run:
+                    return predicted, True
+                # Too many in a row to be glitches, start over from the new value
+                self.reset()
+                self.__last = (t, value)
+                return value, False
+
+        self.__run = 0
+        rate = (value - last_value) / dt
+        insort(self.__sorted, rate)
+        self.__order.append(rate)
+        if len(self.__order) > self.config.window:
+            old = self.__order.popleft()
+            del self.__sorted[bisect_left(self.__sorted, old)]
+        self.__last = (t, value)
+        return value, False
+
+# Filters the configured fields of each packet
+class GlitchFilterStage:
+
+    def __init__(self, config=None):
+        self.config = dict(DEFAULT_GLITCH_CONFIG if config is None else config)
+        self.enabled = True
+        self.glitch_counts = {name: 0 for name in self.config}
+        self.__filters = {name: HampelFilter(cfg) for name, cfg in self.config.items()}
+
+    def reset(self):
+        for hampel in self.__filters.values():
+            hampel.reset()
+        self.glitch_counts = {name: 0 for name in self.config}
+
+    # t is the packet time in seconds, returns ({field: value to plot}, [glitched fields])
+    def apply(self, t, data):
+        values, glitches = {}, []
+        for name, hampel in self.__filters.items():
+            raw = getattr(data, name, None)
+            if raw is None:
+                continue
+            value, glitch = hampel.update(t, float(raw))
+            if glitch:
+                glitches.append(name)
+                self.glitch_counts[name] += 1
+                if self.enabled:
+                    values[name] = value
+        return values, glitches
+
+# Median of each row over its first counts[i] entries, rows sorted with NaN last
+def sorted_rows_median(rows, counts):
+    lo = np.take_along_axis(rows, np.maximum(counts - 1, 0)[:, None] // 2, axis=1)[:, 0]
+    hi = np.take_along_axis(rows, np.minimum(counts // 2, rows.shape[1] - 1)[:, None], axis=1)[:, 0]
+    return 0.5 * (lo + hi)
+
+# One pass of the filter over valid samples, given which of them were glitches and which
+# restarted it. Returns (predicted, flagged), both per sample.
+def hampel_pass(t, values, glitch, restart, config):
+    n = len(values)
+    index = np.arange(n)
+    accepted = ~glitch
+    # Last accepted sample before each one, what the stream extrapolates from
+    last = np.maximum.accumulate(np.where(accepted, index, -1))
+    last = np.concatenate(([0], last[:-1]))
+    dt = np.maximum(t - t[last], MIN_DT)
+
+    # Rate into each accepted sample, none into the first one or after a restart
+    kept = np.flatnonzero(accepted)
+    rates = (values[kept] - values[last[kept]]) / dt[kept]
+    rates[0] = np.nan
+    rates[restart[kept]] = np.nan
+    segment = np.cumsum(restart)[kept]
+
+    # Window of the last `window` rates up to each accepted sample, from its own segment only
+    w = config.window
+    pad = np.full(w - 1, np.nan)
+    windows = sliding_window_view(np.concatenate((pad, rates)), w).copy()
+    owner = sliding_window_view(np.concatenate((np.full(w - 1, -1), segment)), w)
+    windows[owner != segment[:, None]] = np.nan
+    counts = np.count_nonzero(~np.isnan(windows), axis=1)
+    windows.sort(axis=1)
+    trend = sorted_rows_median(windows, counts)
+    distance = np.abs(windows - trend[:, None])
+    distance.sort(axis=1)
+    mad = sorted_rows_median(distance, counts)
+
+    # Each sample is checked against the window as of its last accepted sample
+    position = np.cumsum(accepted)[last] - 1
+    predicted = values[last] + trend[position] * dt
+    limit = config.k * MAD_SCALE * np.maximum(mad[position] * dt, config.min_mad) + config.max_rate * dt
+    flagged = (counts[position] >= config.min_count) & (np.abs(values - predicted) > limit)
+    flagged[0] = False
+    return predicted, flagged
+
+# Same flags as HampelFilter over a whole column, returns (filtered, glitch mask).
+# Which samples are accepted feeds back into later windows, so the whole-array pass is
+# repeated from the previous pass's flags until they stop changing. Each sample only
+# depends on earlier ones, so that fixed point is exactly what the stream gives; spikes
+# far apart settle in the same pass, so it takes a handful of passes, not one per glitch.
+def hampel_batch(t, values, config=GlitchConfig()):
+    values = np.asarray(values, dtype=float)
+    t = np.asarray(t, dtype=float)
+    filtered = values.copy()
+    mask = np.zeros(len(values), dtype=bool)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < 2:
+        return filtered, mask
+    tv, vv = t[valid], values[valid]
+
+    glitch = np.zeros(len(valid), dtype=bool)
+    restart = np.zeros(len(valid), dtype=bool)
+    for _ in range(MAX_BATCH_PASSES):
+        predicted, flagged = hampel_pass(tv, vv, glitch, restart, config)
+        # Every max_run-th glitch in a row restarts the filter and is kept
+        index = np.arange(len(flagged))
+        starts = flagged & ~np.concatenate(([False], flagged[:-1]))
+        run = index - np.maximum.accumulate(np.where(starts, index, 0)) + 1
+        new_restart = flagged & (run % config.max_run == 0)
+        new_glitch = flagged & ~new_restart
+        if np.array_equal(new_glitch, glitch) and np.array_equal(new_restart, restart):
+            break
+        glitch, restart = new_glitch, new_restart
+    else:
+        # Long chains of glitches feeding each other, let the stream settle it
+        hampel = HampelFilter(config)
+        for i, (time_s, value) in enumerate(zip(t.tolist(), values.tolist())):
+            filtered[i], mask[i] = hampel.update(time_s, value)
+        return filtered, mask
+
+    mask[valid[glitch]] = True
+    filtered[valid[glitch]] = predicted[glitch]
+    return filtered, mask
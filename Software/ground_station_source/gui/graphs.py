@@ -0,0 +1,41 @@
+"""
+Plot tabs of the ground station
+
+Author: RSX
+
+One entry per plot tab, in tab order: title, number of lines, whether it's
+the 2D ground track, axis units and the logged channels each line shows.
+The GUI builds its tabs from this list and analyze.py renders the same
+plots from a logged session, so both stay in step. No Qt in here, the
+post-flight tools import it without a display.
+"""
+
+GRAPH_INFO = [
+    {"title": "Altitude", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m", "channels": ["ALTITUDE"]},
+    {"title": "Temperature", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "°C", "channels": ["TEMPERATURE"]},
+    {"title": "Pressure", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "kPa", "channels": ["PRESSURE"]},
+    {"title": "Voltage", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "V", "channels": ["VOLTAGE"]},
+    {"title": "Gyro", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "deg/s",
+     "channels": ["GYRO_R", "GYRO_P", "GYRO_Y"]},
+    {"title": "Accel RPY", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "deg/s^2",
+     "channels": ["ANGULAR_ACCEL_R", "ANGULAR_ACCEL_P", "ANGULAR_ACCEL_Y"]},
+    {"title": "Accel XYZ", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "m/s^2",
+     "channels": ["ACCEL_R", "ACCEL_P", "ACCEL_Y"]},
+    {"title": "Magnetometer", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "G",
+     "channels": ["MAG_R", "MAG_P", "MAG_Y"]},
+    {"title": "Rotation", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "deg/s",
+     "channels": ["AUTO_GYRO_ROTATION_RATE"]},
+    {"title": "GPS Ground Track", "lines": 1, "2d": True, "x_unit": "", "y_unit": "",
+     "channels": ["GPS_LATITUDE", "GPS_LONGITUDE"]},
+    {"title": "GPS Altitude", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m", "channels": ["GPS_ALTITUDE"]},
+    {"title": "Vertical Velocity", "lines": 2, "2d": False, "x_unit": "s", "y_unit": "m/s", "labels": ["Diff", "KF"],
+     "channels": ["VERTICAL_VELOCITY", "KF_VELOCITY"]},
+    {"title": "Pressure Altitude", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m",
+     "channels": ["PRESSURE_ALTITUDE"]},
+    {"title": "GPS Ground Speed", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m/s",
+     "channels": ["GPS_GROUND_SPEED"]},
+    {"title": "Altitude Estimate", "lines": 2, "2d": False, "x_unit": "s", "y_unit": "m", "labels": ["Baro", "KF"],
+     "channels": ["ALTITUDE", "KF_ALTITUDE"]},
+    {"title": "Attitude", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "deg", "labels": ["Roll", "Pitch", "Yaw"],
+     "channels": ["ROLL", "PITCH", "YAW"]},
+]
@@ -0,0 +1,105 @@
+"""
+GPS ground track
+
+Author: RSX
+
+Keeps the whole flight path in Web Mercator meters (the projection map
+tiles use) so it can be drawn straight over the tiles. Fixes are decimated
+as they arrive: a fix is kept when it's far enough from the last kept one,
+the newest fix is always drawn as the live tail. Arrays grow by doubling,
+so an update is amortized O(1) and plotting takes a view, not a copy.
+douglas_peucker() simplifies a whole recorded track for analyze.py's plots.
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6378137.0      # WGS84, as used by the tile servers
+MAX_LATITUDE = 85.05112878
+
+def to_mercator(lat, lon):
+    lat = np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    x = EARTH_RADIUS_M * np.radians(lon)
+    y = EARTH_RADIUS_M * np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+    return x, y
+
+def from_mercator(x, y):
+    lon = np.degrees(np.asarray(x, dtype=float) / EARTH_RADIUS_M)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y, dtype=float) / EARTH_RADIUS_M)) - np.pi / 2)
+    return lat, lon
+
+def valid_fix(lat, lon):
+    return (lat is not None and lon is not None and not math.isnan(lat) and not math.isnan(lon)
+            and not (lat == 0.0 and lon == 0.0))
+
+class GroundTrack:
+
+    def __init__(self, min_distance_m=3.0, capacity=1024):
+        self.min_distance_m = min_distance_m
+        self.__capacity = capacity
+        self.reset()
+
+    def reset(self):
+        self.__xy = np.empty((self.__capacity, 2))
+        self.count = 0          # kept points
+        self.received = 0       # fixes seen
+        self.last = None        # newest fix (x, y), kept or not
+
+    def __len__(self):
+        return self.count
+
+    # Returns True when the fix was kept as a track point
+    def append(self, lat, lon):
+        if not valid_fix(lat, lon):
+            return False
+        x, y = to_mercator(lat, lon)
+        x, y = float(x), float(y)
+        self.received += 1
+        self.last = (x, y)
+        if self.count:
+            # Mercator stretches distances by 1 / cos(lat)
+            scale = math.cos(math.radians(lat))
+            lx, ly = self.__xy[self.count - 1]
+            if math.hypot(x - lx, y - ly) * scale < self.min_distance_m:
+                return False
+        if self.count == len(self.__xy):
+            self.__xy = np.concatenate([self.__xy, np.empty_like(self.__xy)])
+        self.__xy[self.count] = (x, y)
+        self.count += 1
+        return True
+
+    # Kept points plus the live tail, (n, 2) in Mercator meters
+    def points(self):
+        kept = self.__xy[:self.count]
+        if self.last is None or (self.count and tuple(kept[-1]) == self.last):
+            return kept
+        return np.vstack([kept, self.last])
+
+# Indices of the points kept by Douglas-Peucker with tolerance epsilon (same units as x, y)
+def douglas_peucker(x, y, epsilon):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 3:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        # Perpendicular distance of every inner point to the chord, in one go
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(dx * py - dy * px) / length
+        i = int(np.argmax(dist))
+        if dist[i] > epsilon:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
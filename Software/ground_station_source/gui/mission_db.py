@@ -0,0 +1,229 @@
+"""
+SQLite mission database
+
+Author: RSX
+
+Optional store next to the session CSVs: telemetry, '$' messages and sent
+commands of every session in one WAL-mode database, indexed by session,
+PACKET_COUNT and time so questions across runs are one query. The GUI only
+puts rows on a queue; a background thread writes them in batched
+transactions, so a slow disk never holds up ingest. Readers use their own
+connection, WAL lets them run while the writer is busy.
+
+    python mission_db.py range STATE VOLTAGE CMD_ECHO --from 800 --to 900 --last 3 --mode S
+    python mission_db.py sql "SELECT name, COUNT(*) FROM telemetry JOIN sessions ..."
+    python mission_db.py export session_20260612_101500 out.csv
+"""
+import argparse
+import csv
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_FILE = "mission.db"
+
+# Column affinity of telemetry fields, everything else (ground channels included) is REAL.
+# SQLite converts the logged text to these types on insert.
+TEXT_COLUMNS = {"MISSION_TIME", "MODE", "STATE", "GPS_TIME", "CMD_ECHO", "GLITCHES", "SOURCE"}
+INTEGER_COLUMNS = {"TEAM_ID", "PACKET_COUNT", "GPS_SATS", "CAM_STATUS", "PACKET_RECV"}
+
+def column_affinity(name):
+    if name in TEXT_COLUMNS:
+        return "TEXT"
+    return "INTEGER" if name in INTEGER_COLUMNS else "REAL"
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class MissionDatabase:
+
+    def __init__(self, path=DEFAULT_DB_FILE, columns=(), batch_size=256, flush_s=0.5):
+        self.path = path
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+        self.session_id = None
+        self.written = 0
+        self.error = None
+        self.__queue = queue.SimpleQueue()
+        self.__read = None
+
+        connection = self.connect()
+        self.__create(connection)
+        connection.close()
+        self.__thread = threading.Thread(target=self.__writer, name="mission-db", daemon=True)
+        self.__thread.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def __create(self, connection):
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                               "id INTEGER PRIMARY KEY, name TEXT UNIQUE, started REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS telemetry ("
+                               "session_id INTEGER, received REAL, t REAL)")
+            existing = {row[1] for row in connection.execute("PRAGMA table_info(telemetry)")}
+            # New ground channels are added as columns, old rows read as NULL
+            for name in self.columns:
+                if name not in existing:
+                    connection.execute(f"ALTER TABLE telemetry ADD COLUMN {quote(name)} {column_affinity(name)}")
+            connection.execute("CREATE TABLE IF NOT EXISTS messages ("
+                               "session_id INTEGER, received REAL, level TEXT, text TEXT, raw TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS commands ("
+                               "session_id INTEGER, time REAL, command TEXT, event TEXT, latency_ms REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS telemetry_packet ON telemetry (session_id, PACKET_COUNT)")
+            connection.execute("CREATE INDEX IF NOT EXISTS telemetry_time ON telemetry (session_id, t)")
+            connection.execute("CREATE INDEX IF NOT EXISTS messages_time ON messages (session_id, received)")
+            connection.execute("CREATE INDEX IF NOT EXISTS commands_time ON commands (session_id, time)")
+        insert_columns = ["session_id", "received", "t"] + self.columns
+        self.__telemetry_sql = (f"INSERT INTO telemetry ({', '.join(quote(c) for c in insert_columns)}) "
+                                f"VALUES ({', '.join('?' * len(insert_columns))})")
+
+    # Sessions are named after their CSV file, resuming one reuses its id
+    def start_session(self, name):
+        connection = self.connect()
+        with connection:
+            connection.execute("INSERT OR IGNORE INTO sessions (name, started) VALUES (?, ?)", (name, time.time()))
+            self.session_id = connection.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()[0]
+        connection.close()
+
+    # ------ WRITES, queued for the background thread ------ #
+    def insert_telemetry(self, t, row):
+        values = [None if row.get(name, "") == "" else row[name] for name in self.columns]
+        self.__queue.put((self.__telemetry_sql, (self.session_id, time.time(), t, *values)))
+
+    def insert_message(self, level, text, raw):
+        self.__queue.put(("INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                          (self.session_id, time.time(), level, text, raw)))
+
+    def insert_command(self, command, event, latency_ms=None):
+        self.__queue.put(("INSERT INTO commands VALUES (?, ?, ?, ?, ?)",
+                          (self.session_id, time.time(), command, event, latency_ms)))
+
+    def __writer(self):
+        connection = self.connect()
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # Collect whatever else arrives within flush_s, up to batch_size rows
+            deadline = time.monotonic() + self.flush_s
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.__queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                with connection:
+                    for sql, params in batch:
+                        connection.execute(sql, params)
+                self.written += len(batch)
+            except sqlite3.Error as e:
+                self.error = e
+            if stop:
+                break
+        connection.close()
+
+    @property
+    def pending(self):
+        return self.__queue.qsize()
+
+    def close(self):
+        self.__queue.put(None)
+        self.__thread.join(timeout=5.0)
+        if self.__read is not None:
+            self.__read.close()
+            self.__read = None
+
+    # ------ READS, on their own connection ------ #
+    def reader(self):
+        if self.__read is None:
+            self.__read = self.connect()
+        return self.__read
+
+    def query(self, sql, params=()):
+        return self.reader().execute(sql, params).fetchall()
+
+    def telemetry_range(self, fields, packet_from, packet_to, last=1, mode=None):
+        return telemetry_range(self.reader(), fields, packet_from, packet_to, last, mode)
+
+    def export_csv(self, session_name, path):
+        return export_csv(self.reader(), session_name, path)
+
+# Rows of the given fields for a PACKET_COUNT range, across the last `last` sessions
+# (optionally only sessions that have packets in MODE `mode`)
+def telemetry_range(connection, fields, packet_from, packet_to, last=1, mode=None):
+    where_mode = "WHERE id IN (SELECT DISTINCT session_id FROM telemetry WHERE MODE = ?)" if mode else ""
+    params = [mode] if mode else []
+    sql = (f"SELECT s.name, t.PACKET_COUNT, {', '.join('t.' + quote(f) for f in fields)} FROM telemetry t "
+           f"JOIN (SELECT id, name FROM sessions {where_mode} ORDER BY id DESC LIMIT ?) s ON s.id = t.session_id "
+           f"WHERE t.PACKET_COUNT BETWEEN ? AND ? ORDER BY s.id, t.PACKET_COUNT")
+    return connection.execute(sql, (*params, last, packet_from, packet_to)).fetchall()
+
+# One session's telemetry rows as dicts, PACKET_COUNT in [packet_from, packet_to]
+def session_telemetry(connection, session_id, packet_from, packet_to, limit=5000):
+    cursor = connection.execute("SELECT * FROM telemetry WHERE session_id = ? AND PACKET_COUNT BETWEEN ? AND ? "
+                                "ORDER BY PACKET_COUNT LIMIT ?", (session_id, packet_from, packet_to, limit))
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+def export_csv(connection, session_name, path):
+    cursor = connection.execute(
+        "SELECT t.* FROM telemetry t JOIN sessions s ON s.id = t.session_id WHERE s.name = ? ORDER BY t.rowid",
+        (session_name,))
+    count = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([d[0] for d in cursor.description])
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the mission database")
+    parser.add_argument("--db", default=DEFAULT_DB_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sql = sub.add_parser("sql", help="run a query")
+    sql.add_argument("query")
+    rng = sub.add_parser("range", help="fields for a PACKET_COUNT range across sessions")
+    rng.add_argument("fields", nargs="+")
+    rng.add_argument("--from", dest="packet_from", type=int, required=True)
+    rng.add_argument("--to", dest="packet_to", type=int, required=True)
+    rng.add_argument("--last", type=int, default=1, help="number of most recent sessions")
+    rng.add_argument("--mode", help="only sessions with packets in this MODE (F or S)")
+    export = sub.add_parser("export", help="write one session's telemetry as CSV")
+    export.add_argument("session")
+    export.add_argument("out")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db)
+    connection.execute("PRAGMA journal_mode=WAL")
+    start = time.perf_counter()
+    if args.command == "sql":
+        cursor = connection.execute(args.query)
+        rows = cursor.fetchall()
+        if cursor.description:
+            print(",".join(d[0] for d in cursor.description))
+        for row in rows:
+            print(",".join("" if v is None else str(v) for v in row))
+    elif args.command == "range":
+        for row in telemetry_range(connection, args.fields, args.packet_from, args.packet_to, args.last, args.mode):
+            print(",".join("" if v is None else str(v) for v in row))
+    else:
+        print(f"{export_csv(connection, args.session, args.out)} rows written to {args.out}")
+    print(f"({1000 * (time.perf_counter() - start):.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Display overload protection
+
+Author: RSX
+
+When packets arrive faster than the GUI can draw them (SIMP stress runs,
+fast replays, the burst after a reconnect) the event loop falls behind and
+the window freezes. The governor measures how much of each display frame
+went into processing packets, and how late the display timer fired, and
+steps the display down one level at a time while over budget:
+
+  LIVE              everything is drawn for every packet
+  SIDEBAR           live values and statistics refresh once per frame
+  DECIMATED         curves are drawn peak-decimated to the view width
+  VISIBLE TAB       plots on hidden tabs only store samples
+  LATEST            the visible tab is redrawn once per frame, with the latest state
+
+Only drawing is affected, every packet is still parsed, logged and
+published. The level steps back up once the load stays low for a while.
+"""
+from enum import IntEnum
+import time
+
+class DisplayLevel(IntEnum):
+    LIVE = 0
+    SIDEBAR = 1
+    DECIMATED = 2
+    VISIBLE_TAB = 3
+    LATEST = 4
+
+LEVEL_TEXT = {
+    DisplayLevel.LIVE: "DISPLAY LIVE",
+    DisplayLevel.SIDEBAR: "DISPLAY LAGGING: SIDEBAR THROTTLED",
+    DisplayLevel.DECIMATED: "DISPLAY LAGGING: PLOTS DECIMATED",
+    DisplayLevel.VISIBLE_TAB: "DISPLAY LAGGING: HIDDEN TABS PAUSED",
+    DisplayLevel.LATEST: "DISPLAY LAGGING: LATEST STATE ONLY",
+}
+
+class DisplayGovernor:
+
+    def __init__(self, frame_s=0.25, budget=0.5, relax=0.15, max_lag_s=0.2, calm_s=3.0, clock=time.monotonic):
+        self.frame_s = frame_s          # display timer period
+        self.budget = budget            # share of a frame packet processing may take
+        self.relax = relax              # below this the display may step back up
+        self.max_lag_s = max_lag_s      # display timer lateness that counts as overload
+        self.calm_s = calm_s
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.level = DisplayLevel.LIVE
+        self.load = 0.0
+        self.lag_s = 0.0
+        self.peak_load = 0.0
+        self.__busy_s = 0.0
+        self.__frame_start = self.clock()
+        self.__calm_since = self.__frame_start
+
+    # Time spent processing packets since the last frame
+    def add(self, seconds):
+        self.__busy_s += seconds
+
+    # Called once per display frame, returns True when the level changed
+    def tick(self):
+        now = self.clock()
+        elapsed = now - self.__frame_start
+        if elapsed <= 0:
+            return False
+        self.load = self.__busy_s / elapsed
+        self.lag_s = max(0.0, elapsed - self.frame_s)
+        self.peak_load = max(self.peak_load, self.load)
+        self.__busy_s = 0.0
+        self.__frame_start = now
+
+        if self.load > self.budget or self.lag_s > self.max_lag_s:
+            self.__calm_since = now
+            if self.level < DisplayLevel.LATEST:
+                self.level = DisplayLevel(self.level + 1)
+                return True
+        elif self.load < self.relax and self.lag_s < self.max_lag_s / 2:
+            if self.level > DisplayLevel.LIVE and now - self.__calm_since >= self.calm_s:
+                self.level = DisplayLevel(self.level - 1)
+                self.__calm_since = now
+                return True
+        else:
+            self.__calm_since = now
+        return False
+
+    @property
+    def text(self):
+        return LEVEL_TEXT[self.level]
@@ -0,0 +1,300 @@
+"""
+Plot rendering benchmark
+
+Author: RSX
+
+Builds the GUI's plot tabs from GRAPH_INFO with the real plotter classes
+under the offscreen Qt platform and drives synthetic packets through them
+at fixed rates, the way the GUI does: every packet goes to every plotter,
+only the tab on screen is painted. For each plotter class (and line count)
+on screen, window size, number of points kept and packet rate it records
+
+  frame time    update_plot() of the packets in the frame plus a synchronous
+                repaint of the visible tab
+  dropped       packets that came due while a frame was still being drawn;
+                like the Qt event loop they are all added, then painted once
+  CPU time      per frame, and update time per plotter class
+
+Time is simulated, so a run takes about as long as the frames themselves.
+Results are written as JSON; --baseline prints the change against an
+earlier file, so a rendering change can be judged by its numbers.
+
+    python plot_bench.py --out bench_before.json
+    python plot_bench.py --sizes 1280x800 --rates 10 50 --baseline bench_before.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+SCENARIO_KEYS = ("plotter", "lines", "width", "height", "points", "rate_hz")
+
+# Synthetic packet i at rate_hz: smooth signals with a little noise, a slow GPS drift
+class SyntheticFlight:
+
+    def __init__(self, rate_hz, seed=1):
+        import numpy as np
+        self.rate_hz = rate_hz
+        self.noise = np.random.default_rng(seed).normal(0.0, 1.0, 4096)
+
+    def mission_time(self, i):
+        seconds = 10 * 3600 + i / self.rate_hz
+        return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:05.2f}"
+
+    def value(self, i, channel=0):
+        t = i / self.rate_hz
+        return 100.0 * math.sin(0.05 * t + channel) + self.noise[(i + 97 * channel) % len(self.noise)]
+
+    def lat_lon(self, i):
+        t = i / self.rate_hz
+        return 38.149574 + 1e-5 * t, -79.0737 + 2e-5 * t + 1e-4 * math.sin(0.01 * t)
+
+# Plotter on screen for each benchmarked class, one per line count
+def bench_entries(graph_info):
+    entries, seen = [], set()
+    for entry in graph_info:
+        key = (entry["2d"], entry["lines"])
+        if key not in seen:
+            seen.add(key)
+            entries.append(entry)
+    return entries
+
+class PlotLayout:
+
+    def __init__(self, gui, width, height, points):
+        from PyQt6.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QGroupBox, QComboBox
+        from spectral import SpectralEngine, SPECTRAL_CHANNELS
+        from tile_cache import TileCache
+        from timebase import MissionTimebase
+        import pyqtgraph as pg
+
+        self.gui = gui
+        self.window = QMainWindow()
+        self.tabs = QTabWidget()
+        self.window.setCentralWidget(self.tabs)
+        self.timebase = MissionTimebase(points)
+        self.tile_dir = tempfile.TemporaryDirectory()
+        self.tile_cache = TileCache(self.tile_dir.name, fetch=None)
+        self.graphs, self.plotters = [], []
+        for entry in gui.GRAPH_INFO:
+            graph = gui.add_plot_tab(self.tabs, entry["title"])
+            self.graphs.append(graph)
+            self.plotters.append(gui.make_plotter(entry, graph, points, self.timebase, self.tile_cache))
+
+        # Spectrogram tab as in the GUI
+        tab_content = QGroupBox()
+        tab_layout = QVBoxLayout()
+        channel_box = QComboBox()
+        channel_box.addItems(SPECTRAL_CHANNELS)
+        spectrogram_graph, spectrum_graph = pg.PlotWidget(), pg.PlotWidget()
+        spectrogram_graph.setBackground('w')
+        spectrum_graph.setBackground('w')
+        tab_layout.addWidget(channel_box)
+        tab_layout.addWidget(spectrogram_graph, stretch=2)
+        tab_layout.addWidget(spectrum_graph, stretch=1)
+        tab_content.setLayout(tab_layout)
+        self.tabs.addTab(tab_content, "Spectrogram")
+        self.spectral = SpectralEngine()
+        self.spectrogram = gui.SpectrogramPlotter(spectrogram_graph, spectrum_graph, "Spectrogram",
+                                                  self.spectral, SPECTRAL_CHANNELS[0])
+        self.graphs.append(spectrogram_graph)
+        self.plotters.append(self.spectrogram)
+
+        self.window.resize(width, height)
+        self.window.show()
+        self.update_s = {}
+
+    def show_tab(self, index):
+        self.tabs.setCurrentIndex(index)
+        self.gui.QApplication.processEvents()
+
+    def reset(self):
+        self.timebase.reset()
+        self.spectral.reset()
+        for plotter in self.plotters:
+            plotter.reset_plot()
+        self.update_s = {}
+
+    # One packet through every plotter, update time is added up per plotter class
+    def packet(self, flight, i, visible):
+        t = self.timebase.append(flight.mission_time(i), None)
+        for index, plotter in enumerate(self.plotters[:-1]):
+            start = time.perf_counter()
+            entry = self.gui.GRAPH_INFO[index]
+            if entry["2d"]:
+                plotter.update_plot(*flight.lat_lon(i))
+            elif entry["lines"] == 1:
+                plotter.update_plot(flight.value(i, index))
+            else:
+                plotter.update_plot([flight.value(i, index + line) for line in range(entry["lines"])])
+            name = type(plotter).__name__
+            self.update_s[name] = self.update_s.get(name, 0.0) + time.perf_counter() - start
+        start = time.perf_counter()
+        sample = type("Sample", (), {name: flight.value(i, k) for k, name in enumerate(self.spectral.channels)})
+        updated = self.spectral.push(t, sample)
+        if self.spectrogram.channel in updated and visible == len(self.plotters) - 1 \
+                and not self.spectrogram.deferred:
+            self.spectrogram.update_plot()
+        name = type(self.spectrogram).__name__
+        self.update_s[name] = self.update_s.get(name, 0.0) + time.perf_counter() - start
+
+    # Fill every buffer without drawing, the benchmark starts from a full window
+    def prefill(self, flight, packets, visible):
+        for plotter in self.plotters:
+            plotter.deferred = True
+        for i in range(packets):
+            self.packet(flight, i, visible)
+        for plotter in self.plotters:
+            plotter.deferred = False
+            plotter.redraw()
+        self.update_s = {}
+
+    def paint(self, index):
+        self.graphs[index].viewport().repaint()
+        if index == len(self.graphs) - 1:
+            # The spectrum under the spectrogram is on the same tab
+            self.spectrogram.spectrum_plt.viewport().repaint()
+
+    def close(self):
+        self.window.close()
+        self.tile_cache.close()
+        self.tile_dir.cleanup()
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return math.nan
+    return values[min(len(values) - 1, int(q / 100.0 * len(values)))]
+
+# Simulated run at rate_hz: packets come due every period, a frame adds all packets
+# due by the time it starts and paints once
+def run_scenario(layout, index, rate_hz, seconds, points):
+    flight = SyntheticFlight(rate_hz)
+    layout.reset()
+    layout.show_tab(index)
+    layout.prefill(flight, points, index)
+    period = 1.0 / rate_hz
+    packets = int(rate_hz * seconds)
+    clock, i = 0.0, 0
+    frame_s, cpu_s, paint_s, dropped = [], [], [], 0
+    while i < packets:
+        clock = max(clock, i * period)
+        due = min(packets, int(clock / period + 1e-9) + 1)
+        batch = max(1, due - i)
+        start, cpu = time.perf_counter(), time.process_time()
+        for k in range(batch):
+            layout.packet(flight, points + i + k, index)
+        painted = time.perf_counter()
+        layout.paint(index)
+        end = time.perf_counter()
+        frame_s.append(end - start)
+        cpu_s.append(time.process_time() - cpu)
+        paint_s.append(end - painted)
+        dropped += batch - 1
+        i += batch
+        clock += end - start
+
+    ms = lambda values: 1000.0 * sum(values) / len(values)
+    return {
+        "packets": packets,
+        "frames": len(frame_s),
+        "dropped": dropped,
+        "dropped_percent": 100.0 * dropped / packets,
+        "frame_ms": {"mean": ms(frame_s), "p50": 1000.0 * percentile(frame_s, 50),
+                     "p95": 1000.0 * percentile(frame_s, 95), "max": 1000.0 * max(frame_s)},
+        "paint_ms": ms(paint_s),
+        "cpu_ms_per_frame": ms(cpu_s),
+        "update_ms_per_packet": {name: 1000.0 * total / packets for name, total in layout.update_s.items()},
+        # Share of the simulated time spent drawing, above 1 the GUI can't keep up
+        "load": sum(frame_s) / seconds,
+    }
+
+def run(sizes, points_list, rates, seconds, progress=print):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import rsx_cansat_gui as gui
+    app = gui.QApplication.instance() or gui.QApplication([])
+    app.setStyle('Fusion')
+    results = []
+    for width, height in sizes:
+        for points in points_list:
+            layout = PlotLayout(gui, width, height, points)
+            screens = [(gui.GRAPH_INFO.index(entry), entry) for entry in bench_entries(gui.GRAPH_INFO)]
+            screens.append((len(layout.plotters) - 1, {"title": "Spectrogram", "lines": 1}))
+            for index, entry in screens:
+                for rate_hz in rates:
+                    result = {
+                        "plotter": type(layout.plotters[index]).__name__,
+                        "title": entry["title"],
+                        "lines": entry["lines"],
+                        "width": width,
+                        "height": height,
+                        "points": points,
+                        "rate_hz": rate_hz,
+                        **run_scenario(layout, index, rate_hz, seconds, points),
+                    }
+                    results.append(result)
+                    if progress:
+                        progress(format_result(result))
+            layout.close()
+    return results
+
+def format_result(result, baseline=None):
+    text = (f"{result['plotter']:<24} {result['lines']} line(s) {result['width']}x{result['height']} "
+            f"{result['points']:>6} pts {result['rate_hz']:>5g} Hz: frame {result['frame_ms']['mean']:7.2f} ms "
+            f"(p95 {result['frame_ms']['p95']:7.2f}), paint {result['paint_ms']:6.2f} ms, "
+            f"cpu {result['cpu_ms_per_frame']:7.2f} ms, dropped {result['dropped_percent']:5.1f} %")
+    if baseline is not None:
+        before = baseline["frame_ms"]["mean"]
+        text += f"  [{100.0 * (result['frame_ms']['mean'] - before) / before:+.0f} % frame time]"
+    return text
+
+def scenario_key(result):
+    return tuple(result[key] for key in SCENARIO_KEYS)
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the plot rendering of the ground station offscreen")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(1280, 800), (1920, 1080)],
+                        metavar="WxH", help="window sizes")
+    parser.add_argument("--points", nargs="+", type=int, default=[500, 5000], help="points kept per line")
+    parser.add_argument("--rates", nargs="+", type=float, default=[10, 50, 200], help="packet rates in Hz")
+    parser.add_argument("--seconds", type=float, default=3.0, help="simulated seconds per scenario")
+    parser.add_argument("--out", default=f"plot_bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--baseline", help="earlier results to compare with")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {scenario_key(result): result for result in json.load(file)["results"]}
+
+    start = time.perf_counter()
+    results = run(args.sizes, args.points, args.rates, args.seconds,
+                  progress=lambda text: None if baseline else print(text, flush=True))
+    if baseline:
+        for result in results:
+            print(format_result(result, baseline.get(scenario_key(result))))
+
+    import numpy, pyqtgraph
+    from PyQt6.QtCore import QT_VERSION_STR
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+                    "python": platform.python_version(), "qt": QT_VERSION_STR, "pyqtgraph": pyqtgraph.__version__,
+                    "numpy": numpy.__version__, "qpa": os.environ.get("QT_QPA_PLATFORM")},
+        "seconds_per_scenario": args.seconds,
+        "results": results,
+    }
+    with open(args.out, "w") as file:
+        json.dump(report, file, indent=1)
+    print(f"{len(results)} scenarios in {time.perf_counter() - start:.1f} s, written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Dispatch of '$' messages from the payload
+
+Author: RSX
+
+Every '$' line is tokenized once with precompiled patterns into its level,
+text and {MODE|STATE} mission info. Keywords are found with a single
+precompiled alternation over all registered keys and dispatched through a
+dict, so adding message types doesn't add a check per message.
+"""
+from dataclasses import dataclass
+import re
+import time
+
+# "$I MSG:text {MODE|STATE}" / "$E MSG:text" / "$LOGFILE:BEGIN"
+LEVEL_PATTERN = re.compile(r'^\$(\w*)')
+TEXT_PATTERN = re.compile(r'MSG:(.+)')
+INFO_PATTERN = re.compile(r'\{(.+?)\}')
+
+@dataclass(frozen=True)
+class ProtocolMessage:
+    raw: str
+    level: str
+    text: str
+    mode: str
+    state: str
+    keys: tuple
+
+    @property
+    def is_error(self):
+        return self.level.startswith("E")
+
+@dataclass
+class HandlerStats:
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def add(self, elapsed_s):
+        self.count += 1
+        self.total_s += elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+
+    @property
+    def mean_ms(self):
+        return 1000.0 * self.total_s / self.count if self.count else 0.0
+
+@dataclass
+class RegisteredHandler:
+    handler: object
+    consume: bool
+
+class MessageRegistry:
+
+    def __init__(self, default=None):
+        self.default = default
+        self.stats = {}
+        self.__handlers = {}
+        self.__key_pattern = None
+
+    # consume=True handlers run first and stop all further processing
+    def register(self, key, handler, consume=False):
+        self.__handlers[key] = RegisteredHandler(handler, consume)
+        # Longest keys first so a key that prefixes another can't shadow it
+        keys = sorted(self.__handlers, key=len, reverse=True)
+        self.__key_pattern = re.compile('|'.join(re.escape(k) for k in keys))
+
+    def tokenize(self, raw):
+        level_match = LEVEL_PATTERN.match(raw)
+        level = level_match.group(1) if level_match else ""
+
+        text_match = TEXT_PATTERN.search(raw)
+        text = text_match.group(1) if text_match else "(UNEXPECTED FORMAT):" + raw
+
+        mode, state = None, None
+        info_match = INFO_PATTERN.search(text)
+        if info_match is not None:
+            text = INFO_PATTERN.sub('', text).strip()
+            info = info_match.group(1).split('|')
+            if len(info) == 2:
+                mode, state = info
+
+        keys = ()
+        if self.__key_pattern is not None:
+            keys = tuple(dict.fromkeys(self.__key_pattern.findall(raw)))
+
+        return ProtocolMessage(raw, level, text, mode, state, keys)
+
+    def __call(self, stats_key, handler, message):
+        start = time.perf_counter()
+        result = handler(message)
+        self.stats.setdefault(stats_key, HandlerStats()).add(time.perf_counter() - start)
+        return result
+
+    def dispatch(self, raw):
+        message = self.tokenize(raw)
+        handlers = [(key, self.__handlers[key]) for key in message.keys]
+
+        for key, entry in handlers:
+            if entry.consume:
+                self.__call(key, entry.handler, message)
+                return message
+
+        if self.default is not None:
+            self.__call("$" + message.level, self.default, message)
+
+        for key, entry in handlers:
+            self.__call(key, entry.handler, message)
+        return message
+
+    def stats_summary(self):
+        return [f"{key}: n={stats.count} mean={stats.mean_ms:.3f} ms max={1000.0 * stats.max_s:.3f} ms"
+                for key, stats in sorted(self.stats.items())]
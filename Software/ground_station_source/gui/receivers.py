@@ -0,0 +1,187 @@
+"""
+Merging of telemetry streams from several ground receivers
+
+Author: RSX
+
+Every XBee receiver hears the same downlink, so the same packet can show up
+once per open port. The merger keeps the first copy of each PACKET_COUNT,
+drops the rest and keeps loss statistics per receiver. All bookkeeping is
+O(1) per line, so each extra port only adds a constant amount of work.
+
+A copy is a packet whose count was seen with the same MISSION_TIME. When
+the payload resets mid-flight its count starts over while its clock goes
+on, so a large step back in PACKET_COUNT with a later MISSION_TIME, or
+restart_after packets in a row that reuse old counts with new times,
+starts the merge over instead of dropping the rest of the flight.
+"""
+from collections import deque
+from dataclasses import dataclass
+import time
+from timebase import parse_hms, SECONDS_PER_DAY
+
+# Telemetry lines: "TEAM_ID,MISSION_TIME,PACKET_COUNT,..."
+MISSION_TIME_FIELD = 1
+PACKET_COUNT_FIELD = 2
+
+# Packet statistics for a single receiver
+@dataclass
+class ReceiverStats:
+    name: str
+    received: int = 0
+    duplicates: int = 0
+    first_packet: int = None
+    last_packet: int = None
+
+    # Share of the merged stream's packets this receiver missed
+    def loss(self, merged_first, merged_last):
+        if merged_first is None or merged_last is None:
+            return 0.0
+        expected = merged_last - merged_first + 1
+        if expected <= 0:
+            return 0.0
+        return max(0.0, 1.0 - self.received / expected)
+
+def mission_time_of(msg):
+    parts = msg.split(',', MISSION_TIME_FIELD + 2)
+    return parts[MISSION_TIME_FIELD].strip() if len(parts) > MISSION_TIME_FIELD else ""
+
+# True when mission time b comes after a, across midnight too
+def time_after(a, b):
+    a, b = parse_hms(a), parse_hms(b)
+    if a is None or b is None:
+        return False
+    return b > a or b < a - SECONDS_PER_DAY / 2
+
+def packet_count_of(msg):
+    parts = msg.split(',', PACKET_COUNT_FIELD + 1)
+    if len(parts) <= PACKET_COUNT_FIELD:
+        return None
+    try:
+        return int(parts[PACKET_COUNT_FIELD])
+    except ValueError:
+        return None
+
+# Merges lines from any number of receivers into one deduplicated stream
+class TelemetryMerger:
+
+    # restart_jump: step back in PACKET_COUNT that a late receiver can't explain
+    def __init__(self, window=4096, msg_window_s=2.0, restart_jump=16, restart_after=5):
+        self.window = window
+        self.msg_window_s = msg_window_s
+        self.restart_jump = restart_jump
+        self.restart_after = restart_after
+        self.receivers = {}
+        self.first_packet = None
+        self.last_packet = None
+        self.last_time = None
+        self.merged_count = 0
+        self.__seen = {}                # packet count -> its MISSION_TIME
+        self.__reused = []              # (count, MISSION_TIME) of packets in a row reusing old counts
+        self.__seen_order = deque()
+        self.__recent_msgs = {}
+        self.__recent_msg_order = deque()
+
+    def add_receiver(self, name):
+        if name not in self.receivers:
+            self.receivers[name] = ReceiverStats(name)
+        return self.receivers[name]
+
+    def remove_receiver(self, name):
+        self.receivers.pop(name, None)
+
+    def reset(self):
+        for name in list(self.receivers):
+            self.receivers[name] = ReceiverStats(name)
+        self.first_packet = None
+        self.last_packet = None
+        self.last_time = None
+        self.merged_count = 0
+        self.__reused = []
+        self.__seen.clear()
+        self.__seen_order.clear()
+        self.__recent_msgs.clear()
+        self.__recent_msg_order.clear()
+
+    # Returns True if msg is the first copy seen and should be processed
+    def accept(self, name, msg, now=None):
+        stats = self.add_receiver(name)
+        if msg.startswith('$'):
+            return self.__accept_message(name, msg, time.monotonic() if now is None else now)
+
+        packet = packet_count_of(msg)
+        if packet is None:
+            # Can't deduplicate without a packet count, let it through
+            return True
+
+        stats.received += 1
+        if stats.first_packet is None:
+            stats.first_packet = packet
+        stats.last_packet = packet
+
+        mission_time = mission_time_of(msg)
+        seen_time = self.__seen.get(packet)
+        if seen_time is not None and seen_time == mission_time:
+            stats.duplicates += 1
+            return False
+
+        # Packet counter restarted on the payload (reset / new mission)
+        if self.last_packet is not None and packet < self.last_packet - self.restart_jump:
+            self.__reused.append((packet, mission_time))
+            if time_after(self.last_time, mission_time) or len(self.__reused) >= self.restart_after:
+                # Packets of the new run already passed on stay known, so late copies are still dropped
+                earlier = self.__reused[:-1]
+                self.reset()
+                for count, count_time in earlier:
+                    self.__remember(count, count_time)
+                stats = self.add_receiver(name)
+                stats.received, stats.first_packet, stats.last_packet = 1, packet, packet
+        else:
+            self.__reused = []
+
+        self.__remember(packet, mission_time)
+        return True
+
+    def __remember(self, packet, mission_time):
+        if packet not in self.__seen:
+            self.__seen_order.append(packet)
+            if len(self.__seen_order) > self.window:
+                self.__seen.pop(self.__seen_order.popleft(), None)
+        self.__seen[packet] = mission_time
+
+        if self.first_packet is None or packet < self.first_packet:
+            self.first_packet = packet
+        if self.last_packet is None or packet > self.last_packet:
+            self.last_packet, self.last_time = packet, mission_time
+        self.merged_count += 1
+
+    # '$' messages carry no packet count, so identical text heard by another
+    # receiver within msg_window_s counts as one message. The same receiver
+    # repeating a line is the payload sending it again.
+    def __accept_message(self, name, msg, now):
+        while self.__recent_msg_order and now - self.__recent_msg_order[0][0] > self.msg_window_s:
+            old_time, old_msg = self.__recent_msg_order.popleft()
+            if self.__recent_msgs.get(old_msg, (None,))[0] == old_time:
+                del self.__recent_msgs[old_msg]
+        recent = self.__recent_msgs.get(msg)
+        if recent is not None and recent[1] != name:
+            return False
+        self.__recent_msgs[msg] = (now, name)
+        self.__recent_msg_order.append((now, msg))
+        return True
+
+    def merged_loss(self):
+        if self.first_packet is None:
+            return 0.0
+        expected = self.last_packet - self.first_packet + 1
+        return max(0.0, 1.0 - self.merged_count / expected)
+
+    def receiver_loss(self, name):
+        stats = self.receivers.get(name)
+        if stats is None:
+            return 0.0
+        return stats.loss(self.first_packet, self.last_packet)
+
+    def summary(self):
+        parts = [f"{name} {100.0 * (1.0 - self.receiver_loss(name)):.1f}%" for name in self.receivers]
+        parts.append(f"merged {100.0 * (1.0 - self.merged_loss()):.1f}%")
+        return ", ".join(parts)
@@ -10,21 +10,28 @@ TODO:
 - Label logs and divide views (mb new window?)
 - Separate CANSAT & Local msgs
 """
+# Started first, the imports below are the first phase of the startup report
+from startup_timer import StartupTimer
+startup_timer = StartupTimer()
+
 import sys
-import webbrowser
+import argparse
 from datetime import datetime, timezone
-from collections import deque
+from collections import OrderedDict
+from functools import partial
 import numpy as np
-from dataclasses import dataclass, fields
-import re
+from dataclasses import dataclass, fields, replace
+import os
+import math
 import time
-import csv
+import multiprocessing
+import sqlite3
 import pyqtgraph as pg
 from pyqtgraph import mkPen
 from enum import Enum
 from PyQt6.QtSerialPort import QSerialPortInfo, QSerialPort
-from PyQt6.QtCore import Qt, pyqtSignal, QIODevice, QTimer, QTime, pyqtSlot, QUrl
-from PyQt6.QtGui import QFont, QIcon, QIntValidator, QColor, QPalette
+from PyQt6.QtCore import Qt, pyqtSignal, QIODevice, QTimer, QTime, pyqtSlot, QUrl, QRectF
+from PyQt6.QtGui import QFont, QIcon, QIntValidator, QDoubleValidator, QColor, QPalette, QPixmap, QTransform
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -46,7 +53,34 @@ from PyQt6.QtWidgets import (
     QListWidgetItem,
     QAbstractItemView,
     QApplication,
+    QGraphicsPixmapItem,
+    QFileDialog,
+    QProgressDialog,
 )
+from receivers import TelemetryMerger
+from command_queue import CommandScheduler
+from protocol import MessageRegistry
+from simp import SimpStreamer, load_simp_profile, DEFAULT_SIMP_FILE
+from buffers import RingBuffer
+from timebase import MissionTimebase
+from channel_stats import ChannelStatsEngine
+from derived_channels import DerivedChannelEngine
+from glitch_filter import GlitchFilterStage
+from altitude_estimator import AltitudeEstimator, ESTIMATE_CHANNELS
+from alerts import AlertEngine, load_alert_rules, DEFAULT_ALERT_FILE
+from spectral import SpectralEngine, SPECTRAL_CHANNELS
+from attitude import AttitudeEstimator, ATTITUDE_CHANNELS
+from ground_track import GroundTrack, to_mercator, valid_fix, EARTH_RADIUS_M
+from tile_cache import TileCache, TILE_SIZE_PX
+from session import SessionWriter, SessionTail, read_session_tail, session_files, DEFAULT_SESSION_DIR
+from mission_db import MissionDatabase, session_telemetry
+from shared_ring import TelemetryRingWriter, ring_dtype
+from telemetry_server import TelemetryServer, LOCAL_HOST, LAN_HOST, DEFAULT_PORT
+from overload import DisplayGovernor, DisplayLevel
+from graphs import GRAPH_INFO
+from telemetry_loader import ChunkedLoader, LoadCancelled
+from backfill import backfill_file, session_rows
+startup_timer.mark("imports")
 
 # Structure to store packet data
 @dataclass(frozen=True)
@@ -83,6 +117,8 @@ class TelemetryData:
         return {key: str(value) for key, value in self.__dict__.items()}
 
 csv_fields = [field.name for field in fields(TelemetryData)]
+numeric_fields = [field.name for field in fields(TelemetryData)
+                  if field.type in (int, float) and field.name not in ("TEAM_ID", "CAM_STATUS", "PACKET_RECV")]
 
 # Base graph plotting system
 # Initialize plots and set fonts/colors
@@ -98,153 +134,430 @@ class BaseDynamicPlotter:
         (255, 0, 255)  # Magenta
     ]
     
-    def __init__(self, plot, title, timewindow, x_unit, y_unit):
+    # plot is None for a lazy plotter: samples are stored from the start,
+    # the plot items are made by build() once there is a plot widget to show them
+    def __init__(self, plot, title, timewindow, x_unit, y_unit, timebase=None):
         self.timewindow = timewindow
-        self.last_time = None
+        self.timebase = timebase
+        self.title = title
+        self.x_unit = x_unit
+        self.y_unit = y_unit
         self.base_line_color_idx = 0
         self.pen_line_size = 3
-
+        # While deferred (replay), throttled (display overload) or not built yet,
+        # update_plot only stores samples, redraw() draws them
+        self.deferred = False
+        self.throttled = False
+        self.stale = False
+        self.decimated = False
+        self.plt = None
+
+    def build(self, plot):
         font = QFont("Roboto Mono")
         font.setPointSize(14)
         font.setWeight(QFont.Weight.Bold)
 
         self.plt = plot
-        self.plt.setTitle(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{title}</span>')
+        self.plt.setTitle(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{self.title}</span>')
         self.plt.showGrid(x=True, y=True)
         self.plt.getAxis('bottom').setStyle(tickFont=font)
-        self.plt.getAxis('bottom').setLabel(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{x_unit}</span>')
+        self.plt.getAxis('bottom').setLabel(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{self.x_unit}</span>')
         self.plt.getAxis('left').setStyle(tickFont=font)
-        self.plt.getAxis('left').setLabel(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{y_unit}</span>')
+        self.plt.getAxis('left').setLabel(f'<span style="font-family: Monospace; font-size:14pt; font-weight:bold;">{self.y_unit}</span>')
+        self.setup()
+        self.set_decimated(self.decimated)
+        self.draw_glitches()
+        if not (self.deferred or self.throttled):
+            self.refresh()
+
+    @property
+    def built(self):
+        return self.plt is not None
+
+    # Plot items of the subclass, made once the plot widget exists
+    def setup(self):
+        pass
     
     def get_pen_color(self, index):
         return mkPen(self.pen_color_list[index % len(self.pen_color_list)], width=self.pen_line_size)
 
+    # Called by update_plot once the sample is stored
+    def sample_added(self):
+        if self.deferred or self.throttled or not self.built:
+            self.stale = True
+        else:
+            self.redraw()
+
+    # Draws samples held back while throttled
+    def refresh(self):
+        if self.stale and self.built:
+            self.stale = False
+            self.redraw()
+
+    def curves(self):
+        return []
+
+    # Peak-decimated to the view width and clipped to the visible range
+    def set_decimated(self, on):
+        self.decimated = on
+        if not self.built:
+            return
+        for curve in self.curves():
+            curve.setDownsampling(auto=on, method='peak')
+            curve.setClipToView(on)
+
+    # Red crosses where the glitch filter replaced a sample
+    def mark_glitch(self, x, y):
+        if not hasattr(self, "glitch_points"):
+            self.glitch_points = RingBuffer(self.timewindow, width=2)
+        self.glitch_points.append((x, y))
+        self.draw_glitches()
+
+    def draw_glitches(self):
+        if not self.built or not hasattr(self, "glitch_points"):
+            return
+        if not hasattr(self, "glitch_scatter"):
+            self.glitch_scatter = pg.ScatterPlotItem(symbol='x', size=14, pen=mkPen((220, 0, 0), width=2))
+            self.plt.addItem(self.glitch_scatter)
+        points = self.glitch_points.valid()
+        self.glitch_scatter.setData(points[:, 0], points[:, 1])
+
+    def clear_glitches(self):
+        if hasattr(self, "glitch_points"):
+            self.glitch_points.reset()
+        if hasattr(self, "glitch_scatter"):
+            self.glitch_scatter.clear()
+
     def reset_plot(self):
         raise NotImplementedError
 
     def update_plot(self, *args):
         raise NotImplementedError
 
+    def redraw(self):
+        raise NotImplementedError
+
 # Plotting system for regular graphs with 1 line
+# x values are a view of the shared mission timebase, one y sample per packet
 class DynamicPlotter(BaseDynamicPlotter):
 
-    def __init__(self, plot, title, timewindow, x_unit, y_unit):
-        super().__init__(plot, title, timewindow, x_unit, y_unit)
-        self.databuffer = deque([0.0] * timewindow, maxlen=timewindow)
-        self.x = np.linspace(-timewindow, 0, timewindow)
-        self.y = np.zeros(self.databuffer.maxlen, dtype=float)
-        self.curve = self.plt.plot(self.x, self.y, pen=self.get_pen_color(self.base_line_color_idx))
+    def __init__(self, plot, title, timewindow, x_unit, y_unit, timebase=None):
+        super().__init__(plot, title, timewindow, x_unit, y_unit, timebase)
+        self.y = RingBuffer(timewindow)
+        if plot is not None:
+            self.build(plot)
+
+    def setup(self):
+        self.curve = self.plt.plot(self.timebase.view(), self.y.view(), pen=self.get_pen_color(self.base_line_color_idx), connect='finite')
         #self.plt.getViewBox().setLimits(xMin=-5, xMax=5000, minXRange=5, yMin=-10000, yMax=10000, minYRange=2)
         self.plt.setXRange(-20, 0)
-    def update_plot(self, new_val):
-
-        current_time = time.time()
-
-        time_diff = (current_time - self.last_time) if self.last_time else 0
-            
-        self.last_time = current_time
 
-        self.databuffer.append(new_val)
-        self.y[:] = self.databuffer
+    def curves(self):
+        return [self.curve]
 
-        self.x = np.roll(self.x, -1)
-        self.x[-1] = self.x[-2] + time_diff
+    def update_plot(self, new_val):
+        self.y.append(np.nan if new_val is None else new_val)
+        self.sample_added()
 
-        self.curve.setData(self.x, self.y)
-        self.plt.setXRange(self.x[-1] - 50, self.x[-1])
+    def redraw(self):
+        latest_time = self.timebase.last()
+        self.curve.setData(self.timebase.view(), self.y.view(), connect='finite')
+        self.plt.setXRange(latest_time - 50, latest_time)
     
     def reset_plot(self):
-        self.databuffer = deque([0.0] * self.timewindow, maxlen=self.timewindow)
-        self.x = np.linspace(-self.timewindow, 0, self.timewindow)
-        self.y[:] = 0
-        self.curve.setData(self.x, self.y)
-        self.last_time = None
+        self.y.reset()
+        if self.built:
+            self.curve.setData(self.timebase.view(), self.y.view(), connect='finite')
+        self.clear_glitches()
 
 # Plotting system for graphs with multiple lines
 class DynamicPlotter_MultiLine(BaseDynamicPlotter):
-    def __init__(self, plot, title, timewindow, num_lines, x_unit, y_unit):
-        super().__init__(plot, title, timewindow, x_unit, y_unit)
+    def __init__(self, plot, title, timewindow, num_lines, x_unit, y_unit, timebase=None, label_names=None):
+        super().__init__(plot, title, timewindow, x_unit, y_unit, timebase)
         self.num_lines = num_lines
-        self.databuffer = [deque([0.0] * timewindow, maxlen=timewindow) for _ in range(num_lines)]
-        self.x = np.linspace(-timewindow, 0, timewindow)
-        self.y = np.zeros(shape=(self.num_lines, timewindow), dtype=float)
+        self.y = RingBuffer(timewindow, width=num_lines)
+        self.label_names = label_names or ["R/X", "P/Y", "Y/Z"]
+        if plot is not None:
+            self.build(plot)
+
+    def setup(self):
         self.plt.getViewBox().setLimits(xMin=-5, xMax=5000, minXRange=5, yMin=-10000, yMax=10000, minYRange=2)
         self.curve = [
-            self.plt.plot(self.x, self.y[i], pen=self.get_pen_color(self.base_line_color_idx + i))
+            self.plt.plot(self.timebase.view(), self.y.view()[:, i], pen=self.get_pen_color(self.base_line_color_idx + i), connect='finite')
             for i in range(self.num_lines)
         ]
 
-        label_names = ["R/X", "P/Y", "Y/Z"]
         self.labels = []
 
         for i in range(min(self.num_lines, 3)):
             pen = self.get_pen_color(self.base_line_color_idx + i)
             color = pen.color()  # Extract QColor from QPen
-            label = pg.TextItem(label_names[i], anchor=(0, 0.5), color=color)
+            label = pg.TextItem(self.label_names[i], anchor=(0, 0.5), color=color)
             self.labels.append(label)
             self.plt.addItem(label)
 
-        self.last_time = None
+    def curves(self):
+        return self.curve
 
     def update_plot(self, new_vals):
+        self.y.append([np.nan if val is None else val for val in new_vals])
+        self.sample_added()
 
-        current_time = time.time()
-        time_diff = (current_time - self.last_time) if self.last_time else 0
-        self.last_time = current_time
-
-        for i in range(self.num_lines):
-            if new_vals[i] is not None:
-                self.databuffer[i].append(new_vals[i])
-                self.y[i] = self.databuffer[i]
-
-        self.x = np.roll(self.x, -1)
-        self.x[-1] = self.x[-2] + time_diff
-
+    def redraw(self):
+        x = self.timebase.view()
+        y = self.y.view()
         for i in range(self.num_lines):
-            self.curve[i].setData(self.x, self.y[i])
+            self.curve[i].setData(x, y[:, i], connect='finite')
 
         # Update only the first 3 labels
+        latest_x = self.timebase.last()
         for i in range(min(self.num_lines, 3)):
-            latest_x = self.x[-1]
-            latest_y = self.y[i][-1]
-            self.labels[i].setPos(latest_x, latest_y)
+            latest_y = y[-1, i]
+            if not np.isnan(latest_y):
+                self.labels[i].setPos(latest_x, latest_y)
     
     def reset_plot(self):
-        self.databuffer = [deque([0.0] * self.timewindow, maxlen=self.timewindow) for _ in range(self.num_lines)]
-        self.x = np.linspace(-self.timewindow, 0, self.timewindow)
-        self.y[:] = 0
-        for i in range(self.num_lines):
-            self.curve[i].setData(self.x, self.y[i])
-        self.last_time = None
+        self.y.reset()
+        if self.built:
+            x = self.timebase.view()
+            for i in range(self.num_lines):
+                self.curve[i].setData(x, self.y.view()[:, i], connect='finite')
+        self.clear_glitches()
+
+# Whole-flight GPS track drawn over map tiles, in Web Mercator meters.
+# Tiles for the visible area come from the disk cache, decoded ones are kept in a small LRU.
+class GroundTrackPlotter(BaseDynamicPlotter):
+
+    max_tiles = 64          # per view, more means the zoom level is off
+    max_pixmaps = 256
+
+    def __init__(self, plot, title, timewindow, tile_cache, init_lat, init_lon):
+        super().__init__(plot, title, timewindow, "", "")
+        self.tiles = tile_cache
+        self.track = GroundTrack()
+        self.tile_items = {}            # (z, x, y) -> pixmap item in the view
+        self.pixmaps = OrderedDict()    # (z, x, y) -> QPixmap
+        self.init_lat, self.init_lon = init_lat, init_lon
+        if plot is not None:
+            self.build(plot)
+
+    def setup(self):
+        self.plt.setAspectLocked(True)
+        self.plt.hideAxis('bottom')
+        self.plt.hideAxis('left')
+        self.plt.showGrid(x=False, y=False)
+
+        self.curve = self.plt.plot([], [], pen=self.get_pen_color(2))
+        self.curve.setZValue(10)
+        self.marker = pg.ScatterPlotItem(size=12, brush=pg.mkBrush(255, 0, 0))
+        self.marker.setZValue(11)
+        self.plt.addItem(self.marker)
+
+        self.center_on(self.init_lat, self.init_lon, span_m=2000.0)
+        self.plt.getViewBox().sigRangeChanged.connect(self.update_tiles)
+
+    def curves(self):
+        return [self.curve]
+
+    def center_on(self, lat, lon, span_m=None):
+        if not self.built:
+            self.init_lat, self.init_lon = lat, lon
+            return
+        x, y = to_mercator(lat, lon)
+        self.center_on_xy(float(x), float(y), span_m)
 
-# Plotting system where both x and y axis require updates from data
-class DynamicPlotter_2d(BaseDynamicPlotter):
-    def __init__(self, plot, title, timewindow, x_unit, y_unit, init_x=0.0, init_y=0.0):
-        super().__init__(plot, title, timewindow, x_unit, y_unit)
-        self.databuffer_x = deque([init_x] * timewindow, maxlen=timewindow)
-        self.databuffer_y = deque([init_y] * timewindow, maxlen=timewindow)
-        self.x = np.full(timewindow, init_x, dtype=float)
-        self.y = np.full(timewindow, init_y, dtype=float)
+    def center_on_xy(self, x, y, span_m=None):
+        if span_m is None:
+            (x0, x1), (y0, y1) = self.plt.getViewBox().viewRange()
+            span_m = max(x1 - x0, y1 - y0)
+        self.plt.setRange(xRange=(x - span_m / 2, x + span_m / 2), yRange=(y - span_m / 2, y + span_m / 2), padding=0)
 
-        self.curve = self.plt.plot(self.x, self.y, pen=self.get_pen_color(self.base_line_color_idx))
+    def update_plot(self, lat, lon):
+        if not valid_fix(lat, lon):
+            return
+        self.track.append(lat, lon)
+        self.sample_added()
 
-    def update_plot(self, new_val_x, new_val_y):
+    def redraw(self):
+        if self.track.last is None:
+            return
+        points = self.track.points()
+        self.curve.setData(points[:, 0], points[:, 1])
+        x, y = self.track.last
+        self.marker.setData([x], [y])
+        # Follow the CanSat once it leaves the view
+        if not self.plt.getViewBox().viewRect().contains(x, y):
+            self.center_on_xy(x, y)
+
+    def mark_glitch(self, lat, lon):
+        if valid_fix(lat, lon):
+            x, y = to_mercator(lat, lon)
+            super().mark_glitch(float(x), float(y))
+
+    # Slippy map zoom whose tiles come out close to 256 screen pixels
+    def tile_zoom(self):
+        view = self.plt.getViewBox()
+        (x0, x1), _ = view.viewRange()
+        width_px = max(view.width(), 1.0)
+        world_px = 2 * math.pi * EARTH_RADIUS_M * width_px / (x1 - x0)
+        return int(min(18, max(0, round(math.log2(world_px / TILE_SIZE_PX)))))
+
+    def update_tiles(self, *args):
+        z = self.tile_zoom()
+        n = 2 ** z
+        size = 2 * math.pi * EARTH_RADIUS_M / n
+        half = math.pi * EARTH_RADIUS_M
+        (x0, x1), (y0, y1) = self.plt.getViewBox().viewRange()
+        tx0, tx1 = max(0, int((x0 + half) // size)), min(n - 1, int((x1 + half) // size))
+        ty0, ty1 = max(0, int((half - y1) // size)), min(n - 1, int((half - y0) // size))
+        wanted = {(z, tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)}
+        if len(wanted) > self.max_tiles:
+            return
 
-        self.databuffer_x.append(new_val_x)
-        self.databuffer_y.append(new_val_y)
-        self.x[:] = self.databuffer_x
-        self.y[:] = self.databuffer_y
+        for key in list(self.tile_items):
+            if key not in wanted:
+                self.plt.removeItem(self.tile_items.pop(key))
+        for key in wanted:
+            if key not in self.tile_items:
+                self.place_tile(key, size, half)
+
+    def place_tile(self, key, size, half):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            data = self.tiles.get(key)
+            if data is None:
+                return      # queued for download, poll_tiles() places it
+            pixmap = QPixmap()
+            if not pixmap.loadFromData(data):
+                return
+            self.pixmaps[key] = pixmap
+            if len(self.pixmaps) > self.max_pixmaps:
+                self.pixmaps.popitem(last=False)
+        else:
+            self.pixmaps.move_to_end(key)
+
+        _, tx, ty = key
+        item = QGraphicsPixmapItem(pixmap)
+        # Image rows go down, north goes up in the view
+        item.setTransform(QTransform.fromScale(size / TILE_SIZE_PX, -size / TILE_SIZE_PX))
+        item.setPos(-half + tx * size, half - ty * size)
+        item.setZValue(-10)
+        self.plt.addItem(item)
+        self.tile_items[key] = item
+
+    def poll_tiles(self):
+        if self.tiles.poll() and self.built:
+            self.update_tiles()
 
-        self.curve.setData(self.x, self.y)
-    
     def reset_plot(self):
-        last_x = self.databuffer_x[-1] if self.databuffer_x else 0.0
-        last_y = self.databuffer_y[-1] if self.databuffer_y else 0.0
-        self.databuffer_x = deque([last_x] * self.timewindow, maxlen=self.timewindow)
-        self.databuffer_y = deque([last_y] * self.timewindow, maxlen=self.timewindow)
-        self.x[:] = last_x
-        self.y[:] = last_y
-        self.curve.setData(self.x, self.y)
+        self.track.reset()
+        if self.built:
+            self.curve.setData([], [])
+            self.marker.clear()
+        self.clear_glitches()
+
+# Spectrogram of one channel with its newest spectrum underneath, columns come from the SpectralEngine
+class SpectrogramPlotter(BaseDynamicPlotter):
+    def __init__(self, plot, spectrum_plot, title, spectral, channel):
+        super().__init__(plot, title, spectral.nfft, "s", "Hz")
+        self.spectral = spectral
+        self.channel = channel
+        if plot is not None:
+            self.build(plot, spectrum_plot)
+
+    def build(self, plot, spectrum_plot):
+        self.spectrum_plt = spectrum_plot
+        super().build(plot)
+
+    def setup(self):
+        self.image = pg.ImageItem()
+        self.image.setColorMap(pg.colormap.get('viridis'))
+        self.plt.addItem(self.image)
+
+        self.spectrum_plt.showGrid(x=True, y=True)
+        self.spectrum_plt.getAxis('bottom').setLabel('<span style="font-family: Monospace; font-size:12pt;">Hz</span>')
+        self.spectrum_plt.getAxis('left').setLabel('<span style="font-family: Monospace; font-size:12pt;">amplitude</span>')
+        self.spectrum_curve = self.spectrum_plt.plot([], [], pen=self.get_pen_color(2))
+        self.peak_label = pg.TextItem("", anchor=(0, 1), color=(0, 0, 0))
+        self.spectrum_plt.addItem(self.peak_label)
+
+    def set_channel(self, channel):
+        self.channel = channel
+        self.update_plot()
+
+    def redraw(self):
+        self.update_plot()
+
+    def update_plot(self):
+        if not self.built:
+            return
+        stft = self.spectral.channels[self.channel]
+        columns = stft.spectrogram.valid()
+        if len(columns) == 0 or math.isnan(stft.sample_rate):
+            self.reset_plot()
+            return
+
+        # Columns are hop packets apart, the image spans them on the mission time axis
+        times = stft.column_times.valid()
+        column_width = stft.hop / stft.sample_rate
+        self.image.setImage(20 * np.log10(columns + 1e-6), autoLevels=True)
+        self.image.setRect(QRectF(times[0] - column_width, 0.0,
+                                  times[-1] - times[0] + column_width, stft.sample_rate / 2))
+
+        freqs = stft.frequencies
+        self.spectrum_curve.setData(freqs, columns[-1])
+        peak = stft.peak_frequency()
+        self.peak_label.setText(f"peak {peak:.3f} Hz ({1.0 / peak:.1f} s)")
+        self.peak_label.setPos(peak, float(columns[-1][1:].max()))
+
+    def reset_plot(self):
+        if not self.built:
+            return
+        self.image.clear()
+        self.spectrum_curve.setData([], [])
+        self.peak_label.setText("")
+
+def new_plot_widget():
+    graph = pg.PlotWidget()
+    graph.setBackground('w')
+    graph.setAlignment(Qt.AlignmentFlag.AlignCenter)
+    return graph
+
+# New empty tab, returns the layout its widgets go into
+def add_tab(tab_widget, title):
+    tab_content = QGroupBox()
+    tab_layout = QVBoxLayout()
+    tab_content.setLayout(tab_layout)
+    tab_widget.addTab(tab_content, title)
+    return tab_layout
+
+# New tab holding one plot widget
+def add_plot_tab(tab_widget, title):
+    graph = new_plot_widget()
+    add_tab(tab_widget, title).addWidget(graph)
+    return graph
+
+# Plotter class for a GRAPH_INFO entry
+def make_plotter(entry, graph, timewindow, timebase, tile_cache):
+    if entry["lines"] == 1 and entry["2d"] is False:
+        return DynamicPlotter(graph, title=entry["title"], timewindow=timewindow, x_unit=entry["x_unit"],
+                              y_unit=entry["y_unit"], timebase=timebase)
+    if entry["lines"] > 1 and entry["2d"] is False:
+        return DynamicPlotter_MultiLine(graph, title=entry["title"], timewindow=timewindow, num_lines=entry["lines"],
+                                        x_unit=entry["x_unit"], y_unit=entry["y_unit"], timebase=timebase,
+                                        label_names=entry.get("labels"))
+    init_lat = 38.149574
+    init_long = -79.0737
+    return GroundTrackPlotter(graph, title=entry["title"], timewindow=timewindow,
+                              tile_cache=tile_cache, init_lat=init_lat, init_lon=init_long)
+
+# Runs on the log loader's thread: backfills the ground session at path from an onboard log,
+# errors are returned for the GUI to report
+def backfill_worker(path, onboard):
+    try:
+        return backfill_file(path, onboard)
+    except (OSError, KeyError, ValueError) as e:
+        return e
 
 class CommandButtonGroup(Enum):
     MAIN = 0
@@ -259,9 +572,12 @@ class GroundStationApp(QMainWindow):
     # Emit a signal when serial data is received
     __data_received = pyqtSignal()
 
-    def __init__(self):
+    # follow: path of a session file another instance is writing, shown read-only
+    # startup: StartupTimer of the launch, the window's phases are added to it
+    def __init__(self, follow=None, startup=None):
 
         super().__init__()
+        self.startup = startup or StartupTimer()
         
         self.__data_received.connect(self.process_data)
 
@@ -271,30 +587,65 @@ class GroundStationApp(QMainWindow):
         self.__available_ports              = None
         self.__cansat_mode                  = "FLIGHT"
         self.__PORT_SELECTED_INFO           = None
-        self.__serial                       = QSerialPort()
+        self.__receivers                    = {}
+        self.__uplink_port_name             = None
+        self.__logfile_port_name            = None
+        self.__merger                       = TelemetryMerger()
         self.__TEAM_ID                      = 3114
         self.__packet_recv_count            = 0
         self.__packet_sent_count            = 0
         self.__graph_time_window            = 500
-        self.__csv_file                     = None
-        self.__csv_writer                   = None
+        self.__stats_window                 = 120
+        self.__session                      = None
+        self.__follower                     = None
+        self.mission_db                     = None
+        self.telemetry_ring                 = None
+        self.telemetry_server               = None
         self.__outfile                      = None
         self.__write_to_logfile             = 0
-        self.__serial.setBaudRate(57600)
-        self.__serial.readyRead.connect(self.recv_data)
-        self.__serial.errorOccurred.connect(self.handle_serial_error)
+        self.__log_loader                   = None
+        self.__log_progress                 = None
+        self.loaded_log                     = None
+        self.log_load_timer = QTimer()
+        self.log_load_timer.timeout.connect(self.poll_log_load)
+        self.__command_queue                = CommandScheduler(self.send_data)
+        self.__command_queue.on_ack         = self.command_acked
+        self.__command_queue.on_retry       = self.command_retried
+        self.__command_queue.on_fail        = self.command_failed
+        self.command_timer = QTimer()
+        self.command_timer.timeout.connect(self.__command_queue.poll)
+        self.command_timer.start(20)
+        # Single shot timer re-armed for each SIMP deadline
         self.simp_timer = QTimer()
+        self.simp_timer.setSingleShot(True)
+        self.simp_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.simp_timer.timeout.connect(self.send_simp_data)
-        self.simp_data                      = []
-        self.current_simp_idx               = 0
+        self.__simp_streamer                = SimpStreamer(self.send_data)
+        self.__simp_rate_hz                 = None
         self.__servo_id                     = -1
         self.__servo_val                    = -1
         self.__camera_id                    = "NONE"
         self.__set_time_id                  = 1
-        self.__last_gyro_r                  = 0.0
-        self.__last_gyro_p                  = 0.0
-        self.__last_gyro_y                  = 0.0
+        self.derived_channels               = DerivedChannelEngine()
+        self.glitch_filter                  = GlitchFilterStage()
+        self.altitude_estimator             = AltitudeEstimator()
+        self.attitude                       = AttitudeEstimator()
+        self.alerts                         = AlertEngine()
+        self.spectral                       = SpectralEngine()
+        self.tile_cache                     = TileCache()
+        # Packet gap alerts need a clock, there's no packet to trigger them
+        self.alert_timer = QTimer()
+        self.alert_timer.timeout.connect(lambda: self.handle_alerts(self.alerts.check_gaps()))
+        self.alert_timer.timeout.connect(self.check_background_errors)
+        self.alert_timer.start(500)
+        self.display_governor               = DisplayGovernor()
+        self.__sidebar_pending              = {}
+        self.display_timer = QTimer()
+        self.display_timer.timeout.connect(self.display_frame)
+        self.display_timer.start(int(1000 * self.display_governor.frame_s))
         self.__log_repeat_count              = 0
+        self.__protocol                     = MessageRegistry(default=self.handle_message)
+        self.register_message_handlers()
         self.__last_msg, self.__last_color = None, None
         self.setWindowTitle("CANSAT Ground Station")
         self.setWindowIcon(QIcon('icon.png'))
@@ -303,6 +654,7 @@ class GroundStationApp(QMainWindow):
         tray.setIcon(QIcon('icon.png'))
         tray.setVisible(True)
         tray.show()
+        self.startup.mark("engines")
 
         # ------ FONTS ------ #
         button_font = QFont()
@@ -404,14 +756,39 @@ class GroundStationApp(QMainWindow):
 
         self.button_show_map = QPushButton("SHOW MAP")
         self.button_show_map.setFont(button_font)
-        self.button_show_map.clicked.connect(lambda: self.update_map_view(self.GPS_LAT, self.GPS_LONG))
+        self.button_show_map.clicked.connect(lambda: self.show_ground_track(self.GPS_LAT, self.GPS_LONG))
         self.button_show_map.hide()
 
-        self.button_reset_mission = QPushButton("CLEAR PLOTS, COMMAND LOG, CSV FILE")
+        self.button_reset_mission = QPushButton("CLEAR PLOTS, COMMAND LOG, NEW CSV FILE")
         self.button_reset_mission.setFont(button_font)
         self.button_reset_mission.clicked.connect(self.reset_mission)
         self.button_reset_mission.hide()
 
+        self.button_resume_session = QPushButton("RESUME LAST SESSION")
+        self.button_resume_session.setFont(button_font)
+        self.button_resume_session.clicked.connect(self.resume_session)
+        self.button_resume_session.hide()
+
+        self.button_mission_db = QPushButton("MISSION DATABASE: ON")
+        self.button_mission_db.setFont(button_font)
+        self.button_mission_db.clicked.connect(self.toggle_mission_db)
+        self.button_mission_db.hide()
+
+        self.button_telemetry_server = QPushButton("TELEMETRY SERVER: LOCAL")
+        self.button_telemetry_server.setFont(button_font)
+        self.button_telemetry_server.clicked.connect(self.cycle_telemetry_server)
+        self.button_telemetry_server.hide()
+
+        self.button_glitch_filter = QPushButton("GLITCH FILTER: ON")
+        self.button_glitch_filter.setFont(button_font)
+        self.button_glitch_filter.clicked.connect(self.toggle_glitch_filter)
+        self.button_glitch_filter.hide()
+
+        self.button_reload_alerts = QPushButton("RELOAD ALERT RULES")
+        self.button_reload_alerts.setFont(button_font)
+        self.button_reload_alerts.clicked.connect(self.reload_alert_rules)
+        self.button_reload_alerts.hide()
+
         self.button_sim_mode_enable = QPushButton("SIM MODE ENABLE")
         self.button_sim_mode_enable.setFont(button_font)
         self.button_sim_mode_enable.clicked.connect(lambda: self.change_sim_mode("ENABLE"))
@@ -427,6 +804,11 @@ class GroundStationApp(QMainWindow):
         self.button_sim_mode_disable.clicked.connect(lambda: self.change_sim_mode("DISABLE"))
         self.button_sim_mode_disable.hide()
 
+        self.button_simp_pause = QPushButton("PAUSE/RESUME SIMP")
+        self.button_simp_pause.setFont(button_font)
+        self.button_simp_pause.clicked.connect(self.pause_resume_simp)
+        self.button_simp_pause.hide()
+
         self.button_refresh_ports = QPushButton("REFRESH PORTS")
         self.button_refresh_ports.setFont(button_font)
         self.button_refresh_ports.clicked.connect(lambda: self.refresh_ports(True))
@@ -437,6 +819,11 @@ class GroundStationApp(QMainWindow):
         self.button_get_log_data.clicked.connect(self.get_log_data)
         self.button_get_log_data.hide()
 
+        self.button_load_log = QPushButton("LOAD LOG FILE")
+        self.button_load_log.setFont(button_font)
+        self.button_load_log.clicked.connect(self.open_log_file)
+        self.button_load_log.hide()
+
         self.button_sensor_control = QPushButton("SENSOR CONTROL")
         self.button_sensor_control.setFont(button_font)
         self.button_sensor_control.clicked.connect(lambda: self.command_group_change_buttons(CommandButtonGroup.SENSORS))
@@ -557,6 +944,21 @@ class GroundStationApp(QMainWindow):
         self.team_id_field_info.hide()
         self.team_id_field.hide()
 
+        self.simp_rate_field = QLineEdit()
+        self.simp_rate_field.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
+        self.simp_rate_field.setMaxLength(6)
+        self.simp_rate_field.setPlaceholderText("1")
+        self.simp_rate_field.setStyleSheet(self.team_id_field.styleSheet())
+        self.simp_rate_field.setValidator(QDoubleValidator(0.01, 1000.0, 2, self))
+        self.simp_rate_field.editingFinished.connect(self.simp_rate_edited)
+        self.simp_rate_field_info = QLabel("SIMP rate (Hz)")
+        self.simp_rate_field_info.setFont(button_font)
+        simp_rate_box = QHBoxLayout()
+        simp_rate_box.addWidget(self.simp_rate_field_info)
+        simp_rate_box.addWidget(self.simp_rate_field)
+        self.simp_rate_field_info.hide()
+        self.simp_rate_field.hide()
+
         commands_layout.addWidget(self.button_connection_group)
         commands_layout.addWidget(self.combo_select_port)
         commands_layout.addWidget(self.button_connect)
@@ -575,13 +977,21 @@ class GroundStationApp(QMainWindow):
         commands_layout.addWidget(self.button_advanced)
         commands_layout.addLayout(set_time_box)
         commands_layout.addWidget(self.button_reset_mission)
+        commands_layout.addWidget(self.button_resume_session)
         commands_layout.addWidget(self.button_show_map)
+        commands_layout.addWidget(self.button_mission_db)
+        commands_layout.addWidget(self.button_telemetry_server)
+        commands_layout.addWidget(self.button_glitch_filter)
+        commands_layout.addWidget(self.button_reload_alerts)
         commands_layout.addWidget(self.button_sim_mode_enable)
         commands_layout.addWidget(self.button_sim_mode_activate)
         commands_layout.addWidget(self.button_sim_mode_disable)
         commands_layout.addWidget(self.button_get_log_data)
+        commands_layout.addWidget(self.button_load_log)
         commands_layout.addWidget(self.probe_release_force)
         commands_layout.addLayout(team_id_editing_box)
+        commands_layout.addWidget(self.button_simp_pause)
+        commands_layout.addLayout(simp_rate_box)
         commands_layout.addWidget(self.button_back)
 
         grid_layout.setColumnStretch(0,1)
@@ -600,8 +1010,14 @@ class GroundStationApp(QMainWindow):
         self.buttons_adv = [
             self.button_show_map,
             self.button_reset_mission,
+            self.button_resume_session,
+            self.button_mission_db,
+            self.button_telemetry_server,
+            self.button_glitch_filter,
+            self.button_reload_alerts,
             self.button_back,
             self.button_get_log_data,
+            self.button_load_log,
             self.team_id_field,
             self.team_id_field_info,
         ]
@@ -617,6 +1033,9 @@ class GroundStationApp(QMainWindow):
             self.button_sim_mode_enable,
             self.button_sim_mode_disable,
             self.button_sim_mode_activate,
+            self.button_simp_pause,
+            self.simp_rate_field_info,
+            self.simp_rate_field,
             self.button_back,
         ]
 
@@ -765,6 +1184,21 @@ class GroundStationApp(QMainWindow):
             }
         """)
 
+        # Active alerts, so trouble shows without watching every tab
+        self.alert_banner = QLabel("")
+        self.alert_banner.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.alert_banner.setFont(graph_sidebar_font)
+        self.alert_banner.setWordWrap(True)
+        self.update_alert_banner()
+
+        # Shows when the display is behind the packets, so a lagging plot isn't taken for the payload
+        self.display_banner = QLabel("")
+        self.display_banner.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.display_banner.setFont(graph_sidebar_font)
+        self.update_display_banner()
+
+        log_layout.addWidget(self.alert_banner)
+        log_layout.addWidget(self.display_banner)
         log_layout.addWidget(log_title)
         log_layout.addWidget(self.gui_log)
 
@@ -776,6 +1210,8 @@ class GroundStationApp(QMainWindow):
         grid_layout.addWidget(log_widget, 0, 2)
         # ------ END LOG GROUP ------ #
 
+        self.startup.mark("controls")
+
         # ------ GRAPH GROUP ------ #
         graph_parent_group = QHBoxLayout()
         self.tab_widget = QTabWidget()
@@ -801,20 +1237,8 @@ class GroundStationApp(QMainWindow):
 
         self.graphs = []
         self.plotters = []
+        self.timebase = MissionTimebase(self.__graph_time_window)
 
-        graph_info = [
-            {"title": "Altitude", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m"},
-            {"title": "Temperature", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "°C"},
-            {"title": "Pressure", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "kPa"},
-            {"title": "Voltage", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "V"},
-            {"title": "Gyro", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "deg/s"},
-            {"title": "Accel RPY ", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "deg/s^2"},
-            {"title": "Accel XYZ", "lines": 3, "2d": False, "x_unit": "s", "y_unit":"m/s^2"},
-            {"title": "Magnetometer", "lines": 3, "2d": False, "x_unit": "s", "y_unit": "G"},
-            {"title": "Rotation", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "deg/s"},
-            {"title": "GPS Lat v Long", "lines": 1, "2d": True, "x_unit": "Latitude", "y_unit": "Longitude"},
-            {"title": "GPS Altitude", "lines": 1, "2d": False, "x_unit": "s", "y_unit": "m"}
-        ]   
         
         self.graph_title_to_index = {
             "Altitude" : 0,
@@ -828,42 +1252,55 @@ class GroundStationApp(QMainWindow):
             "Rotation" : 8,
             "GPS" : 9,
             "GPS Altitude": 10,
+            "Vertical Velocity": 11,
+            "Pressure Altitude": 12,
+            "Ground Speed": 13,
+            "Altitude Estimate": 14,
+            "Attitude": 15,
+            "Spectrogram": 16,
         }
 
-        # Loop through each graph and create a plot using the plot classes
-        # Add the graph to a new tab and store plots for updating later
-        for entry in graph_info:
-
-            tab_content = QGroupBox()
-            tab_layout = QVBoxLayout()
-
-            graph = pg.PlotWidget()
-            graph.setBackground('w')
-            graph.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            tab_layout.addWidget(graph)
-
-            tab_content.setLayout(tab_layout)
-
-            self.tab_widget.addTab(tab_content, entry["title"])
-
-            self.graphs.append(graph)
-
-            if entry["lines"] == 1 and entry["2d"] is False:
-                plotter = DynamicPlotter(graph, title=entry["title"], timewindow=self.__graph_time_window,x_unit=entry["x_unit"],y_unit=entry["y_unit"])
-            elif entry["lines"] > 1 and entry["2d"] is False:
-                plotter = DynamicPlotter_MultiLine(graph, title=entry["title"], 
-                                                   timewindow=self.__graph_time_window, num_lines=entry["lines"],
-                                                   x_unit=entry["x_unit"],y_unit=entry["y_unit"])
-            else:
-                init_lat = 38.149574
-                init_long = 79.0737
-                plotter = DynamicPlotter_2d(
-                    graph, title=entry["title"], timewindow=self.__graph_time_window,
-                    x_unit=entry["x_unit"], y_unit=entry["y_unit"],
-                    init_x=init_lat, init_y=init_long
-                )
+        # Plot that shows each glitch-filtered field
+        self.glitch_plot_titles = {
+            "ALTITUDE": "Altitude",
+            "TEMPERATURE": "Temperature",
+            "PRESSURE": "Pressure",
+            "VOLTAGE": "Voltage",
+            "AUTO_GYRO_ROTATION_RATE": "Rotation",
+            "GPS_ALTITUDE": "GPS Altitude",
+        }
 
-            self.plotters.append(plotter)
+        # Loop through each graph and create a plot using the plot classes
+        # Plotters store samples from the start, the plot widget of a tab is
+        # only built the first time the tab is shown (build_tab)
+        self.plot_tabs = []
+        for entry in GRAPH_INFO:
+            self.plot_tabs.append(add_tab(self.tab_widget, entry["title"]))
+            self.graphs.append(None)
+            self.plotters.append(make_plotter(entry, None, self.__graph_time_window, self.timebase, self.tile_cache))
+
+        # Spectrogram tab, one channel at a time
+        self.plot_tabs.append(add_tab(self.tab_widget, "Spectrogram"))
+        self.spectral_channel_box = QComboBox()
+        self.spectral_channel_box.addItems(SPECTRAL_CHANNELS)
+        self.plot_tabs[-1].addWidget(self.spectral_channel_box)
+        self.graphs.append(None)
+
+        self.spectrogram_plotter = SpectrogramPlotter(None, None, "Spectrogram", self.spectral, SPECTRAL_CHANNELS[0])
+        self.spectral_channel_box.currentTextChanged.connect(self.spectrogram_plotter.set_channel)
+        self.plotters.append(self.spectrogram_plotter)
+        self.tab_widget.currentChanged.connect(self.build_tab)
+        self.build_tab(self.tab_widget.currentIndex())
+        # Redraw when shown, the image isn't drawn while another tab is up
+        self.tab_widget.currentChanged.connect(self.spectrogram_tab_changed)
+        self.tab_widget.currentChanged.connect(self.apply_display_level)
+
+        # Map tiles are downloaded in the background, place them as they arrive
+        self.tile_timer = QTimer()
+        self.tile_timer.timeout.connect(self.plotters[self.graph_title_to_index.get("GPS")].poll_tiles)
+        self.tile_timer.start(250)
+
+        self.startup.mark("plots")
 
         # Sidebar to show all current graph values
         sidebar_widget = QWidget()
@@ -901,8 +1338,56 @@ class GroundStationApp(QMainWindow):
             ("GPS Long", "0.0000°"),
             ("GPS Altitude", "0.0 m"),
             ("GPS Time", "00:00:00"),
+            ("Vert Velocity", "0.0 m/s"),
+            ("Press Altitude", "0.0 m"),
+            ("Ground Speed", "0.0 m/s"),
+            ("KF Altitude", "0.0 m"),
+            ("KF Velocity", "0.0 m/s"),
+            ("Landing In", "N/A"),
+            ("Apogee", "N/A"),
+            ("Roll", "0.0°"),
+            ("Pitch", "0.0°"),
+            ("Heading", "0°"),
         ]
 
+        # Telemetry field behind each sidebar row, used for the rolling stats
+        sidebar_stats_fields = {
+            "Altitude": "ALTITUDE",
+            "Temperature": "TEMPERATURE",
+            "Pressure": "PRESSURE",
+            "Voltage": "VOLTAGE",
+            "Gyro R": "GYRO_R",
+            "Gyro P": "GYRO_P",
+            "Gyro Y": "GYRO_Y",
+            "Accel X": "ACCEL_R",
+            "Accel Y": "ACCEL_P",
+            "Accel Z": "ACCEL_Y",
+            "RAccel R": "ANGULAR_ACCEL_R",
+            "RAccel P": "ANGULAR_ACCEL_P",
+            "RAccel Y": "ANGULAR_ACCEL_Y",
+            "Mag R": "MAG_R",
+            "Mag P": "MAG_P",
+            "Mag Y": "MAG_Y",
+            "Rotation": "AUTO_GYRO_ROTATION_RATE",
+            "GPS Lat": "GPS_LATITUDE",
+            "GPS Long": "GPS_LONGITUDE",
+            "GPS Altitude": "GPS_ALTITUDE",
+            "Vert Velocity": "VERTICAL_VELOCITY",
+            "Press Altitude": "PRESSURE_ALTITUDE",
+            "Ground Speed": "GPS_GROUND_SPEED",
+            "KF Altitude": "KF_ALTITUDE",
+            "KF Velocity": "KF_VELOCITY",
+            "Roll": "ROLL",
+            "Pitch": "PITCH",
+        }
+        # Channels computed on the ground, logged after the competition fields
+        self.ground_channels = self.derived_channels.names + list(ESTIMATE_CHANNELS) + list(ATTITUDE_CHANNELS)
+        self.channel_stats = ChannelStatsEngine(numeric_fields + self.ground_channels, window=self.__stats_window)
+        self.sidebar_stats_labels = {}
+
+        stats_font = QFont("Roboto Mono")
+        stats_font.setPointSize(9)
+
         self.sidebar_data_labels = []
 
         self.sidebar_data_dict = {name: idx for idx, (name, _) in enumerate(sidebar_fields_data)}
@@ -919,7 +1404,18 @@ class GroundStationApp(QMainWindow):
             # Add them to your lists (or directly to your layout if needed)
             self.sidebar_data_labels.append(data_label)
 
-            self.live_graph_values.addRow(field_label, data_label)
+            if field_name in sidebar_stats_fields:
+                stats_label = QLabel("")
+                stats_label.setFont(stats_font)
+                stats_label.setStyleSheet("color: grey;")
+                self.sidebar_stats_labels[sidebar_stats_fields[field_name]] = stats_label
+                value_box = QHBoxLayout()
+                value_box.addWidget(data_label)
+                value_box.addWidget(stats_label)
+                value_box.addStretch()
+                self.live_graph_values.addRow(field_label, value_box)
+            else:
+                self.live_graph_values.addRow(field_label, data_label)
 
         form_group = QGroupBox()
         form_group.setLayout(self.live_graph_values)
@@ -934,44 +1430,54 @@ class GroundStationApp(QMainWindow):
 
         grid_layout.addLayout(graph_parent_group, 1, 0, 1, 3)
         # ------ END GRAPH GROUP ------ #
+        self.startup.mark("sidebar")
 
         # ------ START CSV FILE ------- #
-        self.__csv_file = open("cansat_data_just_need_esp_files.csv", "w", newline="")
-        self.__csv_writer = csv.DictWriter(self.__csv_file, fieldnames=csv_fields)
-        self.__csv_writer.writeheader()
+        self.__ring_dtype = ring_dtype([(field.name, field.type) for field in fields(TelemetryData)],
+                                       self.ground_channels)
+        if follow is not None:
+            # Follower: no port, no commands, nothing written, the plots come from the leader's session file
+            commands_group_box.setEnabled(False)
+            self.button_telemetry_server.setText("TELEMETRY SERVER: OFF")
+            self.__follower = SessionTail(follow, backlog_rows=self.__graph_time_window)
+            self.setWindowTitle(f"CANSAT Ground Station (FOLLOWING {os.path.basename(follow)})")
+            self.follow_timer = QTimer()
+            self.follow_timer.timeout.connect(self.follow_session)
+            self.follow_timer.start(250)
+        else:
+            # New timestamped session every start, earlier ones are kept for RESUME LAST SESSION
+            self.__session = SessionWriter(csv_fields + self.ground_channels + ["GLITCHES"])
+            self.__session.start()
+            # Telemetry, messages and commands of every session also go to one SQLite file
+            self.open_mission_db()
+            # Live packets for analysis scripts on this machine, see shared_ring.py
+            try:
+                self.telemetry_ring = TelemetryRingWriter(self.__ring_dtype)
+            except (OSError, ValueError) as e:
+                self.update_gui_log(f"ERROR: Could not create shared telemetry ring: {e}", "red")
+            # Same records streamed to viewers on other machines, see telemetry_server.py
+            self.start_telemetry_server(LOCAL_HOST)
         # ------- END CSV FILE -------- #
 
+        self.load_alert_rules()
+        self.startup.mark("session")
+
         self.showMaximized()
+        self.startup.mark("shown")
+        # Runs once the event loop has drawn the window
+        QTimer.singleShot(0, self.report_startup)
+
+    def report_startup(self):
+        self.startup.mark("first frame")
+        self.update_gui_log(self.startup.report())
     
     # ------ FUNCTIONS ------ #
-    def update_map_view(self, lat, lon):
-        try:
-            # if self.GPS_LAT or self.GPS_LONG are not valid, open a not updated map thing
-            if lat is None or lon is None or lat == 0.0 or lon == 0.0:
-                self.update_gui_log("No GPS data yet", "red")
-                return
-            '''
-            map_object = folium.Map(location=[lat, lon], zoom_start=15, prefer_canvas=True)
-            folium.Marker([lat, lon], tooltip="CanSat Location").add_to(map_object)
-
-            html = map_object.get_root().render()
-            html = html.replace(
-                    'https://unpkg.com/leaflet@1.7.1/dist/leaflet.css',
-                    'leaflet/leaflet.css'
-                ).replace(
-                    'https://unpkg.com/leaflet@1.7.1/dist/leaflet.js',
-                    'leaflet/leaflet.js'
-                )
-            
-            with open("map.html", "w", encoding="utf-8") as f:
-                f.write(html)
-        
-            webbrowser.open("map.html", new=2) '''
-            webbrowser.open(f"https://www.google.com/maps/place/{lat},{lon}", new=2) # use google maps if there is data
-
-
-        except Exception as e:
-            self.update_gui_log(f"Map update failed: {e}", "red")
+    def show_ground_track(self, lat, lon):
+        if lat is None or lon is None or lat == 0.0 or lon == 0.0:
+            self.update_gui_log("No GPS data yet", "red")
+            return
+        self.tab_widget.setCurrentIndex(self.graph_title_to_index.get("GPS"))
+        self.plotters[self.graph_title_to_index.get("GPS")].center_on(lat, lon)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -1071,52 +1577,94 @@ class GroundStationApp(QMainWindow):
             self.__PORT_SELECTED_INFO = self.__available_ports[self.combo_select_port.currentIndex()]
             self.update_gui_log("Selected port: %s" % self.combo_select_port.currentText())
     
-    # Open selected port or close it if it's open
+    # Open selected port as an extra receiver or close it if it's open
+    # The first port opened is used to send commands (uplink)
     def open_close_port(self):
-        if self.__serial.isOpen() is True:
-            self.__serial.close()
-            if self.__serial.isOpen():
-                self.update_gui_log("ERROR: Could not close port!", "red")
+        if self.__PORT_SELECTED_INFO is None:
+            if self.__receivers:
+                for port_name in list(self.__receivers):
+                    self.close_receiver(port_name)
+                self.update_gui_log("All ground ports were closed")
             else:
-                self.update_gui_log("Ground port was closed")
-                self.set_port_text_closed()
-        elif self.__PORT_SELECTED_INFO is not None:
-            self.__serial.setPort(self.__PORT_SELECTED_INFO)
-            if self.__serial.open(QIODevice.OpenModeFlag.ReadWrite):
-                self.set_port_text_open()
-                self.update_gui_log("Ground port opened")
+                self.update_gui_log("Select port before connecting!", "red")
+            return
+
+        port_name = self.__PORT_SELECTED_INFO.portName()
+        if port_name in self.__receivers:
+            self.close_receiver(port_name)
+            if port_name in self.__receivers:
+                self.update_gui_log("ERROR: Could not close port!", "red")
             else:
-                self.update_gui_log(f"FAILED to open port: {self.__PORT_SELECTED_INFO.portName()}!")
+                self.update_gui_log(f"Ground port {port_name} was closed")
+            return
+
+        serial = QSerialPort()
+        serial.setPort(self.__PORT_SELECTED_INFO)
+        serial.setBaudRate(57600)
+        serial.readyRead.connect(lambda name=port_name: self.recv_data(name))
+        serial.errorOccurred.connect(lambda error, name=port_name: self.handle_serial_error(error, name))
+        if serial.open(QIODevice.OpenModeFlag.ReadWrite):
+            self.__receivers[port_name] = serial
+            self.__merger.add_receiver(port_name)
+            if self.__uplink_port_name is None:
+                self.__uplink_port_name = port_name
+            self.set_port_text_open()
+            self.update_gui_log(f"Ground port {port_name} opened ({len(self.__receivers)} receivers)")
         else:
-            self.update_gui_log("Select port before connecting!", "red")
+            self.update_gui_log(f"FAILED to open port: {port_name}!")
+
+    def close_receiver(self, port_name):
+        serial = self.__receivers.get(port_name)
+        if serial is None:
+            return
+        if serial.isOpen():
+            serial.close()
+        if serial.isOpen():
+            return
+        del self.__receivers[port_name]
+        self.__merger.remove_receiver(port_name)
+        if self.__logfile_port_name == port_name:
+            self.stop_logfile_download()
+        if self.__uplink_port_name == port_name:
+            self.__uplink_port_name = next(iter(self.__receivers), None)
+        if self.__receivers:
+            self.set_port_text_open()
+        else:
+            self.set_port_text_closed()
+
+    def get_uplink(self):
+        if self.__uplink_port_name is None:
+            return None
+        return self.__receivers.get(self.__uplink_port_name)
 
     def check_remote_connection(self):
-        if(self.send_data("CMD,%d,TEST,X" % self.__TEAM_ID)):
+        if(self.queue_command("CMD,%d,TEST,X" % self.__TEAM_ID)):
             self.update_gui_log("Sent test message")
     
     def send_time(self):
         if(self.__set_time_id):
-           if(self.send_data("CMD,%d,ST,GPS" % (self.__TEAM_ID))):
+           if(self.queue_command("CMD,%d,ST,GPS" % (self.__TEAM_ID), retries=0)):
                 self.update_gui_log(f"Sent GPS Set Time Command") 
         else:
             utc_time = datetime.now(timezone.utc)
             time_str = utc_time.strftime("%H:%M:%S")
-            if(self.send_data("CMD,%d,ST,%s" % (self.__TEAM_ID, time_str))):
+            if(self.queue_command("CMD,%d,ST,%s" % (self.__TEAM_ID, time_str), retries=0)):
                 self.update_gui_log(f"Sent new mission time '{time_str}'")
 
     def send_restart(self):
-        if(self.send_data("CMD,%d,RR,X" % self.__TEAM_ID)):
+        if(self.queue_command("CMD,%d,RR,X" % self.__TEAM_ID, retries=0)):
             self.update_gui_log("Sent restart signal")
 
     def program_servo(self):
         if(self.__servo_id == -1 or self.__servo_val == -1):
             self.update_gui_log("ERROR: Enter a servo # and value first!", "red")
-        elif(self.send_data("CMD,%d,MEC,SERVO:%d|%d" % (self.__TEAM_ID, self.__servo_id, self.__servo_val))):
+        elif(self.queue_command("CMD,%d,MEC,SERVO:%d|%d" % (self.__TEAM_ID, self.__servo_id, self.__servo_val), replies=("SERVO",))):
             servo_label = self.servo_id_field.itemText(self.servo_id_field.findData(self.__servo_id))
             self.update_gui_log(f"Sent command to program {servo_label} to {self.__servo_val}")
 
     def toggle_camera(self):
-        if(self.send_data("CMD,%d,MEC,%s:X" % (self.__TEAM_ID, self.__camera_id))):
+        if(self.queue_command("CMD,%d,MEC,%s:X" % (self.__TEAM_ID, self.__camera_id), replies=(self.__camera_id,),
+                              retries=0)):
             self.update_gui_log(f"Sent {self.__camera_id} toggle command")
     
     def force_probe_release(self):
@@ -1128,23 +1676,23 @@ class GroundStationApp(QMainWindow):
         msg_box.setDefaultButton(QMessageBox.StandardButton.No)
         response = msg_box.exec()
         if response == QMessageBox.StandardButton.Yes:
-            if(self.send_data("CMD,%d,MEC,RELEASE:X" % self.__TEAM_ID)):
+            if(self.queue_command("CMD,%d,MEC,RELEASE:X" % self.__TEAM_ID, replies=("RELEASE",))):
                 self.update_gui_log(f"Sent force probe release command")
 
     def get_cam_status(self):
-        if(self.send_data("CMD,%d,MEC,CAMERA1_STAT:X" % self.__TEAM_ID)):
+        # Queued one after the other, CAMERA2 goes out once CAMERA1 answered or timed out
+        if(self.queue_command("CMD,%d,MEC,CAMERA1_STAT:X" % self.__TEAM_ID, replies=("CAMERA1",))):
             self.update_gui_log("Requesting CAMERA1 status")
-        time.sleep(1)
-        if(self.send_data("CMD,%d,MEC,CAMERA2_STAT:X" % self.__TEAM_ID)):
+        if(self.queue_command("CMD,%d,MEC,CAMERA2_STAT:X" % self.__TEAM_ID, replies=("CAMERA2",))):
             self.update_gui_log("Requesting CAMERA2 status")
 
 
     def change_sim_mode(self, mode):
-        if(self.send_data("CMD,%d,SIM,%s" % (self.__TEAM_ID, mode))):
+        if(self.queue_command("CMD,%d,SIM,%s" % (self.__TEAM_ID, mode))):
             self.update_gui_log(f"Sent simulation mode '{mode}'")
     
     def altitude_cal(self):
-        if(self.send_data("CMD,%d,CAL,X" % self.__TEAM_ID)):
+        if(self.queue_command("CMD,%d,CAL,X" % self.__TEAM_ID)):
             self.update_gui_log(f"Sent altitude calibration command")
 
     def get_log_data(self):
@@ -1157,17 +1705,17 @@ class GroundStationApp(QMainWindow):
 
         response = msg_box.exec()
         if response == QMessageBox.StandardButton.Yes:
-            if(self.send_data("CMD,%d,GTLOGS,X" % self.__TEAM_ID)):
+            # The payload answers with the start of the log itself, lines after it skip on_message
+            if(self.queue_command("CMD,%d,GTLOGS,X" % self.__TEAM_ID, retries=0, replies=("$LOGFILE:BEGIN",))):
                 self.update_gui_log("Attempting to retreive log data...")
         
     def toggle_transmission(self, toggle):
         if toggle:
-            if(self.send_data("CMD,%d,CX,ON" % self.__TEAM_ID)):  
+            if(self.queue_command("CMD,%d,CX,ON" % self.__TEAM_ID)):  
                 self.update_gui_log("SENT TRANSMISSION ON COMMAND")
                 self.__packet_recv_count = 0
-
-                for plotter in self.plotters:
-                    plotter.reset_plot()
+                self.__merger.reset()
+                self.reset_processing()
 
         else:
             msg_box = QMessageBox()
@@ -1179,11 +1727,10 @@ class GroundStationApp(QMainWindow):
 
             response = msg_box.exec()
             if response == QMessageBox.StandardButton.Yes:
-                if(self.send_data("CMD,%d,CX,OFF" % self.__TEAM_ID)):
+                if(self.queue_command("CMD,%d,CX,OFF" % self.__TEAM_ID)):
                     self.update_gui_log("SENT TRANSMISSION OFF COMMAND")
                     if(self.__cansat_mode == "SIM"):
-                        self.simp_timer.stop()
-                        self.current_simp_idx = 0
+                        self.stop_simp()
 
     def team_id_edited(self):
         self.team_id_field.clearFocus()
@@ -1203,60 +1750,143 @@ class GroundStationApp(QMainWindow):
     def set_time_field_edited(self, index):
         self.__set_time_id = self.set_time_field.itemData(index)
 
-    @pyqtSlot(QSerialPort.SerialPortError)
-    def handle_serial_error(self, error):
+    def handle_serial_error(self, error, port_name):
         if error == QSerialPort.SerialPortError.ResourceError:
-            self.update_gui_log("SERIAL ERROR: Device disconnected", "red")
-            self.__serial.close()
-            self.set_port_text_closed()
+            self.update_gui_log(f"SERIAL ERROR: Device on {port_name} disconnected", "red")
+            self.close_receiver(port_name)
         
         elif error == QSerialPort.SerialPortError.OpenError:
-            self.update_gui_log("SERIAL ERROR: Could not open port", "red")
+            self.update_gui_log(f"SERIAL ERROR: Could not open port {port_name}", "red")
 
         elif error == QSerialPort.SerialPortError.DeviceNotFoundError:
-            self.update_gui_log("SERIAL ERROR: Device not found", "red")
-            self.__serial.close()
-            self.set_port_text_closed()
+            self.update_gui_log(f"SERIAL ERROR: Device on {port_name} not found", "red")
+            self.close_receiver(port_name)
 
         elif error != QSerialPort.SerialPortError.NoError:
-            self.update_gui_log(f"SERIAL ERROR: {error} detected")
+            self.update_gui_log(f"SERIAL ERROR: {error} detected on {port_name}")
+
+    # Queue a command for the uplink, written later by command_timer
+    def queue_command(self, msg, **kwargs):
+        uplink = self.get_uplink()
+        if uplink is None or uplink.isOpen() is not True:
+            self.update_gui_log("ERROR: Open port before sending data!", "red")
+            return 0
+        self.__command_queue.submit(msg, **kwargs)
+        return 1
+
+    # Round trip times of the mission that just ended, one line per command type
+    def log_command_latencies(self):
+        for line in self.__command_queue.latency_summary():
+            self.update_gui_log(f"Command latency {line}")
+        self.__command_queue.histograms.clear()
+
+    def command_acked(self, cmd, latency_ms):
+        self.update_gui_log(f"ACK {cmd.cmd_type} after {latency_ms:.0f} ms")
+        if self.mission_db is not None:
+            self.mission_db.insert_command(cmd.cmd, "ACK", latency_ms)
+
+    def command_retried(self, cmd):
+        self.update_gui_log(f"No answer to '{cmd.cmd}', resending ({cmd.attempts}/{cmd.retries})", "red")
+
+    def command_failed(self, cmd):
+        self.update_gui_log(f"ERROR: No answer to '{cmd.cmd}' after {cmd.attempts} tries", "red")
+        if self.mission_db is not None:
+            self.mission_db.insert_command(cmd.cmd, "FAILED")
 
     def send_data(self, msg):
-        if self.__serial.isOpen() is True:
+        uplink = self.get_uplink()
+        if uplink is not None and uplink.isOpen() is True:
             try:
                 msg = msg + "\n"
-                self.__serial.write(msg.encode())
+                uplink.write(msg.encode())
+                if self.mission_db is not None:
+                    self.mission_db.insert_command(msg.strip(), "SENT")
                 return 1
             except Exception as e:
                 self.update_gui_log(f"ERROR: CANNOT SEND DATA - {e}", "red")
-                self.__serial.close()
-                self.set_port_text_closed()
+                self.close_receiver(self.__uplink_port_name)
         else:
             self.update_gui_log("ERROR: Open port before sending data!", "red")
             return 0
     
-    def send_simp_data(self):
-        if(self.current_simp_idx < len(self.simp_data)):
-            line = self.simp_data[self.current_simp_idx]
-            self.send_data(str(line))
-            self.current_simp_idx += 1
+    def start_simp(self):
+        try:
+            profile = load_simp_profile(DEFAULT_SIMP_FILE)
+        except FileNotFoundError:
+            self.update_gui_log(f"ERROR: Could not find SIMP data file {DEFAULT_SIMP_FILE}!", "red")
+            return
+        self.__simp_streamer.start(profile, self.__TEAM_ID, self.__simp_rate_hz)
+        self.update_gui_log(f"Streaming {len(profile)} SIMP lines at {self.__simp_streamer.rate_hz:g} Hz")
+        self.send_simp_data()
+
+    def stop_simp(self):
+        self.simp_timer.stop()
+        if self.__simp_streamer.sent:
+            self.update_gui_log(f"SIMP stopped: {self.__simp_streamer.jitter_summary()}")
+        self.__simp_streamer.stop()
+
+    def pause_resume_simp(self):
+        if not self.__simp_streamer.running:
+            self.update_gui_log("No SIMP stream running", "red")
+        elif self.__simp_streamer.paused:
+            self.__simp_streamer.resume()
+            self.update_gui_log(f"SIMP resumed at line {self.__simp_streamer.index}")
+            self.send_simp_data()
         else:
+            self.__simp_streamer.pause()
             self.simp_timer.stop()
+            self.update_gui_log(f"SIMP paused at line {self.__simp_streamer.index}")
+
+    def simp_rate_edited(self):
+        self.simp_rate_field.clearFocus()
+        try:
+            rate_hz = float(self.simp_rate_field.text())
+        except ValueError:
+            return
+        if rate_hz <= 0:
+            self.update_gui_log("ERROR: SIMP rate must be above 0 Hz", "red")
+            return
+        self.__simp_rate_hz = rate_hz
+        if self.__simp_streamer.running:
+            self.__simp_streamer.set_rate(rate_hz)
+        self.update_gui_log(f"SIMP rate set to {rate_hz:g} Hz")
 
-    def recv_data(self):
-        while self.__serial.canReadLine():
-            msg = self.__serial.readLine().data().decode().strip()
+    def send_simp_data(self):
+        if self.__simp_streamer.poll():
+            wait_s = self.__simp_streamer.time_to_next()
+            if wait_s is not None:
+                self.simp_timer.start(int(wait_s * 1000))
+        elif not self.__simp_streamer.paused:
+            self.update_gui_log(f"SIMP finished: {self.__simp_streamer.jitter_summary()}")
+
+    def recv_data(self, port_name):
+        serial = self.__receivers.get(port_name)
+        if serial is None:
+            return
+        while serial.canReadLine():
+            msg = serial.readLine().data().decode().strip()
             if self.__write_to_logfile:
+                # Only the receiver that saw the logfile start writes to it
+                if port_name != self.__logfile_port_name:
+                    continue
                 self.__outfile.write((msg + "\n").encode('utf-8'))
                 if "$LOGFILE:END" in msg:
-                    self.get_log_overlay.hide()
-                    self.__write_to_logfile = 0
-                    self.__outfile.close()
+                    self.stop_logfile_download()
                     self.update_gui_log("Finished uploading log data")
-            else:
+                    self.load_log_file("cansat_logs.txt")
+            elif self.__merger.accept(port_name, msg):
+                if "$LOGFILE:BEGIN" in msg:
+                    self.__logfile_port_name = port_name
                 self.__recveived_data = msg
                 self.__data_received.emit()
 
+    def stop_logfile_download(self):
+        self.get_log_overlay.hide()
+        self.__write_to_logfile = 0
+        self.__logfile_port_name = None
+        if self.__outfile is not None and not self.__outfile.closed:
+            self.__outfile.close()
+
     @pyqtSlot()
     def process_data(self):
         # Info msg
@@ -1265,98 +1895,291 @@ class GroundStationApp(QMainWindow):
         if not msg.strip():
             return
         
+        start = time.perf_counter()
         if(msg.startswith('$')):
+            self.__command_queue.on_message(msg)
+            self.__protocol.dispatch(msg)
+        else: # telemetry
+            self.parse_telemetry_string(msg)
+        self.display_governor.add(time.perf_counter() - start)
+    
+    # ------ '$' MESSAGE HANDLERS ------ #
+    def register_message_handlers(self):
+        self.__protocol.register("$LOGFILE:BEGIN", self.handle_logfile_begin, consume=True)
+        self.__protocol.register("CAMERA1 ON", lambda m: self.set_camera_label(1, True))
+        self.__protocol.register("CAMERA2 ON", lambda m: self.set_camera_label(2, True))
+        self.__protocol.register("CAMERA1 OFF", lambda m: self.set_camera_label(1, False))
+        self.__protocol.register("CAMERA2 OFF", lambda m: self.set_camera_label(2, False))
+        self.__protocol.register("BEGIN_SIMP", self.handle_begin_simp)
+
+    # Time spent in each '$' message handler during the mission that just ended
+    def log_message_costs(self):
+        for line in self.__protocol.stats_summary():
+            self.update_gui_log(f"Message cost {line}")
+        self.__protocol.stats.clear()
+
+    # Runs for every '$' message that wasn't consumed by a handler
+    def handle_message(self, message):
+        if self.__session is not None:
+            row = {field: "" for field in self.__session.fieldnames}
+            row["CMD_ECHO"] = message.raw
+            self.__session.writerow(row)
+        if self.mission_db is not None:
+            self.mission_db.insert_message(message.level, message.text, message.raw)
+        if self.telemetry_server is not None:
+            self.telemetry_server.publish_message(message.raw)
+
+        if message.mode is not None:
+            self.__cansat_mode = message.mode
+            self.label_remote_mode.setText(f'<span style="color:black;">CANSAT Mode: \
+                                        </span><span style="color:BLUE;">{message.mode}</span>')
+            self.label_remote_state.setText(f'<span style="color:black;">CANSAT State: \
+                                          </span><span style="color:BLUE;">{message.state}</span>')
 
-            # Get logfile
-            if "$LOGFILE:BEGIN" in msg:
-                self.get_log_overlay.show()
-                self.__outfile = open("cansat_logs.txt", "wb")
-                self.__outfile.write((msg + "\n").encode('utf-8'))
-                self.__write_to_logfile = 1
+        if message.is_error:
+            self.update_gui_log(f"-> {message.text}", "red")
+        else:
+            self.update_gui_log(f"-> {message.text}", "blue")
+
+    def open_log_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "LOAD LOG FILE", "", "Logs (*.txt *.csv);;All files (*)")
+        if path:
+            self.load_log_file(path)
+
+    # Logs of hundreds of MB are parsed in chunks by a process pool,
+    # log_load_timer collects the chunks so the GUI keeps running meanwhile
+    def load_log_file(self, path):
+        if self.__log_loader is not None:
+            self.update_gui_log("ERROR: Another log file is still loading", "red")
+            return
+        try:
+            loader = ChunkedLoader(path)
+            # An onboard log (no CSV header) fills the gaps of the current session, on the loader's
+            # thread once it is parsed. Its values are kept as the payload sent them.
+            if loader.raw and self.__session is not None and self.__session.rows > 0:
+                # Every packet received so far on disk first, or it would count as missing
+                self.__session.flush()
+                loader.keep_text = True
+                loader.after = partial(backfill_worker, self.__session.path)
+            self.__log_loader = loader.start()
+        except OSError as e:
+            self.update_gui_log(f"ERROR: Could not load {path}: {e}", "red")
+            return
+        self.__log_load_start = time.perf_counter()
+        self.__log_progress = QProgressDialog(f"Loading {os.path.basename(path)}...", "CANCEL", 0, 1000, self)
+        self.__log_progress.setWindowTitle("LOAD LOG FILE")
+        self.__log_progress.setMinimumDuration(500)
+        self.__log_progress.canceled.connect(self.cancel_log_load)
+        self.log_load_timer.start(100)
+
+    def poll_log_load(self):
+        loader = self.__log_loader
+        if loader is None:
+            return
+        try:
+            if not loader.poll():
+                self.__log_progress.setValue(int(1000 * loader.progress))
                 return
-            
-            if "CAMERA1 ON" in msg:
-                self.camera1_status_label.setText(f'<span style="color:black;">CAMERA1 Status: \
-                                            </span><span style="color:GREEN;">ON</span>')
-            
-            if "CAMERA2 ON" in msg:
-                self.camera2_status_label.setText(f'<span style="color:black;">CAMERA2 Status: \
-                                            </span><span style="color:GREEN;">ON</span>')
-                
-            if "CAMERA1 OFF" in msg:
-                self.camera1_status_label.setText(f'<span style="color:black;">CAMERA1 Status: \
-                                            </span><span style="color:RED;">OFF</span>')
-            
-            if "CAMERA2 OFF" in msg:
-                self.camera2_status_label.setText(f'<span style="color:black;">CAMERA2 Status: \
-                                            </span><span style="color:RED;">OFF</span>')
+            session = loader.result()
+        except LoadCancelled:
+            return
+        except Exception as e:
+            self.finish_log_load()
+            self.update_gui_log(f"ERROR: Could not load {loader.path}: {e}", "red")
+            return
+        self.finish_log_load()
+        self.loaded_log = session
+        packets = session["PACKET_COUNT"] if "PACKET_COUNT" in session else np.empty(0)
+        packet_range = f", PACKET_COUNT {np.nanmin(packets):.0f}-{np.nanmax(packets):.0f}" \
+                       if np.isfinite(packets).any() else ""
+        self.update_gui_log(f"Loaded {os.path.basename(loader.path)}: {len(session)} packets{packet_range}, "
+                            f"{len(session.messages)} messages in {time.perf_counter() - self.__log_load_start:.1f} s")
+        if loader.after is not None:
+            self.backfill_session(loader.after_result)
+
+    # Packets lost over the radio were taken from the onboard log and the merged session
+    # written next to the ground one by backfill_worker, the plots are rebuilt from it
+    def backfill_session(self, result):
+        if isinstance(result, Exception):
+            self.update_gui_log(f"ERROR: Could not backfill the session: {result}", "red")
+            return
+        merged, counts, path = result
+        if counts["backfilled"] == counts["onboard"]:
+            self.update_gui_log("ERROR: The onboard log doesn't overlap the current session", "red")
+            return
+        if counts["backfilled"] == 0:
+            self.update_gui_log("Onboard log: no packets missing from the current session")
+            return
+        self.reset_processing()
+        self.replay_rows(session_rows(merged, max(0, len(merged) - self.__graph_time_window)))
+        self.update_gui_log(f"Backfilled {counts['backfilled']} packets from the onboard log into "
+                            f"{os.path.basename(path)}")
 
-            row = {field: "" for field in self.__csv_writer.fieldnames}
-            row["CMD_ECHO"] = msg
-            self.__csv_writer.writerow(row)
+    def cancel_log_load(self):
+        if self.__log_loader is None:
+            return
+        self.__log_loader.cancel()
+        self.update_gui_log(f"Cancelled loading {os.path.basename(self.__log_loader.path)}")
+        self.finish_log_load()
+
+    def finish_log_load(self):
+        self.log_load_timer.stop()
+        self.__log_loader = None
+        if self.__log_progress is not None:
+            # Cleared first so closing the dialog doesn't count as a cancel
+            progress, self.__log_progress = self.__log_progress, None
+            progress.canceled.disconnect(self.cancel_log_load)
+            progress.close()
+
+    def handle_logfile_begin(self, message):
+        self.get_log_overlay.show()
+        self.__outfile = open("cansat_logs.txt", "wb")
+        self.__outfile.write((message.raw + "\n").encode('utf-8'))
+        self.__write_to_logfile = 1
+
+    def handle_begin_simp(self, message):
+        if(self.__cansat_mode == "SIM"):
+            self.start_simp()
+
+    def set_camera_label(self, camera, on):
+        label = self.camera1_status_label if camera == 1 else self.camera2_status_label
+        if on:
+            label.setText(f'<span style="color:black;">CAMERA{camera} Status: \
+                                        </span><span style="color:GREEN;">ON</span>')
+        else:
+            label.setText(f'<span style="color:black;">CAMERA{camera} Status: \
+                                        </span><span style="color:RED;">OFF</span>')
+
+    # Everything computed from the packets, plots included
+    def reset_processing(self):
+        self.timebase.reset()
+        self.channel_stats.reset()
+        self.derived_channels.reset()
+        self.glitch_filter.reset()
+        self.altitude_estimator.reset()
+        self.attitude.reset()
+        self.spectral.reset()
+        self.alerts.reset()
+        self.update_alert_banner()
+        for plotter in self.plotters:
+            plotter.reset_plot()
 
-            msg_text = re.search('MSG:(.+)', msg).group(1)
-            if msg_text is None:
-                msg_text = "(UNEXPECTED FORMAT):" + msg
-            try:
-                mission_info = re.search('{(.+?)}', msg_text).group(1)
-            except AttributeError:
-                mission_info = "NONE"
-            if mission_info != "NONE":
-                msg_text = re.sub(r'{.+?}', '', msg_text).strip()
-                new_mode, new_state = mission_info.split('|')
-                self.__cansat_mode = new_mode
-                self.label_remote_mode.setText(f'<span style="color:black;">CANSAT Mode: \
-                                            </span><span style="color:BLUE;">{new_mode}</span>')
-                self.label_remote_state.setText(f'<span style="color:black;">CANSAT State: \
-                                              </span><span style="color:BLUE;">{new_state}</span>')
-
-            if "BEGIN_SIMP" in msg:
-                if(self.__cansat_mode == "SIM"):
-                    try:
-                        with open("cansat_2023_simp.txt", 'r') as file:
-                            for line in file:
-                                if line.startswith("CMD,$,SIMP"):
-                                    line = line.replace('$', str(self.__TEAM_ID))
-                                    self.simp_data.append(line.strip())
-                        self.current_simp_idx = 0
-                        self.simp_timer.start(1000)
-                    except FileNotFoundError:
-                        self.update_gui_log("ERROR: Could not find SIMP data file cansat_2023_simp.txt!", "red")
-
-            if msg.startswith("$E"):
-                self.update_gui_log(f"-> {msg_text}", "red")
-            else:
-                self.update_gui_log(f"-> {msg_text}", "blue")
-        else: # telemetry
-            self.parse_telemetry_string(msg)
-    
     def reset_mission(self):     
         self.gui_log.clear()
         self.error_log.clear()
-        for plotter in self.plotters:
-                plotter.reset_plot()
-        self.__csv_file.seek(0)
-        self.__csv_file.truncate()
+        self.log_command_latencies()
+        self.log_message_costs()
+        self.reset_processing()
+        # The old CSV is kept, logging continues in a new session file
+        self.__session.discard_if_empty()
+        self.__session.start()
+        self.start_mission_db_session()
         self.__packet_recv_count = 0
         self.__packet_sent_count = 0
+        self.__merger.reset()
+        self.__command_queue.clear()
+
+    # Reopen the previous session after a crash or restart and rebuild the plots,
+    # sidebar and counters from its last rows (one plot window's worth)
+    def resume_session(self):
+        current = self.__session.path
+        self.__session.discard_if_empty()
+        try:
+            path = self.__session.resume(exclude=current)
+        except OSError as e:
+            self.update_gui_log(f"ERROR: Could not resume session: {e}", "red")
+            path = None
+        if path is None:
+            if self.__session.file is None:
+                self.__session.start()
+            self.update_gui_log("No earlier session to resume", "red")
+            return
+
+        self.start_mission_db_session()
+        start = QTime.currentTime()
+        self.reset_processing()
+        self.__merger.reset()
+        packets = self.replay_rows(read_session_tail(path, self.__graph_time_window))
+        self.update_gui_log(f"Resumed {os.path.basename(path)}: rebuilt from {packets} packets "
+                            f"in {start.msecsTo(QTime.currentTime())} ms")
+
+    # Feed logged session rows through the normal packet path without recording them again,
+    # returns the number of packets. messages=True also shows the logged '$' lines.
+    def replay_rows(self, rows, messages=False):
+        last = None
+        packets = 0
+        # Draw once at the end instead of once per replayed packet
+        for plotter in self.plotters:
+            plotter.deferred = True
+        for row in rows:
+            if row.get("TEAM_ID"):
+                self.parse_telemetry_string(",".join(row.get(field) or "" for field in csv_fields[:-1]),
+                                            record=False)
+                last = row
+                packets += 1
+            elif messages and row.get("CMD_ECHO"):
+                self.update_gui_log(f"-> {row['CMD_ECHO']}", "blue")
+        for plotter in self.plotters:
+            plotter.deferred = False
+            if not plotter.throttled:
+                plotter.refresh()
+        if last is not None:
+            try:
+                self.__packet_recv_count = int(last["PACKET_RECV"])
+            except ValueError:
+                pass
+            self.__packet_sent_count = last["PACKET_COUNT"]
+        # Alerts aren't logged while replaying, the banner shows where they ended up
+        self.update_alert_banner()
+        self.update_packet_label()
+        return packets
+
+    # Follower mode: only the rows appended since the last poll are parsed
+    def follow_session(self):
+        start = time.perf_counter()
+        rows = self.__follower.poll()
+        if self.__follower.restarted:
+            # The leader reset the mission or resumed a session, start over with that one
+            self.reset_processing()
+            self.__packet_recv_count = 0
+            self.__packet_sent_count = 0
+            self.update_packet_label()
+            self.setWindowTitle(f"CANSAT Ground Station (FOLLOWING {os.path.basename(self.__follower.path)})")
+            self.update_gui_log(f"Following {os.path.basename(self.__follower.path)}")
+            rows = self.__follower.poll()
+        if rows:
+            self.replay_rows(rows, messages=True)
+        self.display_governor.add(time.perf_counter() - start)
 
     def set_port_text_closed(self):
          self.label_port.setText(f'<span style="color:black;">Ground Port: \
                                               </span><span style="color:RED;">CLOSED</span>')
         
     def set_port_text_open(self):
-        open_msg = "OPEN ON: " + self.__PORT_SELECTED_INFO.portName() + self.__PORT_SELECTED_INFO.description()
+        if len(self.__receivers) == 1:
+            serial = self.get_uplink()
+            open_msg = "OPEN ON: " + serial.portName()
+        else:
+            open_msg = "OPEN ON: " + self.__merger.summary()
         self.label_port.setText(f'<span style="color:black;">Ground Port: \
                                               </span><span style="color:GREEN;">{open_msg}</span>')
 
     # Close port on app exit
     def closeEvent(self, event):
-        if self.__serial.isOpen() is True:
-            self.__serial.close()
-        if self.__csv_file is not None:
-            if not self.__csv_file.closed:
-                self.__csv_file.close()
+        for serial in self.__receivers.values():
+            if serial.isOpen() is True:
+                serial.close()
+        if self.__session is not None:
+            self.__session.close()
+        if self.mission_db is not None:
+            self.mission_db.close()
+        if self.telemetry_ring is not None:
+            self.telemetry_ring.close()
+        if self.telemetry_server is not None:
+            self.telemetry_server.close()
+        if self.__log_loader is not None:
+            self.__log_loader.cancel()
+        self.tile_cache.close()
 
     def update_packet_label(self):
         self.label_packet_count.setText(f'<span style="color:black;">Packets Received: \
@@ -1364,73 +2187,106 @@ class GroundStationApp(QMainWindow):
                                             {self.__packet_recv_count}/{self.__packet_sent_count}</span>')
     
     # Upon receiving telemetry string, extract contents and update fields
-    def parse_telemetry_string(self, msg):
+    # record=False rebuilds the display from logged packets without writing them again
+    def parse_telemetry_string(self, msg, record=True):
 
         self.__packet_recv_count += 1
         self.update_packet_label()
+        if len(self.__receivers) > 1:
+            self.set_port_text_open()
 
         if msg is None or msg.strip().replace(',', '') == '':
             return  # message is empty or only whitespace/commas
         
-        data = self.extract_data_str(msg)
+        raw_data = self.extract_data_str(msg)
+
+        # Every time plot gets a sample per packet (None is drawn as a gap)
+        # so they all stay aligned with the shared timebase
+        packet_time = self.timebase.append(raw_data.MISSION_TIME, raw_data.GPS_TIME)
+        # Estimators, stats and alerts work on the raw values, the Kalman filter gates outliers itself
+        derived = self.derived_channels.update(packet_time, raw_data)
+        self.channel_stats.push(packet_time, raw_data)
+        estimate = self.update_altitude_estimate(packet_time, raw_data)
+        attitude = self.attitude.update(packet_time, (raw_data.GYRO_R, raw_data.GYRO_P, raw_data.GYRO_Y),
+                                        (raw_data.ACCEL_R, raw_data.ACCEL_P, raw_data.ACCEL_Y),
+                                        (raw_data.MAG_R, raw_data.MAG_P, raw_data.MAG_Y))
+        ground = {**derived, **estimate, **attitude}
+        self.channel_stats.push_values(packet_time, ground)
+        transitions = self.alerts.evaluate(packet_time, raw_data, ground)
+        if record:
+            self.handle_alerts(transitions)
+        self.update_spectrogram(packet_time, raw_data)
+
+        # Glitches are replaced in the plots only, the CSV keeps raw values
+        filtered, glitches = self.glitch_filter.apply(packet_time, raw_data)
+        data = replace(raw_data, **filtered) if filtered else raw_data
 
         # Update graphs and live data values
+        self.plotters[self.graph_title_to_index.get("Altitude")].update_plot(data.ALTITUDE)
         if data.ALTITUDE is not None:
-            self.plotters[self.graph_title_to_index.get("Altitude")].update_plot(data.ALTITUDE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("Altitude")].setText(f"{data.ALTITUDE} m")
+            self.set_sidebar("Altitude", f"{data.ALTITUDE} m")
         
+        self.plotters[self.graph_title_to_index.get("Temperature")].update_plot(data.TEMPERATURE)
         if data.TEMPERATURE is not None:
-            self.plotters[self.graph_title_to_index.get("Temperature")].update_plot(data.TEMPERATURE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("Temperature")].setText(f"{data.TEMPERATURE} °C")
+            self.set_sidebar("Temperature", f"{data.TEMPERATURE} °C")
 
+        self.plotters[self.graph_title_to_index.get("Pressure")].update_plot(data.PRESSURE)
         if data.PRESSURE is not None:
-            self.plotters[self.graph_title_to_index.get("Pressure")].update_plot(data.PRESSURE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("Pressure")].setText(f"{data.PRESSURE} kPa")
+            self.set_sidebar("Pressure", f"{data.PRESSURE} kPa")
         
+        self.plotters[self.graph_title_to_index.get("Voltage")].update_plot(data.VOLTAGE)
         if data.VOLTAGE is not None:
-            self.plotters[self.graph_title_to_index.get("Voltage")].update_plot(data.VOLTAGE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("Voltage")].setText(f"{data.VOLTAGE} V")
+            self.set_sidebar("Voltage", f"{data.VOLTAGE} V")
 
         new_gyro_data = [data.GYRO_R, data.GYRO_P, data.GYRO_Y]
         self.plotters[self.graph_title_to_index.get("Gyro")].update_plot(new_gyro_data)
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Gyro R")].setText(f"{data.GYRO_R} °/s")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Gyro P")].setText(f"{data.GYRO_P} °/s")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Gyro Y")].setText(f"{data.GYRO_Y} °/s")
-        gyro_diff_data = [data.GYRO_R - self.__last_gyro_r, data.GYRO_P - self.__last_gyro_p, data.GYRO_Y - self.__last_gyro_y]
-        self.plotters[self.graph_title_to_index.get("Gyro Diff")].update_plot(gyro_diff_data)
-        self.__last_gyro_r = data.GYRO_R
-        self.__last_gyro_p = data.GYRO_P
-        self.__last_gyro_y = data.GYRO_Y
-        self.sidebar_data_labels[self.sidebar_data_dict.get("RAccel R")].setText(f"{gyro_diff_data[0]} °/s²")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("RAccel P")].setText(f"{gyro_diff_data[1]} °/s²")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("RAccel Y")].setText(f"{gyro_diff_data[2]} °/s²")
+        self.set_sidebar("Gyro R", f"{data.GYRO_R} °/s")
+        self.set_sidebar("Gyro P", f"{data.GYRO_P} °/s")
+        self.set_sidebar("Gyro Y", f"{data.GYRO_Y} °/s")
+        angular_accel = [derived["ANGULAR_ACCEL_R"], derived["ANGULAR_ACCEL_P"], derived["ANGULAR_ACCEL_Y"]]
+        self.plotters[self.graph_title_to_index.get("Gyro Diff")].update_plot(angular_accel)
+        self.set_sidebar("RAccel R", f"{angular_accel[0]:.2f} °/s²")
+        self.set_sidebar("RAccel P", f"{angular_accel[1]:.2f} °/s²")
+        self.set_sidebar("RAccel Y", f"{angular_accel[2]:.2f} °/s²")
 
         new_accel_data = [data.ACCEL_R, data.ACCEL_P, data.ACCEL_Y]
         self.plotters[self.graph_title_to_index.get("Accel")].update_plot(new_accel_data)
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Accel X")].setText(f"{data.ACCEL_R} m/s²")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Accel Y")].setText(f"{data.ACCEL_P} m/s²")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Accel Z")].setText(f"{data.ACCEL_Y} m/s²")
+        self.set_sidebar("Accel X", f"{data.ACCEL_R} m/s²")
+        self.set_sidebar("Accel Y", f"{data.ACCEL_P} m/s²")
+        self.set_sidebar("Accel Z", f"{data.ACCEL_Y} m/s²")
 
         new_mag_data = [data.MAG_R, data.MAG_P, data.MAG_Y]
         self.plotters[self.graph_title_to_index.get("Mag")].update_plot(new_mag_data)
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Mag R")].setText(f"{data.MAG_R} G")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Mag P")].setText(f"{data.MAG_P} G")
-        self.sidebar_data_labels[self.sidebar_data_dict.get("Mag Y")].setText(f"{data.MAG_Y} G")
+        self.set_sidebar("Mag R", f"{data.MAG_R} G")
+        self.set_sidebar("Mag P", f"{data.MAG_P} G")
+        self.set_sidebar("Mag Y", f"{data.MAG_Y} G")
         
+        self.plotters[self.graph_title_to_index.get("Rotation")].update_plot(data.AUTO_GYRO_ROTATION_RATE)
         if data.AUTO_GYRO_ROTATION_RATE is not None:
-            self.plotters[self.graph_title_to_index.get("Rotation")].update_plot(data.AUTO_GYRO_ROTATION_RATE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("Rotation")].setText(f"{data.AUTO_GYRO_ROTATION_RATE} °/s")
+            self.set_sidebar("Rotation", f"{data.AUTO_GYRO_ROTATION_RATE} °/s")
 
         if data.GPS_LATITUDE is not None and data.GPS_LONGITUDE is not None:
             self.plotters[self.graph_title_to_index.get("GPS")].update_plot(data.GPS_LATITUDE, data.GPS_LONGITUDE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("GPS Lat")].setText(f"{data.GPS_LATITUDE}°")
-            self.sidebar_data_labels[self.sidebar_data_dict.get("GPS Long")].setText(f"{data.GPS_LONGITUDE}°")
+            self.set_sidebar("GPS Lat", f"{data.GPS_LATITUDE}°")
+            self.set_sidebar("GPS Long", f"{data.GPS_LONGITUDE}°")
             self.GPS_LAT, self.GPS_LONG = data.GPS_LATITUDE, data.GPS_LONGITUDE
         
+        self.plotters[self.graph_title_to_index.get("GPS Altitude")].update_plot(data.GPS_ALTITUDE)
         if data.GPS_ALTITUDE is not None:
-            self.plotters[self.graph_title_to_index.get("GPS Altitude")].update_plot(data.GPS_ALTITUDE)
-            self.sidebar_data_labels[self.sidebar_data_dict.get("GPS Altitude")].setText(f"{data.GPS_ALTITUDE} m")
+            self.set_sidebar("GPS Altitude", f"{data.GPS_ALTITUDE} m")
         
+        self.plotters[self.graph_title_to_index.get("Vertical Velocity")].update_plot([derived["VERTICAL_VELOCITY"], estimate["KF_VELOCITY"]])
+        self.plotters[self.graph_title_to_index.get("Altitude Estimate")].update_plot([data.ALTITUDE, estimate["KF_ALTITUDE"]])
+        self.set_sidebar("Vert Velocity", f"{derived['VERTICAL_VELOCITY']:.2f} m/s")
+        self.plotters[self.graph_title_to_index.get("Pressure Altitude")].update_plot(derived["PRESSURE_ALTITUDE"])
+        self.set_sidebar("Press Altitude", f"{derived['PRESSURE_ALTITUDE']:.1f} m")
+        self.plotters[self.graph_title_to_index.get("Ground Speed")].update_plot(derived["GPS_GROUND_SPEED"])
+        self.set_sidebar("Ground Speed", f"{derived['GPS_GROUND_SPEED']:.2f} m/s")
+        self.plotters[self.graph_title_to_index.get("Attitude")].update_plot([attitude["ROLL"], attitude["PITCH"], attitude["YAW"]])
+        self.set_sidebar("Roll", f"{attitude['ROLL']:.1f}°")
+        self.set_sidebar("Pitch", f"{attitude['PITCH']:.1f}°")
+        self.set_sidebar("Heading", f"{attitude['HEADING']:.0f}°")
+
         if data.MISSION_TIME is not None:
             self.label_mission_time.setText(f'<span style="color:black;">Mission Time: \
                                                 </span><span style="color:BLUE;">{data.MISSION_TIME}</span>')
@@ -1449,11 +2305,13 @@ class GroundStationApp(QMainWindow):
             self.label_remote_state.setText(f'<span style="color:black;">CANSAT State: \
                                               </span><span style="color:BLUE;">{data.STATE}</span>')
         if data.GPS_TIME is not None:
-            self.sidebar_data_labels[self.sidebar_data_dict.get("GPS Time")].setText(f"{data.GPS_TIME}")
+            self.set_sidebar("GPS Time", f"{data.GPS_TIME}")
 
         if data.GPS_SATS is not None:
             self.label_sat.setText(f'<span style="color:black;">Satellites: \
                                               </span><span style="color:BLUE;">{data.GPS_SATS}</span>')
+        if record:
+            self.__command_queue.on_telemetry_echo(data.CMD_ECHO)
         if data.CMD_ECHO is not None:
             self.label_cmd_echo.setText(f'<span style="color:black;">CMD ECHO: \
                                               </span><span style="color:RED;">{data.CMD_ECHO}</span>')
@@ -1476,9 +2334,262 @@ class GroundStationApp(QMainWindow):
                                             </span><span style="color:RED;">OFF</span>')
 
             
-        data_dict = data.to_dict()
-        self.__csv_writer.writerow(data_dict)
+        for field_name in glitches:
+            self.mark_glitch(field_name, data)
+
+        # Under load the display timer refreshes the sidebar instead
+        if self.display_governor.level < DisplayLevel.SIDEBAR:
+            self.flush_sidebar()
+            self.update_sidebar_stats()
+
+        data_dict = raw_data.to_dict()
+        data_dict["GLITCHES"] = "|".join(glitches)
+        data_dict.update({name: "" if math.isnan(value) else f"{value:.4f}" for name, value in ground.items()})
+        if record:
+            self.__session.writerow(data_dict)
+            if self.mission_db is not None:
+                self.mission_db.insert_telemetry(packet_time, data_dict)
+            published = {**vars(raw_data), **ground}
+            if self.telemetry_ring is not None:
+                self.telemetry_ring.write(packet_time, published)
+            if self.telemetry_server is not None:
+                self.telemetry_server.publish(packet_time, published)
     
+    # Kalman altitude / vertical velocity, landing prediction and apogee detection
+    def update_altitude_estimate(self, packet_time, data):
+        try:
+            sats = int(data.GPS_SATS) if data.GPS_SATS else None
+        except ValueError:
+            sats = None
+        had_apogee = self.altitude_estimator.apogee_detected
+        estimate = self.altitude_estimator.update(packet_time, data.ALTITUDE, data.GPS_ALTITUDE,
+                                                  (data.ACCEL_R, data.ACCEL_P, data.ACCEL_Y), sats)
+        if estimate is None:
+            return {name: math.nan for name in ESTIMATE_CHANNELS}
+
+        self.set_sidebar("KF Altitude", f"{estimate.altitude:.1f} m")
+        self.set_sidebar("KF Velocity", f"{estimate.velocity:.2f} m/s")
+        if math.isnan(estimate.landing_time):
+            self.set_sidebar("Landing In", "N/A")
+        else:
+            self.set_sidebar("Landing In", f"{estimate.landing_time - packet_time:.0f} s")
+
+        if self.altitude_estimator.apogee_detected and not had_apogee:
+            apogee = f"{estimate.apogee_altitude:.1f} m @ T+{estimate.apogee_time:.1f} s"
+            self.set_sidebar("Apogee", apogee)
+            self.update_gui_log(f"APOGEE detected: {apogee} (mission time {data.MISSION_TIME})")
+        return estimate.as_channels()
+
+    def mark_glitch(self, field_name, data):
+        if field_name in ("GPS_LATITUDE", "GPS_LONGITUDE"):
+            self.plotters[self.graph_title_to_index.get("GPS")].mark_glitch(data.GPS_LATITUDE, data.GPS_LONGITUDE)
+            return
+        title = self.glitch_plot_titles.get(field_name)
+        if title is not None:
+            self.plotters[self.graph_title_to_index.get(title)].mark_glitch(self.timebase.last(), getattr(data, field_name))
+
+    def toggle_glitch_filter(self):
+        self.glitch_filter.enabled = not self.glitch_filter.enabled
+        state = "ON" if self.glitch_filter.enabled else "OFF"
+        self.button_glitch_filter.setText(f"GLITCH FILTER: {state}")
+        self.update_gui_log(f"Glitch filter turned {state}")
+
+    def open_mission_db(self):
+        try:
+            self.mission_db = MissionDatabase(columns=self.__session.fieldnames)
+            self.start_mission_db_session()
+        except sqlite3.Error as e:
+            self.update_gui_log(f"ERROR: Could not open mission database: {e}", "red")
+            self.mission_db = None
+            self.button_mission_db.setText("MISSION DATABASE: OFF")
+
+    # Database sessions are named after the current CSV file
+    def start_mission_db_session(self):
+        if self.mission_db is not None:
+            self.mission_db.start_session(os.path.splitext(os.path.basename(self.__session.path))[0])
+
+    def toggle_mission_db(self):
+        if self.mission_db is None:
+            self.open_mission_db()
+        else:
+            self.mission_db.close()
+            self.mission_db = None
+        state = "ON" if self.mission_db is not None else "OFF"
+        self.button_mission_db.setText(f"MISSION DATABASE: {state}")
+        self.update_gui_log(f"Mission database turned {state}")
+
+    # The database and the telemetry server run on their own threads, their errors are reported here
+    def check_background_errors(self):
+        if self.mission_db is not None and self.mission_db.error is not None:
+            self.update_gui_log(f"ERROR: Mission database write failed: {self.mission_db.error}", "red")
+            self.mission_db.error = None
+        if self.telemetry_server is not None and self.telemetry_server.error is not None:
+            self.update_gui_log(f"ERROR: Telemetry server history request failed: {self.telemetry_server.error}",
+                                "red")
+            self.telemetry_server.error = None
+
+    def start_telemetry_server(self, host):
+        server = TelemetryServer(self.__ring_dtype, host, DEFAULT_PORT, history=self.telemetry_history)
+        try:
+            server.start()
+        except OSError as e:
+            self.update_gui_log(f"ERROR: Could not start telemetry server on port {DEFAULT_PORT}: {e}", "red")
+            self.button_telemetry_server.setText("TELEMETRY SERVER: OFF")
+            return
+        self.telemetry_server = server
+        self.button_telemetry_server.setText(f"TELEMETRY SERVER: {'LOCAL' if host == LOCAL_HOST else 'LAN'}")
+
+    # LOCAL -> LAN -> OFF -> LOCAL
+    def cycle_telemetry_server(self):
+        host = None
+        if self.telemetry_server is None:
+            host = LOCAL_HOST
+        elif self.telemetry_server.host == LOCAL_HOST:
+            host = LAN_HOST
+        if self.telemetry_server is not None:
+            self.telemetry_server.close()
+            self.telemetry_server = None
+            self.button_telemetry_server.setText("TELEMETRY SERVER: OFF")
+        if host is not None:
+            self.start_telemetry_server(host)
+        if self.telemetry_server is not None:
+            self.update_gui_log(f"Telemetry server listening on {self.telemetry_server.host}:{self.telemetry_server.port}")
+        else:
+            self.update_gui_log("Telemetry server stopped")
+
+    # History for telemetry server subscribers, runs on the server's history worker with its own connection
+    def telemetry_history(self, packet_from, packet_to):
+        mission_db = self.mission_db
+        if mission_db is None:
+            return []
+        connection = mission_db.connect()
+        try:
+            return session_telemetry(connection, mission_db.session_id, packet_from, packet_to)
+        finally:
+            connection.close()
+
+    def update_spectrogram(self, packet_time, data):
+        updated = self.spectral.push(packet_time, data)
+        if self.spectrogram_plotter.channel in updated and self.spectrogram_tab_visible():
+            self.spectrogram_plotter.sample_added()
+
+    def spectrogram_tab_visible(self):
+        return self.tab_widget.currentIndex() == self.graph_title_to_index.get("Spectrogram")
+
+    # Plot widgets of a tab, built the first time it is shown
+    def build_tab(self, index):
+        if not 0 <= index < len(self.plotters) or self.plotters[index].built:
+            return
+        if self.plotters[index] is self.spectrogram_plotter:
+            spectrogram_graph, spectrum_graph = new_plot_widget(), new_plot_widget()
+            self.plot_tabs[index].addWidget(spectrogram_graph, stretch=2)
+            self.plot_tabs[index].addWidget(spectrum_graph, stretch=1)
+            self.graphs[index] = spectrogram_graph
+            self.spectrogram_plotter.build(spectrogram_graph, spectrum_graph)
+        else:
+            self.graphs[index] = new_plot_widget()
+            self.plot_tabs[index].addWidget(self.graphs[index])
+            self.plotters[index].build(self.graphs[index])
+
+    def spectrogram_tab_changed(self, index):
+        if self.spectrogram_tab_visible():
+            self.spectrogram_plotter.update_plot()
+
+    def load_alert_rules(self):
+        try:
+            rules = load_alert_rules(DEFAULT_ALERT_FILE)
+        except (OSError, ValueError) as e:
+            self.update_gui_log(f"ERROR: Could not load alert rules from {DEFAULT_ALERT_FILE}: {e}", "red")
+            return
+        self.alerts.set_rules(rules)
+        self.update_alert_banner()
+        self.update_gui_log(f"Loaded {len(rules)} alert rules")
+
+    def reload_alert_rules(self):
+        for line in self.alerts.stats_summary():
+            self.update_gui_log(f"Alert cost {line}")
+        self.load_alert_rules()
+
+    def handle_alerts(self, transitions):
+        if not transitions:
+            return
+        for transition in transitions:
+            if transition.raised:
+                self.update_gui_log(f"ALERT: {transition.message}", "red")
+            else:
+                self.update_gui_log(f"ALERT {transition.message}", "green")
+        self.update_alert_banner()
+
+    def update_alert_banner(self):
+        active = self.alerts.active
+        if active:
+            self.alert_banner.setText(" | ".join(compiled.describe() for compiled in active))
+            self.alert_banner.setStyleSheet("background-color: #d9534f; color: white; border-radius: 6px; padding: 4px;")
+        else:
+            self.alert_banner.setText("NO ACTIVE ALERTS")
+            self.alert_banner.setStyleSheet("background-color: #5cb85c; color: white; border-radius: 6px; padding: 4px;")
+
+    def set_sidebar(self, name, text):
+        self.__sidebar_pending[name] = text
+
+    def flush_sidebar(self):
+        for name, text in self.__sidebar_pending.items():
+            self.sidebar_data_labels[self.sidebar_data_dict.get(name)].setText(text)
+        self.__sidebar_pending.clear()
+
+    def visible_plotter(self):
+        index = self.tab_widget.currentIndex()
+        return self.plotters[index] if 0 <= index < len(self.plotters) else None
+
+    # Display timer: checks the packet load and draws what the current level held back
+    def display_frame(self):
+        if self.display_governor.tick():
+            self.apply_display_level()
+            level = self.display_governor.level
+            self.update_gui_log(f"{self.display_governor.text} (packets took {self.display_governor.load:.0%} "
+                                f"of the display time, {1000 * self.display_governor.lag_s:.0f} ms behind)",
+                                "black" if level == DisplayLevel.LIVE else "orange")
+        level = self.display_governor.level
+        if level >= DisplayLevel.SIDEBAR:
+            self.flush_sidebar()
+            self.update_sidebar_stats()
+        if level >= DisplayLevel.LATEST:
+            visible = self.visible_plotter()
+            if visible is not None:
+                visible.refresh()
+        if level > DisplayLevel.LIVE:
+            self.update_display_banner()
+
+    def apply_display_level(self, *args):
+        level = self.display_governor.level
+        visible = self.visible_plotter()
+        for plotter in self.plotters:
+            plotter.set_decimated(level >= DisplayLevel.DECIMATED)
+            plotter.throttled = (level >= DisplayLevel.LATEST
+                                 or (level >= DisplayLevel.VISIBLE_TAB and plotter is not visible))
+            if not plotter.throttled:
+                plotter.refresh()
+        if level < DisplayLevel.SIDEBAR:
+            self.flush_sidebar()
+            self.update_sidebar_stats()
+        self.update_display_banner()
+
+    def update_display_banner(self):
+        governor = self.display_governor
+        if governor.level == DisplayLevel.LIVE:
+            self.display_banner.setText(governor.text)
+            self.display_banner.setStyleSheet("background-color: #5cb85c; color: white; border-radius: 6px; padding: 4px;")
+        else:
+            self.display_banner.setText(f"{governor.text} ({governor.load:.0%} LOAD), ALL PACKETS STILL LOGGED")
+            self.display_banner.setStyleSheet("background-color: #f0ad4e; color: white; border-radius: 6px; padding: 4px;")
+
+    def update_sidebar_stats(self):
+        for name, label in self.sidebar_stats_labels.items():
+            stats = self.channel_stats.summary(name)
+            if stats is None or stats.count == 0:
+                continue
+            label.setText(f"[{stats.min:.4g}..{stats.max:.4g}] μ {stats.mean:.4g} σ {stats.std:.2g} Δ {stats.rate:+.3g}/s")
+
     def extract_data_str(self, msg: str) -> TelemetryData:
         # EXPECTED FORMAT:
         # "TEAM_ID, MISSION_TIME, PACKET_COUNT, MODE, STATE, ALTITUDE, TEMPERATURE, PRESSURE, 
@@ -1548,8 +2659,21 @@ def customPalette():
     return palette
 
 if __name__ == "__main__":
+    # Log loading workers of the frozen build start the executable again
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     app.setPalette(customPalette())
-    window=GroundStationApp()
+    startup_timer.mark("qt")
+    parser = argparse.ArgumentParser(description="CANSAT ground station")
+    parser.add_argument("--follow", nargs="?", const="", metavar="SESSION_CSV",
+                        help="show a session another instance is writing (the newest one if no file is given)")
+    args, _ = parser.parse_known_args()
+    follow = args.follow
+    if follow == "":
+        sessions = session_files(DEFAULT_SESSION_DIR)
+        if not sessions:
+            sys.exit(f"No session files in {DEFAULT_SESSION_DIR}/ to follow")
+        follow = sessions[-1]
+    window=GroundStationApp(follow=follow, startup=startup_timer)
     app.exec()
\ No newline at end of file
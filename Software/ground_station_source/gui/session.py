@@ -0,0 +1,304 @@
+"""
+Crash-safe telemetry session files
+
+Author: RSX
+
+Every GUI start (or mission reset) opens a new timestamped CSV under
+sessions/ instead of truncating the last one. Rows are flushed as they're
+written and fsync'd at most once a second, a file that grows past its
+limit rotates to a numbered part. Next to each part an .idx file records
+the byte offset of every Nth row, so the last rows of hours of data can be
+read back by seeking instead of parsing the whole file.
+"""
+import csv
+import glob
+import io
+import os
+import time
+from datetime import datetime
+
+DEFAULT_SESSION_DIR = "sessions"
+SESSION_PREFIX = "session_"
+
+def session_path(directory, stamp, part):
+    suffix = "" if part == 1 else f"_{part:03d}"
+    return os.path.join(directory, f"{SESSION_PREFIX}{stamp}{suffix}.csv")
+
+def index_path(path):
+    return os.path.splitext(path)[0] + ".idx"
+
+# All session parts, oldest first (timestamps sort as text)
+def session_files(directory=DEFAULT_SESSION_DIR):
+    return sorted(glob.glob(os.path.join(directory, f"{SESSION_PREFIX}*.csv")))
+
+# session_YYYYmmdd_HHMMSS[_NNN].csv -> ("YYYYmmdd_HHMMSS", part)
+def parse_session_name(path):
+    parts = os.path.splitext(os.path.basename(path))[0][len(SESSION_PREFIX):].split("_")
+    return f"{parts[0]}_{parts[1]}", int(parts[2]) if len(parts) > 2 else 1
+
+# Drop a partly written last line left by a crash, returns the file size
+def repair_tail(path, block=4096):
+    with open(path, "rb+") as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        end = size
+        while end > 0:
+            start = max(0, end - block)
+            file.seek(start)
+            chunk = file.read(end - start)
+            if end == size and chunk.endswith(b"\n"):
+                return size
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                file.truncate(start + newline + 1)
+                return start + newline + 1
+            end = start
+        file.truncate(0)
+        return 0
+
+# Last modification of a file, -inf once it's gone
+def modified_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return float("-inf")
+
+# True when a session file has at least one complete data row
+def has_rows(path):
+    try:
+        with open(path, "rb") as file:
+            file.readline()
+            return file.readline().endswith(b"\n")
+    except OSError:
+        return False
+
+def read_index(path):
+    entries = []
+    try:
+        with open(index_path(path), "r") as file:
+            for line in file:
+                row, _, offset = line.strip().partition(",")
+                if offset:
+                    entries.append((int(row), int(offset)))
+    except (OSError, ValueError):
+        pass
+    return entries
+
+class SessionWriter:
+
+    def __init__(self, fieldnames, directory=DEFAULT_SESSION_DIR, max_bytes=64 * 1024 * 1024,
+                 index_every=64, sync_s=1.0, clock=time.monotonic):
+        self.fieldnames = list(fieldnames)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_every = index_every
+        self.sync_s = sync_s
+        self.clock = clock
+        self.file = None
+        self.path = None
+
+    # New session with the current date and time
+    def start(self):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self.stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.part = 1
+        # Two starts within one second get separate files
+        while os.path.exists(session_path(self.directory, self.stamp, self.part)):
+            self.part += 1
+        self.__open_part()
+
+    # Reopen the newest earlier session with data for appending, returns the path
+    # of its last part or None. Sessions a crash left without rows are skipped.
+    def resume(self, exclude=None):
+        files = [path for path in session_files(self.directory) if path != exclude]
+        with_rows = [path for path in files if has_rows(path)]
+        if not with_rows:
+            return None
+        stamp = parse_session_name(with_rows[-1])[0]
+        path = [path for path in files if parse_session_name(path)[0] == stamp][-1]
+        self.close()
+        self.stamp, self.part = parse_session_name(path)
+        size = repair_tail(path)
+        self.path = path
+        self.file = open(path, "a", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+        if size == 0:
+            # A part rotated to just before the crash
+            self.writer.writeheader()
+            self.file.flush()
+        self.index = open(index_path(path), "a")
+        entries = read_index(path)
+        self.rows = count_rows(path, entries)
+        self.__last_sync = self.clock()
+        return path
+
+    def __open_part(self):
+        self.path = session_path(self.directory, self.stamp, self.part)
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+        self.writer.writeheader()
+        # On disk right away, a crash before the first row still leaves a valid file
+        self.file.flush()
+        self.index = open(index_path(self.path), "w")
+        self.rows = 0
+        self.__last_sync = self.clock()
+
+    def writerow(self, row):
+        if self.rows % self.index_every == 0:
+            self.file.flush()
+            self.index.write(f"{self.rows},{self.file.tell()}\n")
+            self.index.flush()
+        self.writer.writerow(row)
+        self.rows += 1
+        self.file.flush()
+        if self.clock() - self.__last_sync >= self.sync_s:
+            os.fsync(self.file.fileno())
+            self.__last_sync = self.clock()
+        if self.file.tell() >= self.max_bytes:
+            self.close()
+            self.part += 1
+            self.__open_part()
+
+    # Everything written so far on disk, for readers of the session file
+    def flush(self):
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.__last_sync = self.clock()
+
+    # Drop the current session if nothing was written to it
+    def discard_if_empty(self):
+        if self.file is not None and self.rows == 0:
+            path = self.path
+            self.close()
+            for name in (path, index_path(path)):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.index.close()
+        self.file = None
+
+# Data rows in a session file, counted from the last index entry on
+def count_rows(path, entries=None):
+    entries = read_index(path) if entries is None else entries
+    row, offset = entries[-1] if entries else (0, None)
+    with open(path, "r", newline="") as file:
+        if offset is None:
+            file.readline()
+        else:
+            file.seek(offset)
+        return row + sum(1 for _ in csv.reader(file))
+
+# Last `rows` rows of a session file as dicts, read from the nearest indexed offset
+def read_tail(path, rows):
+    entries = read_index(path)
+    with open(path, "r", newline="") as file:
+        header = next(csv.reader(io.StringIO(file.readline())), None)
+        if not header:
+            return []
+        total = count_rows(path, entries)
+        first = max(0, total - rows)
+        start_row, offset = 0, file.tell()
+        for row, row_offset in entries:
+            if row <= first:
+                start_row, offset = row, row_offset
+        file.seek(offset)
+        reader = csv.DictReader(file, fieldnames=header)
+        tail = []
+        for i, row in enumerate(reader, start=start_row):
+            if i >= first:
+                tail.append(row)
+        return tail
+
+# Like read_tail, but continues into earlier parts of a rotated session
+def read_session_tail(path, rows):
+    tail = read_tail(path, rows)
+    stamp, part = parse_session_name(path)
+    directory = os.path.dirname(path)
+    while len(tail) < rows and part > 1:
+        part -= 1
+        earlier = session_path(directory, stamp, part)
+        if not os.path.exists(earlier):
+            break
+        tail = read_tail(earlier, rows - len(tail)) + tail
+    return tail
+
+# Follows a session another process is writing: every poll() reads only the
+# bytes appended since the last one, up to max_bytes, and returns the
+# complete rows among them. Moves on to the next part when the file rotates,
+# and to a newer session in the same directory when the writer starts one.
+class SessionTail:
+
+    def __init__(self, path, backlog_rows=0, max_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.backlog_rows = backlog_rows
+        self.restarted = False      # set by poll() when it switched to another session
+        self.__open(path, backlog_rows)
+
+    def __open(self, path, backlog_rows=0):
+        self.path = path
+        self.stamp, self.part = parse_session_name(path)
+        with open(path, "rb") as file:
+            self.header = next(csv.reader(io.StringIO(file.readline().decode())), [])
+            self.offset = file.tell()
+        self.__skip = 0
+        if backlog_rows:
+            # Start from the indexed row nearest the backlog, skip up to it on the first poll
+            entries = read_index(path)
+            first = max(0, count_rows(path, entries) - backlog_rows)
+            for row, offset in entries:
+                if row <= first:
+                    self.offset, self.__skip = offset, first - row
+
+    def poll(self):
+        self.restarted = False
+        try:
+            if not self.header:
+                # Opened before the writer got to the header line
+                self.__open(self.path)
+            with open(self.path, "rb") as file:
+                file.seek(self.offset)
+                data = file.read(self.max_bytes)
+        except FileNotFoundError:
+            # An empty session the writer threw away
+            data = b""
+        # Only complete lines, a row still being written is picked up next time
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            self.__follow()
+            return []
+        self.offset += end
+        rows = [dict(zip(self.header, row)) for row in csv.reader(io.StringIO(data[:end].decode(errors="replace")))]
+        if self.__skip:
+            rows, self.__skip = rows[self.__skip:], max(0, self.__skip - len(rows))
+        return rows
+
+    # Nothing new here: continue in the next part or a newer session, if there is one,
+    # or in an older session the writer resumed
+    def __follow(self):
+        directory = os.path.dirname(self.path)
+        next_part = session_path(directory, self.stamp, self.part + 1)
+        if os.path.exists(next_part):
+            self.__open(next_part)
+            return
+        files = session_files(directory)
+        newer = [path for path in files if parse_session_name(path)[0] > self.stamp]
+        if newer:
+            self.__open(newer[0])
+            self.restarted = True
+            return
+        # A resumed session is the one written to last, like on resume it starts with a backlog
+        written = {path: modified_time(path) for path in files}
+        latest = max(written, key=written.get, default=None)
+        if latest is not None and parse_session_name(latest)[0] != self.stamp \
+                and written[latest] > modified_time(self.path):
+            self.__open(latest, self.backlog_rows)
+            self.restarted = True
@@ -3,7 +3,7 @@ from cx_Freeze import setup, Executable
 # Dependencies are automatically detected, but it might need
 # fine tuning.
 # Run command: python setup.py bdist_msi
-build_options = {'packages': [], 'excludes': [], 'include_files': ["icon.png", "cansat_2023_simp.txt"]}
+build_options = {'packages': [], 'excludes': [], 'include_files': ["icon.png", "cansat_2023_simp.txt", "alert_rules.json"]}
 
 bdist_msi_options = {
     'upgrade_code': '{77d998f8-74c5-41f1-a150-929695313ea0}',
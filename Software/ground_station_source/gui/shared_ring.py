@@ -0,0 +1,211 @@
+"""
+Shared-memory telemetry ring
+
+Author: RSX
+
+The GUI publishes every parsed packet into a multiprocessing.shared_memory
+block so scripts and notebooks on the same machine can watch a flight live
+without tailing the CSV. Records have a fixed structured dtype built from
+TelemetryData (numbers as float64 with NaN for missing values, text as
+fixed-width bytes) plus the ground channels. As in buffers.RingBuffer every
+record is written twice, at i and i + capacity, so the latest N packets are
+one contiguous slice of the block.
+
+The header holds a seqlock counter: the writer makes it odd before touching
+a slot and even again afterwards. Readers never block the writer, they
+retry a copy that raced with a write, or check a zero-copy view with
+valid() once they're done with it. The dtype is stored in the header as
+JSON, so a reader only needs the block's name:
+
+    from shared_ring import TelemetryRingReader
+    ring = TelemetryRingReader()
+    packets = ring.latest(200)
+    packets["ALTITUDE"], packets["STATE"]
+"""
+from multiprocessing import shared_memory
+import argparse
+import json
+import time
+import numpy as np
+
+DEFAULT_RING_NAME = "rsx_cansat_telemetry"
+RING_MAGIC = b"RSXRING1"
+TEXT_BYTES = 32
+HEADER_BYTES = 4096
+
+# Header words after the magic
+SEQ, CAPACITY, ITEMSIZE, DATA_OFFSET, DESCR_BYTES = range(5)
+
+# Record dtype from (name, type) pairs plus extra float channels. Every record
+# starts with its packet index and ground station time.
+def ring_dtype(field_types, extra=()):
+    spec = [("INDEX", "<u8"), ("t", "<f8")]
+    for name, kind in field_types:
+        spec.append((name, "<f8" if kind in (int, float) else f"S{TEXT_BYTES}"))
+    spec.extend((name, "<f8") for name in extra)
+    return np.dtype(spec)
+
+def attach(name):
+    # Readers must not unlink the block when they exit, only the GUI owns it
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(block._name, "shared_memory")
+        except Exception:
+            pass
+        return block
+
+# Converts {field: value} mappings to record tuples of a ring dtype,
+# missing numbers become NaN
+class RecordPacker:
+
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype)
+        self.__text = {name for name in self.dtype.names if self.dtype[name].kind == "S"}
+        self.__names = self.dtype.names[2:]
+
+    def pack(self, index, t, values):
+        record = [index, t]
+        for name in self.__names:
+            value = values.get(name)
+            if name in self.__text:
+                record.append(b"" if value is None else str(value).encode("ascii", "replace"))
+            else:
+                try:
+                    record.append(float(value))
+                except (TypeError, ValueError):
+                    record.append(np.nan)
+        return tuple(record)
+
+class TelemetryRingWriter:
+
+    def __init__(self, dtype, name=DEFAULT_RING_NAME, capacity=4096):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        descr = json.dumps(self.dtype.descr).encode()
+        if 8 + 8 * 5 + len(descr) > HEADER_BYTES:
+            raise ValueError("ring dtype too large for the header")
+        size = HEADER_BYTES + 2 * capacity * self.dtype.itemsize
+        try:
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed GUI, readers still attached keep their old mapping
+            stale = attach(name)
+            stale.close()
+            stale.unlink()
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.block.name
+        self.block.buf[:8] = RING_MAGIC
+        self.__header = np.ndarray((5,), dtype="<u8", buffer=self.block.buf, offset=8)
+        self.__header[:] = (0, capacity, self.dtype.itemsize, HEADER_BYTES, len(descr))
+        self.block.buf[48:48 + len(descr)] = descr
+        self.__data = np.ndarray((2 * capacity,), dtype=self.dtype, buffer=self.block.buf, offset=HEADER_BYTES)
+        self.__packer = RecordPacker(self.dtype)
+        self.count = 0
+
+    # One packet from a {field: value} mapping
+    def write(self, t, values):
+        record = self.__packer.pack(self.count, t, values)
+        slot = self.count % self.capacity
+        self.__header[SEQ] += 1
+        self.__data[slot] = record
+        self.__data[slot + self.capacity] = record
+        self.count += 1
+        self.__header[SEQ] += 1
+
+    def close(self):
+        if self.block is None:
+            return
+        # Views into the block must go before it can be closed
+        self.__header = self.__data = None
+        self.block.close()
+        try:
+            self.block.unlink()
+        except FileNotFoundError:
+            pass
+        self.block = None
+
+class TelemetryRingReader:
+
+    def __init__(self, name=DEFAULT_RING_NAME):
+        self.block = attach(name)
+        if bytes(self.block.buf[:8]) != RING_MAGIC:
+            self.block.close()
+            raise ValueError(f"{name} is not a telemetry ring")
+        self.__header = np.ndarray((5,), dtype="<u8", buffer=self.block.buf, offset=8)
+        self.capacity = int(self.__header[CAPACITY])
+        descr = json.loads(bytes(self.block.buf[48:48 + int(self.__header[DESCR_BYTES])]))
+        self.dtype = np.dtype([tuple(field) for field in descr])
+        self.__data = np.ndarray((2 * self.capacity,), dtype=self.dtype, buffer=self.block.buf,
+                                 offset=int(self.__header[DATA_OFFSET]))
+
+    # Packets written so far
+    @property
+    def count(self):
+        return int(self.__header[SEQ]) // 2
+
+    # Zero-copy view of the latest n packets, oldest first, and a token for valid()
+    def view(self, n=None):
+        while True:
+            seq = int(self.__header[SEQ])
+            if seq % 2 == 0:
+                break
+        count = seq // 2
+        n = min(count, self.capacity if n is None else n)
+        start = (count - n) % self.capacity
+        return self.__data[start:start + n], count - n
+
+    # True while the writer hasn't started on any slot of the view that returned `first`
+    def valid(self, first):
+        started = (int(self.__header[SEQ]) + 1) // 2
+        return started <= first + self.capacity
+
+    # Consistent copy of the latest n packets
+    def latest(self, n=None):
+        while True:
+            view, first = self.view(n)
+            packets = view.copy()
+            if self.valid(first):
+                return packets
+
+    # Packets after index `after` (all retained ones for None), and the index to pass next time.
+    # Packets that were overwritten before being read are skipped.
+    def since(self, after=None):
+        while True:
+            view, first = self.view()
+            skip = 0 if after is None else max(0, after + 1 - first)
+            packets = view[skip:].copy()
+            if self.valid(first + skip):
+                return packets, (int(packets["INDEX"][-1]) if len(packets) else after)
+
+    def close(self):
+        self.__header = self.__data = None
+        self.block.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Print live packets from the ground station")
+    parser.add_argument("fields", nargs="*", default=["PACKET_COUNT", "STATE", "ALTITUDE"])
+    parser.add_argument("--name", default=DEFAULT_RING_NAME)
+    parser.add_argument("--interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    ring = TelemetryRingReader(args.name)
+    print(f"{ring.count} packets, capacity {ring.capacity}, {len(ring.dtype.names)} fields")
+    last = ring.count - 1
+    try:
+        while True:
+            packets, last = ring.since(last)
+            for packet in packets:
+                print(" ".join(f"{name}={packet[name].decode() if ring.dtype[name].kind == 'S' else packet[name]}"
+                               for name in args.fields))
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+if __name__ == "__main__":
+    main()
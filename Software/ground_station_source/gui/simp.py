@@ -0,0 +1,176 @@
+"""
+Simulated pressure (SIMP) profiles and streaming
+
+Author: RSX
+
+A SIMP file is parsed once into an array of pressures and cached. Commands
+for a team ID are rendered once per team ID. SimpStreamer sends them on
+absolute deadlines (start + i / rate), so timer error never accumulates.
+"""
+import os
+import re
+import numpy as np
+import time
+
+DEFAULT_SIMP_FILE = "cansat_2023_simp.txt"
+
+_profile_cache = {}
+
+# "b) Each line is to be transmitted @ 1 Hz by the ground station."
+RATE_NOTE_PATTERN = re.compile(r'transmitted\s*@\s*([\d.]+)\s*Hz')
+
+# A SIMP profile: one pressure (Pa) per line, sent at rate_hz
+class SimpProfile:
+
+    def __init__(self, pressures, rate_hz=1.0, name=""):
+        self.pressures = np.asarray(pressures, dtype=float)
+        self.rate_hz = rate_hz
+        self.name = name
+        self.__rendered = {}
+
+    def __len__(self):
+        return len(self.pressures)
+
+    def commands(self, team_id):
+        if team_id not in self.__rendered:
+            self.__rendered[team_id] = [
+                f"CMD,{team_id},SIMP,{format_pressure(p)}" for p in self.pressures
+            ]
+        return self.__rendered[team_id]
+
+    def to_lines(self):
+        return [f"CMD,$,SIMP,{format_pressure(p)}" for p in self.pressures]
+
+def format_pressure(pressure):
+    if float(pressure).is_integer():
+        return str(int(pressure))
+    return f"{pressure:.1f}"
+
+# Parse the SIMP file format: '#' starts a comment, blank lines are ignored
+def parse_simp_lines(lines):
+    pressures = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split(',')
+        if len(parts) < 4 or parts[2] != "SIMP":
+            continue
+        try:
+            pressures.append(float(parts[3]))
+        except ValueError:
+            continue
+    return np.array(pressures, dtype=float)
+
+# Load a SIMP file, reusing the parsed profile until the file changes
+def load_simp_profile(path=DEFAULT_SIMP_FILE):
+    mtime = os.path.getmtime(path)
+    key = os.path.abspath(path)
+    cached = _profile_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r') as file:
+        lines = file.readlines()
+    rate_hz = 1.0
+    for line in lines:
+        match = RATE_NOTE_PATTERN.search(line)
+        if line.startswith('#') and match:
+            rate_hz = float(match.group(1))
+            break
+    profile = SimpProfile(parse_simp_lines(lines), rate_hz=rate_hz, name=os.path.basename(path))
+    _profile_cache[key] = (mtime, profile)
+    return profile
+
+# Sends one profile line per deadline and keeps send-time jitter statistics
+class SimpStreamer:
+
+    def __init__(self, send, clock=time.monotonic):
+        self.send = send
+        self.clock = clock
+        self.commands = []
+        self.rate_hz = 1.0
+        self.index = 0
+        self.running = False
+        self.paused = False
+        self.__start = None
+        self.reset_jitter()
+
+    def reset_jitter(self):
+        self.sent = 0
+        self.jitter_sum_ms = 0.0
+        self.jitter_sq_sum_ms = 0.0
+        self.jitter_max_ms = 0.0
+
+    def start(self, profile, team_id, rate_hz=None):
+        self.commands = profile.commands(team_id)
+        self.rate_hz = rate_hz if rate_hz else profile.rate_hz
+        self.index = 0
+        self.running = len(self.commands) > 0
+        self.paused = False
+        self.reset_jitter()
+        self.__start = self.clock()
+
+    def stop(self):
+        self.running = False
+        self.paused = False
+        self.index = 0
+
+    def pause(self):
+        if self.running and not self.paused:
+            self.paused = True
+
+    def resume(self):
+        if self.running and self.paused:
+            self.paused = False
+            self.__anchor(self.clock())
+
+    def seek(self, index):
+        self.index = min(max(0, int(index)), len(self.commands))
+        self.__anchor(self.clock())
+
+    def set_rate(self, rate_hz):
+        self.rate_hz = rate_hz
+        self.__anchor(self.clock())
+
+    # Re-anchor the deadlines so the next line is due now
+    def __anchor(self, now):
+        self.__start = now - self.index / self.rate_hz
+
+    def deadline(self, index):
+        return self.__start + index / self.rate_hz
+
+    # Seconds until the next line is due, None when nothing is scheduled
+    def time_to_next(self):
+        if not self.running or self.paused:
+            return None
+        return max(0.0, self.deadline(self.index) - self.clock())
+
+    # Send the line that is due, returns False once the profile is done
+    def poll(self):
+        if not self.running or self.paused:
+            return self.running
+        if self.index >= len(self.commands):
+            self.running = False
+            return False
+        now = self.clock()
+        if now < self.deadline(self.index):
+            return True
+
+        jitter_ms = (now - self.deadline(self.index)) * 1000.0
+        self.send(self.commands[self.index])
+        self.index += 1
+        self.sent += 1
+        self.jitter_sum_ms += jitter_ms
+        self.jitter_sq_sum_ms += jitter_ms * jitter_ms
+        self.jitter_max_ms = max(self.jitter_max_ms, jitter_ms)
+
+        if self.index >= len(self.commands):
+            self.running = False
+        return self.running
+
+    def jitter_summary(self):
+        if self.sent == 0:
+            return "no lines sent"
+        mean = self.jitter_sum_ms / self.sent
+        rms = (self.jitter_sq_sum_ms / self.sent) ** 0.5
+        return f"{self.sent} lines @ {self.rate_hz:g} Hz, jitter mean {mean:.1f} ms, rms {rms:.1f} ms, max {self.jitter_max_ms:.1f} ms"
@@ -0,0 +1,140 @@
+"""
+SIMP profile generator
+
+Author: RSX
+
+Builds a target altitude-vs-time trajectory (pad, ascent, apogee, descent,
+release, slower descent, landed) and converts it to SIMP pressures with the
+standard atmosphere barometric formula. Everything is computed on whole
+arrays, so profiles at 10-100 Hz take no longer to build than at 1 Hz.
+
+Run command: python simp_generator.py -o simp_10hz.txt --rate 10 --noise 5 --glitches 0.01
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from simp import SimpProfile
+from barometric import SEA_LEVEL_PRESSURE_PA, altitude_to_pressure
+
+@dataclass
+class Trajectory:
+    pad_s: float = 20.0
+    ascent_s: float = 10.0
+    apogee_m: float = 725.0
+    descent_rate_mps: float = 15.0
+    release_alt_m: float = 500.0
+    release_descent_rate_mps: float = 5.0
+    landed_s: float = 20.0
+
+    def knots(self):
+        release_alt = min(self.release_alt_m, self.apogee_m)
+        t_apogee = self.pad_s + self.ascent_s
+        t_release = t_apogee + (self.apogee_m - release_alt) / self.descent_rate_mps
+        t_landed = t_release + release_alt / self.release_descent_rate_mps
+        return t_apogee, t_release, t_landed, release_alt
+
+    @property
+    def duration_s(self):
+        return self.knots()[2] + self.landed_s
+
+    # Altitude (m above the ground) at each time in t
+    def altitude(self, t):
+        t = np.asarray(t, dtype=float)
+        t_apogee, t_release, t_landed, release_alt = self.knots()
+
+        # Rocket ascent slows down towards apogee
+        ascent_phase = np.clip((t - self.pad_s) / self.ascent_s, 0.0, 1.0)
+        ascent = self.apogee_m * np.sin(0.5 * np.pi * ascent_phase)
+
+        descent = np.interp(t, [t_apogee, t_release, t_landed], [self.apogee_m, release_alt, 0.0])
+        return np.where(t < t_apogee, ascent, descent)
+
+# Replace a fraction of samples with spikes, dropouts (0 Pa) or stuck values
+def add_glitches(pressures, rate, magnitude_pa, rng):
+    pressures = pressures.copy()
+    count = int(round(rate * len(pressures)))
+    if count == 0:
+        return pressures
+    idx = rng.choice(len(pressures), size=count, replace=False)
+    kind = rng.integers(0, 3, size=count)
+
+    spikes = idx[kind == 0]
+    pressures[spikes] += rng.choice([-1.0, 1.0], size=len(spikes)) * magnitude_pa
+
+    pressures[idx[kind == 1]] = 0.0
+
+    stuck = idx[(kind == 2) & (idx > 0)]
+    pressures[stuck] = pressures[stuck - 1]
+    return pressures
+
+def generate_profile(trajectory=None, rate_hz=1.0, ground_pressure_pa=SEA_LEVEL_PRESSURE_PA,
+                     noise_pa=0.0, glitch_rate=0.0, glitch_pa=5000.0, seed=None):
+    trajectory = trajectory or Trajectory()
+    rng = np.random.default_rng(seed)
+
+    t = np.arange(0.0, trajectory.duration_s, 1.0 / rate_hz)
+    pressures = altitude_to_pressure(trajectory.altitude(t), ground_pressure_pa)
+    if noise_pa > 0:
+        pressures = pressures + rng.normal(0.0, noise_pa, size=len(pressures))
+    if glitch_rate > 0:
+        pressures = add_glitches(pressures, glitch_rate, glitch_pa, rng)
+
+    return SimpProfile(np.round(pressures), rate_hz=rate_hz, name="generated")
+
+# Write a profile in the same format as cansat_2023_simp.txt
+def write_simp_file(profile, path, notes=""):
+    header = [
+        "#" * 80,
+        "#",
+        "# CanSat Generated Simulated Pressure Command File",
+        "#",
+        "#",
+        f"# Filename:    {path}",
+        "#",
+        f"# Date:        {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "#",
+        "# Notes:",
+        "#   a) Contents are SIMP commands, where $ is to be replaced with the team id.",
+        f"#   b) Each line is to be transmitted @ {profile.rate_hz:g} Hz by the ground station.",
+        "#   c) All line text after a # character should be ignored as a comment.",
+        "#   d) Blank lines are to be ignored.",
+    ]
+    if notes:
+        header.append(f"#   e) {notes}")
+    header += ["#", "#" * 80, ""]
+    with open(path, "w") as file:
+        file.write("\n".join(header) + "\n")
+        file.write("\n".join(profile.to_lines()) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a CanSat SIMP pressure command file")
+    parser.add_argument("-o", "--output", default="cansat_generated_simp.txt")
+    parser.add_argument("--rate", type=float, default=1.0, help="lines per second")
+    parser.add_argument("--ground-pressure", type=float, default=SEA_LEVEL_PRESSURE_PA, help="Pa")
+    parser.add_argument("--pad", type=float, default=Trajectory.pad_s, help="s on the pad")
+    parser.add_argument("--ascent", type=float, default=Trajectory.ascent_s, help="s from launch to apogee")
+    parser.add_argument("--apogee", type=float, default=Trajectory.apogee_m, help="m above ground")
+    parser.add_argument("--descent-rate", type=float, default=Trajectory.descent_rate_mps, help="m/s before release")
+    parser.add_argument("--release-alt", type=float, default=Trajectory.release_alt_m, help="m above ground")
+    parser.add_argument("--release-descent-rate", type=float, default=Trajectory.release_descent_rate_mps, help="m/s after release")
+    parser.add_argument("--landed", type=float, default=Trajectory.landed_s, help="s after landing")
+    parser.add_argument("--noise", type=float, default=0.0, help="sensor noise std dev in Pa")
+    parser.add_argument("--glitches", type=float, default=0.0, help="fraction of glitched samples")
+    parser.add_argument("--glitch-size", type=float, default=5000.0, help="glitch spike size in Pa")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    trajectory = Trajectory(
+        pad_s=args.pad, ascent_s=args.ascent, apogee_m=args.apogee,
+        descent_rate_mps=args.descent_rate, release_alt_m=args.release_alt,
+        release_descent_rate_mps=args.release_descent_rate, landed_s=args.landed,
+    )
+    profile = generate_profile(trajectory, args.rate, args.ground_pressure,
+                               args.noise, args.glitches, args.glitch_size, args.seed)
+    notes = "There are intentional sensor glitches in this data." if args.glitches > 0 else ""
+    write_simp_file(profile, args.output, notes)
+    print(f"Wrote {len(profile)} lines ({trajectory.duration_s:.0f} s @ {args.rate:g} Hz) to {args.output}")
+
+if __name__ == "__main__":
+    main()
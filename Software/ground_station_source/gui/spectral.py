@@ -0,0 +1,120 @@
+"""
+Short-time FFT of rotation channels
+
+Author: RSX
+
+Each channel keeps its last `nfft` samples in a ring buffer and computes one
+Hann-windowed rfft every `hop` packets, so a frame only ever costs the
+newest column of the spectrogram. Telemetry isn't sampled on a fixed clock,
+the sample rate of each frame comes from the median spacing of its packet
+times. stft_batch() gives the same columns for a whole recorded flight.
+"""
+import math
+import numpy as np
+from buffers import RingBuffer
+
+SPECTRAL_CHANNELS = ("AUTO_GYRO_ROTATION_RATE", "GYRO_R", "GYRO_P", "GYRO_Y")
+
+# Amplitude spectrum of one frame, mean removed so the spin rate itself isn't the peak
+def frame_spectrum(frames, window):
+    frames = frames - frames.mean(axis=-1, keepdims=True)
+    return np.abs(np.fft.rfft(frames * window, axis=-1)) * (2.0 / window.sum())
+
+def frame_sample_rate(times):
+    dt = np.median(np.diff(times, axis=-1), axis=-1)
+    with np.errstate(divide='ignore'):
+        return np.where(dt > 0, 1.0 / dt, np.nan)
+
+class SlidingSTFT:
+
+    def __init__(self, nfft=64, hop=4, columns=150):
+        self.nfft = nfft
+        self.hop = hop
+        self.window = np.hanning(nfft)
+        self.samples = RingBuffer(nfft)
+        self.times = RingBuffer(nfft)
+        self.spectrogram = RingBuffer(columns, width=nfft // 2 + 1)
+        self.column_times = RingBuffer(columns)
+        self.sample_rate = math.nan
+        self.__since_frame = 0
+
+    def reset(self):
+        self.samples.reset()
+        self.times.reset()
+        self.spectrogram.reset()
+        self.column_times.reset()
+        self.sample_rate = math.nan
+        self.__since_frame = 0
+
+    # Returns True when a new spectrogram column was computed
+    def push(self, t, value):
+        if value is None or math.isnan(value):
+            # Hold the last sample so gaps don't break the frame
+            if self.samples.count == 0:
+                return False
+            value = self.samples.last()
+        self.samples.append(value)
+        self.times.append(t)
+        self.__since_frame += 1
+        if self.samples.count < self.nfft or self.__since_frame < self.hop:
+            return False
+        self.__since_frame = 0
+        self.spectrogram.append(frame_spectrum(self.samples.view(), self.window))
+        self.column_times.append(t)
+        self.sample_rate = float(frame_sample_rate(self.times.view()))
+        return True
+
+    @property
+    def frequencies(self):
+        return np.fft.rfftfreq(self.nfft, 1.0 / self.sample_rate)
+
+    # Strongest non-DC frequency of the newest column
+    def peak_frequency(self):
+        if self.spectrogram.count == 0 or math.isnan(self.sample_rate):
+            return math.nan
+        column = self.spectrogram.last()
+        return float(self.frequencies[1 + np.argmax(column[1:])])
+
+class SpectralEngine:
+
+    def __init__(self, channels=SPECTRAL_CHANNELS, nfft=64, hop=4, columns=150):
+        self.nfft, self.hop = nfft, hop
+        self.channels = {name: SlidingSTFT(nfft, hop, columns) for name in channels}
+
+    def reset(self):
+        for stft in self.channels.values():
+            stft.reset()
+
+    # One packet, returns the channels that got a new column
+    def push(self, t, data):
+        updated = []
+        for name, stft in self.channels.items():
+            value = getattr(data, name, None)
+            if stft.push(t, math.nan if value is None else float(value)):
+                updated.append(name)
+        return updated
+
+    # Whole log, columns is {field name: array}
+    def compute(self, t, columns):
+        return {name: stft_batch(t, columns[name], self.nfft, self.hop) for name in self.channels}
+
+# Same frames as SlidingSTFT over a whole column,
+# returns (column times, sample rate per column, amplitudes [columns, nfft // 2 + 1])
+def stft_batch(t, values, nfft=64, hop=4):
+    t = np.asarray(t, dtype=float)
+    values = np.asarray(values, dtype=float)
+    empty = (np.empty(0), np.empty(0), np.empty((0, nfft // 2 + 1)))
+
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return empty
+    # Leading gaps are skipped, later ones hold the last sample
+    t, values = t[valid[0]:], values[valid[0]:]
+    held = np.where(np.isnan(values), 0, np.arange(len(values)))
+    values = values[np.maximum.accumulate(held)]
+    if len(values) < nfft:
+        return empty
+
+    frames = np.lib.stride_tricks.sliding_window_view(values, nfft)[::hop]
+    times = np.lib.stride_tricks.sliding_window_view(t, nfft)[::hop]
+    return times[:, -1], frame_sample_rate(times), frame_spectrum(frames, np.hanning(nfft))
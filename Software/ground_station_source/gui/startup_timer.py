@@ -0,0 +1,34 @@
+"""
+Startup timing
+
+Author: RSX
+
+Time from launch to a usable window, phase by phase. After a crash at the
+launch site the ground station has to be back well under a second, the
+report in the GUI log shows which phase to look at when it isn't:
+
+    Started in 620 ms: imports 310, window 90, plots 70, sidebar 30, session 40, shown 80
+"""
+import time
+
+class StartupTimer:
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.phases = []        # (name, seconds), in order
+        self.__last = self.start
+
+    # Ends the phase running since the last mark
+    def mark(self, name):
+        now = self.clock()
+        self.phases.append((name, now - self.__last))
+        self.__last = now
+
+    @property
+    def total_s(self):
+        return self.__last - self.start
+
+    def report(self):
+        phases = ", ".join(f"{name} {1000 * seconds:.0f}" for name, seconds in self.phases)
+        return f"Started in {1000 * self.total_s:.0f} ms: {phases}"
@@ -0,0 +1,324 @@
+"""
+Vectorized session loader
+
+Author: RSX
+
+Loads a logged session (every rotated part of it) into NumPy columns in one
+pass: rows are read with the csv module, transposed, and each numeric field
+is converted by one NumPy call instead of value by value. Logged '$' lines
+come back separately. Ground channels missing from older files are
+computed with the vectorized derived-channel functions, and packet times
+come from timebase_batch(), so a loaded session matches what the GUI
+plotted.
+
+Files of hundreds of MB (onboard logs downloaded with GTLOGS, long ground
+tests) go through ChunkedLoader instead: the file is split into byte ranges
+that end on a newline, a process pool parses the ranges into columns and
+packet times, and a thread joins the columns in file order and builds the
+session. It is polled, like the other background work of the GUI, so it
+reports progress and can be cancelled. Joining the chunks, the timebase and
+the derived channels stay serial, they are a small part of a load.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+import csv
+import io
+import multiprocessing
+import os
+import threading
+import numpy as np
+from mission_db import column_affinity
+from session import parse_session_name, session_path
+from timebase import parse_times, timebase_from_seconds
+from derived_channels import DerivedChannelEngine
+
+# Field order of a raw packet line, as the payload sends it and logs it onboard
+PACKET_FIELDS = ["TEAM_ID", "MISSION_TIME", "PACKET_COUNT", "MODE", "STATE", "ALTITUDE", "TEMPERATURE",
+                 "PRESSURE", "VOLTAGE", "GYRO_R", "GYRO_P", "GYRO_Y", "ACCEL_R", "ACCEL_P", "ACCEL_Y",
+                 "MAG_R", "MAG_P", "MAG_Y", "AUTO_GYRO_ROTATION_RATE", "GPS_TIME", "GPS_ALTITUDE",
+                 "GPS_LATITUDE", "GPS_LONGITUDE", "GPS_SATS", "CMD_ECHO", "CAM_STATUS"]
+
+CHUNK_BYTES = 8 * 1024 * 1024
+MIN_CHUNK_BYTES = 256 * 1024
+
+class LoadCancelled(Exception):
+    pass
+
+@dataclass
+class SessionData:
+    name: str
+    paths: list
+    columns: dict                   # field -> float array, or str array for text fields
+    t: np.ndarray                   # seconds since the first packet
+    messages: list = field(default_factory=list)    # logged '$' lines
+    text: dict = field(default_factory=dict)        # field -> values as logged, when loaded with keep_text
+
+    def __len__(self):
+        return len(self.t)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+# Every part of the session `path` belongs to, in order
+def session_parts(path):
+    try:
+        stamp, _ = parse_session_name(path)
+    except (IndexError, ValueError):
+        return [path]
+    parts = []
+    part = 1
+    while os.path.exists(session_path(os.path.dirname(path), stamp, part)):
+        parts.append(session_path(os.path.dirname(path), stamp, part))
+        part += 1
+    return parts or [path]
+
+def session_name(path):
+    try:
+        return f"session_{parse_session_name(path)[0]}"
+    except (IndexError, ValueError):
+        return os.path.splitext(os.path.basename(path))[0]
+
+# Strings to floats, NumPy converts a column in one call when nothing is empty,
+# empty or malformed values become NaN
+def to_float(values):
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        pass
+    try:
+        return np.array([float(value) if value else np.nan for value in values])
+    except ValueError:
+        out = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                pass
+        return out
+
+# Header and rows of a CSV to columns, rows without a TEAM_ID are logged '$' lines.
+# Raw packet lines (no header) may leave out trailing fields, they are padded.
+# keep_text also returns every field as the logged strings.
+def parse_columns(header, rows, pad=False, keep_text=False):
+    if pad:
+        rows = [row + [""] * (len(header) - len(row)) if len(row) < len(header) else row[:len(header)]
+                for row in rows if row]
+    else:
+        rows = [row for row in rows if len(row) == len(header)]
+    team = header.index("TEAM_ID") if "TEAM_ID" in header else None
+    echo = header.index("CMD_ECHO") if "CMD_ECHO" in header else None
+    messages = []
+    if team is not None:
+        if echo is not None:
+            messages = [row[echo] for row in rows if not row[team] and row[echo]]
+        rows = [row for row in rows if row[team]]
+    if not rows:
+        return {name: np.empty(0) for name in header}, messages, \
+               {name: np.empty(0, dtype=str) for name in header} if keep_text else {}
+    columns = {}
+    text = {}
+    for name, values in zip(header, zip(*rows)):
+        if keep_text:
+            text[name] = np.asarray(values, dtype=str)
+        columns[name] = np.asarray(values, dtype=str) if column_affinity(name) == "TEXT" else to_float(values)
+    return columns, messages, text
+
+def read_csv(path):
+    with open(path, "r", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        return header, list(reader)
+
+def load_session(path, keep_text=False):
+    paths = session_parts(path)
+    header, _, raw = read_header(paths[0])
+    if raw:
+        columns, seconds, messages, text = parse_chunk(path, 0, os.path.getsize(path), header, raw, keep_text)
+        return build_session(session_name(path), paths, columns, messages, seconds, text)
+    header, rows = read_csv(paths[0])
+    for part in paths[1:]:
+        rows.extend(read_csv(part)[1])
+    columns, messages, text = parse_columns(header, rows, keep_text=keep_text)
+    return build_session(session_name(path), paths, columns, messages, text=text)
+
+# Seconds of day of the rows of columns, see parse_times
+def column_times(columns):
+    count = len(next(iter(columns.values()), []))
+    return parse_times(columns.get("MISSION_TIME", np.full(count, "")), columns.get("GPS_TIME"))
+
+# Times and any ground channels the file doesn't have. seconds are the
+# parsed packet times when they are already known.
+def build_session(name, paths, columns, messages, seconds=None, text=None):
+    t = timebase_from_seconds(column_times(columns) if seconds is None else seconds)
+    engine = DerivedChannelEngine()
+    missing = [channel for channel in engine.channels if channel.name not in columns
+               and all(name in columns for name in channel.inputs)]
+    for channel in missing:
+        columns[channel.name] = channel.batch(t, *[columns[name] for name in channel.inputs])
+    return SessionData(name, paths, columns, t, messages, text or {})
+
+# ------ LARGE FILES ------ #
+# Header of a log and the offset of its first data line. Session CSVs start with
+# their header, an onboard log starts with packets or '$LOGFILE:BEGIN'.
+def read_header(path):
+    with open(path, "rb") as file:
+        first = file.readline()
+    if first.startswith(b"TEAM_ID,"):
+        return next(csv.reader([first.decode(errors="replace")])), len(first), False
+    return list(PACKET_FIELDS), 0, True
+
+# [start, end) byte ranges of about chunk_bytes, each ending just after a newline
+def chunk_ranges(path, start, chunk_bytes):
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as file:
+        while start < size:
+            file.seek(min(size, start + chunk_bytes))
+            file.readline()
+            end = min(size, file.tell())
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+# Runs in the pool: one byte range to columns and packet times. '$' lines of an
+# onboard log are messages. The fields never contain newlines, so a range is whole rows.
+def parse_chunk(path, start, end, header, raw, keep_text=False):
+    with open(path, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode(errors="replace")
+    lines = text.splitlines()
+    messages = [line.strip() for line in lines if line.startswith("$")] if raw else []
+    rows = csv.reader(line for line in lines if not line.startswith("$")) if raw else csv.reader(io.StringIO(text))
+    columns, logged, text = parse_columns(header, list(rows), pad=raw, keep_text=keep_text)
+    return columns, column_times(columns), messages + logged, text
+
+# Chunk columns to session columns, in chunk order
+def merge_columns(header, chunks):
+    columns = {}
+    for name in header:
+        parts = [chunk[name] for chunk in chunks if len(chunk[name])]
+        columns[name] = np.concatenate(parts) if parts else np.empty(0)
+    return columns
+
+class ChunkedLoader:
+
+    def __init__(self, path, jobs=None, chunk_bytes=None, keep_text=False):
+        self.path = path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.keep_text = keep_text
+        self.after = None           # called with the session on the builder thread, see after_result
+        self.after_result = None
+        self.paths = session_parts(path)
+        self.header, _, self.raw = read_header(self.paths[0])
+        self.tasks = []
+        for part in self.paths:
+            _, start, raw = read_header(part)
+            size = os.path.getsize(part)
+            # Several chunks per process so the slowest one doesn't hold up the end
+            step = chunk_bytes or max(MIN_CHUNK_BYTES, min(CHUNK_BYTES, size // (4 * self.jobs) + 1))
+            self.tasks.extend((part, begin, end, raw) for begin, end in chunk_ranges(part, start, step))
+        self.total_bytes = sum(end - begin for _, begin, end, _ in self.tasks)
+        self.done_bytes = 0
+        self.cancelled = False
+        self.__pool = None
+        self.__futures = {}     # future -> bytes, in file order
+        self.__pending = set()
+        self.__builder = None   # thread joining the chunks once they are parsed
+        self.__session = None
+        self.__error = None
+
+    def start(self):
+        # Spawned, not forked: the GUI process has Qt and the database writer running
+        self.__pool = ProcessPoolExecutor(max_workers=min(self.jobs, max(1, len(self.tasks))),
+                                          mp_context=multiprocessing.get_context("spawn"))
+        self.__futures = {self.__pool.submit(parse_chunk, part, begin, end, self.header, raw,
+                                              self.keep_text): end - begin
+                          for part, begin, end, raw in self.tasks}
+        self.__pending = set(self.__futures)
+        return self
+
+    # Parsing is counted as the first 90 %, building the session as the rest
+    @property
+    def progress(self):
+        parsed = self.done_bytes / self.total_bytes if self.total_bytes else 1.0
+        return 0.9 * parsed + (0.1 if self.__session is not None else 0.0)
+
+    def __collect(self, finished):
+        for future in finished:
+            self.__pending.discard(future)
+            self.done_bytes += self.__futures[future]
+            # A failed chunk fails the load, the rest is no use without it
+            if future.exception() is not None:
+                self.cancel()
+                raise future.exception()
+
+    # Collects finished chunks without blocking, True once the session is built
+    def poll(self):
+        if self.cancelled:
+            raise LoadCancelled(self.path)
+        self.__collect([future for future in self.__pending if future.done()])
+        if self.__pending:
+            return False
+        if self.__builder is None:
+            self.__builder = threading.Thread(target=self.__build, name="log-loader", daemon=True)
+            self.__builder.start()
+        return not self.__builder.is_alive()
+
+    # Blocks until done, progress(done_bytes, total_bytes) is called as chunks finish
+    # and the load stops with LoadCancelled once cancelled() returns True
+    def wait(self, progress=None, cancelled=None, interval=0.1):
+        while not self.poll():
+            if self.__pending:
+                finished, _ = wait(self.__pending, timeout=interval, return_when=FIRST_COMPLETED)
+            else:
+                finished = []
+                self.__builder.join(interval)
+            if cancelled is not None and cancelled():
+                self.cancel()
+                raise LoadCancelled(self.path)
+            self.__collect(finished)
+            if progress is not None:
+                progress(self.done_bytes, self.total_bytes)
+        return self.result()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.__pool is not None:
+            # Chunks already being parsed finish in the background and are thrown away
+            self.__pool.shutdown(wait=False, cancel_futures=True)
+            self.__pool = None
+
+    # Runs on the builder thread, the GUI thread only polls it
+    def __build(self):
+        try:
+            chunks = [future.result() for future in self.__futures]
+            columns = merge_columns(self.header, [columns for columns, _, _, _ in chunks])
+            seconds = np.concatenate([seconds for _, seconds, _, _ in chunks]) if chunks else np.empty(0)
+            messages = [message for _, _, chunk_messages, _ in chunks for message in chunk_messages]
+            text = merge_columns(self.header, [text for _, _, _, text in chunks]) if self.keep_text else None
+            session = build_session(session_name(self.path), self.paths, columns, messages, seconds, text)
+            if self.after is not None:
+                self.after_result = self.after(session)
+            self.__session = session
+        except Exception as e:
+            self.__error = e
+
+    # The built session, blocks until it is
+    def result(self):
+        while not self.poll():
+            if self.__builder is None:
+                wait(self.__pending)
+            else:
+                self.__builder.join()
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+        if self.__error is not None:
+            raise self.__error
+        return self.__session
+
+def load_large(path, jobs=None, progress=None, cancelled=None):
+    return ChunkedLoader(path, jobs).start().wait(progress, cancelled)
@@ -0,0 +1,347 @@
+"""
+Telemetry fan-out server
+
+Author: RSX
+
+Streams parsed packets and '$' messages from the ground station to any
+number of viewers over TCP, on localhost or the LAN. Every frame is a 4 byte
+length, a 1 byte kind and a payload. A new subscriber first gets a SCHEMA
+frame with the record dtype (the same one as shared_ring.py), after that
+each TELEMETRY frame is one packed record, so a viewer decodes it with
+np.frombuffer. A subscriber can send a HISTORY_REQUEST for a PACKET_COUNT
+range and gets the rows from the mission database back as one HISTORY frame,
+on the same connection, between the live frames.
+
+A packet is encoded once and the same bytes are queued for every
+subscriber. The sockets are served by one background thread; history
+queries run on a worker thread so a slow query doesn't hold up the live
+stream of the other subscribers. A subscriber
+that can't keep up stops getting every packet once its backlog is full:
+only the newest one is kept for it, so it catches up on the latest state
+instead of falling further behind.
+
+    python telemetry_server.py 192.168.1.20:7310 ALTITUDE STATE
+    python telemetry_server.py localhost:7310 --history 800 900
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import selectors
+import socket
+import struct
+import threading
+import numpy as np
+from shared_ring import RecordPacker
+
+DEFAULT_PORT = 7310
+LOCAL_HOST = "127.0.0.1"
+LAN_HOST = "0.0.0.0"
+
+SCHEMA, TELEMETRY, MESSAGE, HISTORY_REQUEST, HISTORY = range(1, 6)
+FRAME_HEADER = struct.Struct(">IB")
+MAX_REQUEST_BYTES = 64 * 1024
+
+def frame(kind, payload):
+    return FRAME_HEADER.pack(len(payload), kind) + payload
+
+# Complete frames at the start of buf as (kind, payload), consumed bytes are removed
+def split_frames(buf):
+    frames = []
+    while len(buf) >= FRAME_HEADER.size:
+        length, kind = FRAME_HEADER.unpack_from(buf)
+        end = FRAME_HEADER.size + length
+        if len(buf) < end:
+            break
+        frames.append((kind, bytes(buf[FRAME_HEADER.size:end])))
+        del buf[:end]
+    return frames
+
+def dtype_from_schema(payload):
+    return np.dtype([tuple(field) for field in json.loads(payload)["descr"]])
+
+class Subscriber:
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.frames = deque()
+        self.backlog = 0        # queued bytes
+        self.latest = None      # newest telemetry frame while over the backlog limit
+        self.out = None         # frame being sent
+        self.inbuf = bytearray()
+        self.dropped = 0
+        self.closed = False
+
+class TelemetryServer:
+
+    def __init__(self, dtype, host=LOCAL_HOST, port=DEFAULT_PORT, history=None,
+                 max_backlog=64 * 1024, max_queued=4 * 1024 * 1024):
+        self.dtype = np.dtype(dtype)
+        self.host = host
+        self.port = port
+        self.history = history          # (packet_from, packet_to) -> list of row dicts, runs on a worker thread
+        self.max_backlog = max_backlog
+        self.max_queued = max_queued
+        self.count = 0
+        self.error = None
+        self.__packer = RecordPacker(self.dtype)
+        self.__schema = frame(SCHEMA, json.dumps({"descr": self.dtype.descr}).encode())
+        self.__lock = threading.RLock()
+        self.__subscribers = {}
+        self.__thread = None
+        self.__history_pool = None
+
+    def start(self):
+        self.__listener = socket.create_server((self.host, self.port))
+        self.__listener.setblocking(False)
+        self.port = self.__listener.getsockname()[1]
+        self.__wake_r, self.__wake_w = socket.socketpair()
+        self.__wake_r.setblocking(False)
+        self.__wake_w.setblocking(False)
+        self.__selector = selectors.DefaultSelector()
+        self.__selector.register(self.__listener, selectors.EVENT_READ)
+        self.__selector.register(self.__wake_r, selectors.EVENT_READ)
+        self.__running = True
+        # One query at a time, requests are answered in the order they came in
+        self.__history_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry-history")
+        self.__thread = threading.Thread(target=self.__run, name="telemetry-server", daemon=True)
+        self.__thread.start()
+
+    @property
+    def subscribers(self):
+        return len(self.__subscribers)
+
+    # Packets skipped for slow subscribers so far
+    @property
+    def dropped(self):
+        with self.__lock:
+            return sum(sub.dropped for sub in self.__subscribers.values())
+
+    def publish(self, t, values):
+        record = self.__packer.pack(self.count, t, values)
+        self.count += 1
+        if self.__subscribers:
+            self.__broadcast(frame(TELEMETRY, np.array([record], dtype=self.dtype).tobytes()), droppable=True)
+
+    def publish_message(self, raw):
+        if self.__subscribers:
+            self.__broadcast(frame(MESSAGE, raw.encode("utf-8", "replace")), droppable=False)
+
+    def __broadcast(self, data, droppable):
+        with self.__lock:
+            for sub in self.__subscribers.values():
+                self.__queue(sub, data, droppable)
+        self.__wake()
+
+    # One pending byte is enough to wake the server thread
+    def __wake(self):
+        try:
+            self.__wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def __queue(self, sub, data, droppable):
+        if droppable and sub.backlog >= self.max_backlog:
+            sub.latest = data
+            sub.dropped += 1
+            return
+        sub.frames.append(data)
+        sub.backlog += len(data)
+        # Messages and history are never dropped, a subscriber this far behind is cut off
+        if sub.backlog > self.max_queued:
+            sub.closed = True
+
+    def __run(self):
+        while self.__running:
+            for key, mask in self.__selector.select(timeout=1.0):
+                if key.fileobj is self.__listener:
+                    self.__accept()
+                elif key.fileobj is self.__wake_r:
+                    try:
+                        while self.__wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif mask & selectors.EVENT_READ:
+                    self.__read(key.data)
+            with self.__lock:
+                for sub in list(self.__subscribers.values()):
+                    self.__send(sub)
+
+    def __accept(self):
+        try:
+            sock, address = self.__listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sub = Subscriber(sock, address)
+        sub.frames.append(self.__schema)
+        with self.__lock:
+            self.__subscribers[sock] = sub
+        self.__selector.register(sock, selectors.EVENT_READ, sub)
+
+    def __read(self, sub):
+        try:
+            data = sub.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data or len(sub.inbuf) + len(data) > MAX_REQUEST_BYTES:
+            with self.__lock:
+                self.__drop(sub)
+            return
+        sub.inbuf += data
+        for kind, payload in split_frames(sub.inbuf):
+            if kind == HISTORY_REQUEST:
+                self.__history_pool.submit(self.__answer_history, sub, payload)
+
+    # Runs on the history worker, the answer is queued like any other frame
+    def __answer_history(self, sub, payload):
+        records = np.empty(0, dtype=self.dtype)
+        try:
+            request = json.loads(payload)
+            rows = self.history(int(request["from"]), int(request["to"])) if self.history else []
+            if rows:
+                records = np.array([self.__packer.pack(i, row.get("t"), row) for i, row in enumerate(rows)],
+                                   dtype=self.dtype)
+        except Exception as e:
+            self.error = e
+        with self.__lock:
+            if self.__subscribers.get(sub.sock) is not sub:
+                return
+            self.__queue(sub, frame(HISTORY, records.tobytes()), droppable=False)
+        self.__wake()
+
+    # Writes as much as the socket takes and waits for EVENT_WRITE if anything is left
+    def __send(self, sub):
+        while not sub.closed:
+            if sub.out is None:
+                if sub.frames:
+                    data = sub.frames.popleft()
+                    sub.backlog -= len(data)
+                elif sub.latest is not None:
+                    data, sub.latest = sub.latest, None
+                else:
+                    break
+                sub.out = memoryview(data)
+            try:
+                sent = sub.sock.send(sub.out)
+            except BlockingIOError:
+                break
+            except OSError:
+                sub.closed = True
+                break
+            sub.out = sub.out[sent:] if sent < len(sub.out) else None
+        if sub.closed:
+            self.__drop(sub)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if sub.out is not None else 0)
+        if self.__selector.get_key(sub.sock).events != events:
+            self.__selector.modify(sub.sock, events, sub)
+
+    def __drop(self, sub):
+        if self.__subscribers.pop(sub.sock, None) is None:
+            return
+        self.__selector.unregister(sub.sock)
+        sub.sock.close()
+
+    def close(self):
+        if self.__thread is None:
+            return
+        self.__running = False
+        self.__wake()
+        self.__thread.join(timeout=2.0)
+        self.__thread = None
+        self.__history_pool.shutdown(wait=False, cancel_futures=True)
+        with self.__lock:
+            for sub in list(self.__subscribers.values()):
+                self.__drop(sub)
+        self.__selector.close()
+        for sock in (self.__listener, self.__wake_r, self.__wake_w):
+            sock.close()
+
+class TelemetryClient:
+
+    def __init__(self, host=LOCAL_HOST, port=DEFAULT_PORT, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.__buffer = bytearray()
+        self.__frames = deque()
+        kind, payload = self.__next_frame()
+        if kind != SCHEMA:
+            raise ValueError("server did not send a schema")
+        self.dtype = dtype_from_schema(payload)
+
+    def __next_frame(self):
+        while not self.__frames:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("server closed the connection")
+            self.__buffer += data
+            self.__frames.extend(split_frames(self.__buffer))
+        return self.__frames.popleft()
+
+    def __decode(self, kind, payload):
+        if kind == TELEMETRY:
+            return np.frombuffer(payload, dtype=self.dtype)[0]
+        if kind == HISTORY:
+            return np.frombuffer(payload, dtype=self.dtype)
+        return payload.decode("utf-8", "replace")
+
+    # Next frame as (kind, value): a record, an array of records or a message string
+    def receive(self):
+        kind, payload = self.__next_frame()
+        return kind, self.__decode(kind, payload)
+
+    def request_history(self, packet_from, packet_to):
+        self.sock.sendall(frame(HISTORY_REQUEST, json.dumps({"from": packet_from, "to": packet_to}).encode()))
+
+    # Blocks for the answer, live frames that arrive meanwhile stay queued for receive()
+    def history(self, packet_from, packet_to):
+        self.request_history(packet_from, packet_to)
+        live = []
+        try:
+            while True:
+                kind, payload = self.__next_frame()
+                if kind == HISTORY:
+                    return self.__decode(kind, payload)
+                live.append((kind, payload))
+        finally:
+            self.__frames.extendleft(reversed(live))
+
+    def close(self):
+        self.sock.close()
+
+def field_text(record, name):
+    value = record[name]
+    return value.decode() if isinstance(value, bytes) else f"{value:g}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch the ground station telemetry server")
+    parser.add_argument("address", nargs="?", default=f"{LOCAL_HOST}:{DEFAULT_PORT}", help="HOST:PORT")
+    parser.add_argument("fields", nargs="*", default=["PACKET_COUNT", "STATE", "ALTITUDE"])
+    parser.add_argument("--history", nargs=2, type=int, metavar=("FROM", "TO"),
+                        help="print a PACKET_COUNT range from the mission database first")
+    args = parser.parse_args()
+
+    host, _, port = args.address.rpartition(":")
+    client = TelemetryClient(host or LOCAL_HOST, int(port or DEFAULT_PORT), timeout=None)
+    try:
+        if args.history:
+            for record in client.history(*args.history):
+                print("history", " ".join(f"{name}={field_text(record, name)}" for name in args.fields))
+        while True:
+            kind, value = client.receive()
+            if kind == TELEMETRY:
+                print(" ".join(f"{name}={field_text(value, name)}" for name in args.fields))
+            elif kind == MESSAGE:
+                print(value)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Disk cache for map tiles
+
+Author: RSX
+
+Tiles are stored as tile_cache/{z}/{x}/{y}.png and evicted least recently
+used first once the cache grows past its size limit. Access order is kept
+in the file modification times, so it survives restarts. Missing tiles are
+downloaded on background threads; poll() hands back the ones that arrived.
+
+Tiles come from tile.openstreetmap.org unless RSX_TILE_URL names another
+server. Its usage policy allows the GUI's browsing but not bulk downloads
+for offline use, so seeding the cache before going to the launch site
+(where there's no network) needs a provider that allows it:
+
+    python tile_cache.py --seed 37.2 -80.4 --radius-km 5 --zooms 12-17 \
+        --url "https://tiles.example.com/{z}/{x}/{y}.png?key=..."
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import math
+import os
+import time
+
+DEFAULT_TILE_DIR = "tile_cache"
+DEFAULT_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_URL_ENV = "RSX_TILE_URL"
+# Servers whose usage policy forbids bulk downloading tiles for offline use
+NO_PREFETCH_HOSTS = ("tile.openstreetmap.org",)
+USER_AGENT = "RSX-CansatGUI/1 (ground station)"
+TILE_SIZE_PX = 256
+
+# Tile (x, y) containing lat, lon at zoom z
+def tile_of(lat, lon, z):
+    n = 2 ** z
+    lat_rad = math.radians(max(-85.05112878, min(85.05112878, lat)))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+# URL template of the tile server, {z}/{x}/{y} are filled in
+def tile_url():
+    return os.environ.get(TILE_URL_ENV) or DEFAULT_TILE_URL
+
+def allows_prefetch(url):
+    from urllib.parse import urlsplit
+    host = (urlsplit(url).hostname or "").lower()
+    return not any(host == name or host.endswith("." + name) for name in NO_PREFETCH_HOSTS)
+
+def fetch_tile(z, x, y, url=None, timeout=10):
+    # Imported on the first download, the GUI doesn't need it to start
+    import urllib.request
+    url = url or tile_url()
+    request = urllib.request.Request(url.format(z=z, x=x, y=y), headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+class TileCache:
+
+    def __init__(self, directory=DEFAULT_TILE_DIR, max_bytes=200 * 1024 * 1024, fetch=fetch_tile,
+                 workers=2, retry_s=60.0, clock=time.monotonic):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fetch = fetch
+        self.retry_s = retry_s
+        self.clock = clock
+        self.online = fetch is not None
+        self.__index = None             # (z, x, y) -> size, least recently used first
+        self.__bytes = 0
+        self.__pending = {}             # (z, x, y) -> future
+        self.__failed = {}              # (z, x, y) -> time of failure
+        self.__executor = ThreadPoolExecutor(max_workers=workers) if self.online else None
+
+    def path(self, key):
+        z, x, y = key
+        return os.path.join(self.directory, str(z), str(x), f"{y}.png")
+
+    # The index is built on first use, the GUI starts without walking a seeded cache
+    def __entries(self):
+        if self.__index is None:
+            self.__index = OrderedDict()
+            self.__scan()
+        return self.__index
+
+    # Rebuild the LRU order from file modification times
+    def __scan(self):
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".png"):
+                        continue
+                    try:
+                        z, x = (int(part) for part in os.path.relpath(root, self.directory).split(os.sep))
+                        key = (z, x, int(name[:-4]))
+                        stat = os.stat(os.path.join(root, name))
+                    except (ValueError, OSError):
+                        continue
+                    entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self.__index[key] = size
+            self.__bytes += size
+
+    def __len__(self):
+        return len(self.__entries())
+
+    @property
+    def size_bytes(self):
+        self.__entries()
+        return self.__bytes
+
+    def __contains__(self, key):
+        return key in self.__entries()
+
+    # Tile bytes from disk, or None (and a download is queued) when not cached
+    def get(self, key):
+        if key in self.__entries():
+            try:
+                with open(self.path(key), "rb") as file:
+                    data = file.read()
+            except OSError:
+                self.__forget(key)
+            else:
+                self.__index.move_to_end(key)
+                try:
+                    os.utime(self.path(key))
+                except OSError:
+                    pass
+                return data
+        self.request(key)
+        return None
+
+    def request(self, key):
+        if not self.online or key in self.__pending:
+            return
+        failed_at = self.__failed.get(key)
+        if failed_at is not None and self.clock() - failed_at < self.retry_s:
+            return
+        self.__pending[key] = self.__executor.submit(self.fetch, *key)
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a crash never leaves half a tile
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+        self.__forget(key)
+        self.__entries()[key] = len(data)
+        self.__bytes += len(data)
+        self.__evict()
+
+    def __forget(self, key):
+        size = self.__entries().pop(key, None)
+        if size is not None:
+            self.__bytes -= size
+
+    def __evict(self):
+        while self.__bytes > self.max_bytes and len(self.__index) > 1:
+            key, size = self.__index.popitem(last=False)
+            self.__bytes -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    # Finished downloads, returns {key: bytes} of the tiles that arrived
+    def poll(self):
+        arrived = {}
+        for key, future in list(self.__pending.items()):
+            if not future.done():
+                continue
+            del self.__pending[key]
+            try:
+                data = future.result()
+            except Exception:
+                self.__failed[key] = self.clock()
+                continue
+            self.__failed.pop(key, None)
+            self.put(key, data)
+            arrived[key] = data
+        return arrived
+
+    @property
+    def pending(self):
+        return len(self.__pending)
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+
+# Every tile within radius_km of a point for the given zooms
+def tiles_around(lat, lon, radius_km, zooms):
+    dlat = radius_km / 111.32
+    dlon = radius_km / (111.32 * max(0.01, math.cos(math.radians(lat))))
+    for z in zooms:
+        x0, y0 = tile_of(lat + dlat, lon - dlon, z)
+        x1, y1 = tile_of(lat - dlat, lon + dlon, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield (z, x, y)
+
+def seed(cache, lat, lon, radius_km, zooms, url, delay_s=0.1):
+    if not allows_prefetch(url):
+        raise ValueError(f"{url} doesn't allow downloading tiles for offline use")
+    fetched = 0
+    for key in tiles_around(lat, lon, radius_km, zooms):
+        if key in cache:
+            continue
+        try:
+            cache.put(key, fetch_tile(*key, url=url))
+            fetched += 1
+        except Exception as e:
+            print(f"{key}: {e}")
+        # Be polite to the tile server
+        time.sleep(delay_s)
+    return fetched
+
+def parse_zooms(text):
+    first, _, last = text.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Map tile cache")
+    parser.add_argument("--seed", nargs=2, type=float, metavar=("LAT", "LON"), help="download tiles around a point")
+    parser.add_argument("--radius-km", type=float, default=3.0)
+    parser.add_argument("--zooms", default="12-17", help="zoom range, e.g. 12-17")
+    parser.add_argument("--dir", default=DEFAULT_TILE_DIR)
+    parser.add_argument("--url", default=os.environ.get(TILE_URL_ENV),
+                        help=f"tile server for --seed, {{z}}/{{x}}/{{y}} are filled in (default ${TILE_URL_ENV})")
+    args = parser.parse_args()
+
+    if args.seed and not args.url:
+        parser.error(f"--seed needs --url or {TILE_URL_ENV}: a tile server that allows offline prefetching "
+                     f"({DEFAULT_TILE_URL.split('/')[2]} doesn't)")
+    if args.seed and not allows_prefetch(args.url):
+        parser.error(f"{args.url} doesn't allow downloading tiles for offline use, pick another provider")
+    cache = TileCache(args.dir, fetch=None)
+    if args.seed:
+        fetched = seed(cache, *args.seed, args.radius_km, parse_zooms(args.zooms), args.url)
+        print(f"fetched {fetched} tiles")
+    print(f"{len(cache)} tiles, {cache.size_bytes / 1e6:.1f} MB in {args.dir}")
+
+if __name__ == "__main__":
+    main()
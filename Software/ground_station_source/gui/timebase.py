@@ -0,0 +1,149 @@
+"""
+Shared mission timebase for all time plots
+
+Author: RSX
+
+Packet times come from MISSION_TIME (hh:mm:ss[.ss]), or GPS_TIME when the
+mission time can't be parsed and the GPS has a fix. When neither is usable,
+the arrival time of the packet is used instead. Whole-second times are
+spread over the second using arrival time so points at >1 Hz don't stack.
+When MISSION_TIME jumps back (the payload's clock was reset or set), the
+times after the jump are shifted to carry on from the last packet, so
+plots never run backwards. All plotters read the same column, so there is
+one time array for all of them.
+"""
+from functools import lru_cache
+import time
+import numpy as np
+from buffers import RingBuffer
+
+SECONDS_PER_DAY = 86400.0
+# MISSION_TIME going back further than this is a clock reset, less is a late packet
+BACKWARD_JUMP_S = 2.0
+
+# "hh:mm:ss" or "hh:mm:ss.ss" -> seconds since midnight, None if invalid
+@lru_cache(maxsize=4096)
+def parse_hms(text):
+    if not text:
+        return None
+    parts = text.strip().split(':')
+    if len(parts) != 3:
+        return None
+    try:
+        hours, minutes = int(parts[0]), int(parts[1])
+        seconds = float(parts[2])
+    except ValueError:
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 61):
+        return None
+    return hours * 3600.0 + minutes * 60.0 + seconds
+
+class MissionTimebase:
+
+    def __init__(self, size, clock=time.monotonic):
+        self.clock = clock
+        self.column = RingBuffer(size)
+        self.source = None
+        self.reset()
+
+    def reset(self):
+        self.column.reset()
+        self.source = None
+        self.__origin = None
+        self.__day_offset = 0.0
+        self.__last_parsed = None
+        self.__second_arrival = None
+        self.__last_arrival = None
+        self.__last_t = None
+
+    def __packet_time(self, mission_time, gps_time):
+        parsed = parse_hms(mission_time)
+        if parsed is not None:
+            return parsed, "MISSION_TIME"
+        parsed = parse_hms(gps_time)
+        if parsed is not None and parsed != 0.0:
+            return parsed, "GPS_TIME"
+        return None, "ARRIVAL"
+
+    # Add the time of a new packet, returns it in seconds since the first packet
+    def append(self, mission_time=None, gps_time=None, arrival=None):
+        arrival = self.clock() if arrival is None else arrival
+        parsed, self.source = self.__packet_time(mission_time, gps_time)
+
+        if parsed is None:
+            step = arrival - self.__last_arrival if self.__last_arrival is not None else 0.0
+            t = (self.__last_t + step) if self.__last_t is not None else 0.0
+        else:
+            # Wrapped past midnight
+            if self.__last_parsed is not None and parsed < self.__last_parsed - SECONDS_PER_DAY / 2:
+                self.__day_offset += SECONDS_PER_DAY
+            if parsed != self.__last_parsed:
+                self.__second_arrival = arrival
+            fraction = 0.0
+            if float(parsed).is_integer():
+                fraction = min(arrival - self.__second_arrival, 0.999)
+            self.__last_parsed = parsed
+            absolute = parsed + self.__day_offset + fraction
+            if self.__origin is None:
+                self.__origin = absolute - (self.__last_t or 0.0)
+            elif absolute - self.__origin < self.__last_t - BACKWARD_JUMP_S:
+                # Clock reset: a new segment, continuing from the last packet by the arrival time
+                self.__origin = absolute - (self.__last_t + max(0.0, arrival - self.__last_arrival))
+            t = absolute - self.__origin
+
+        self.__last_arrival = arrival
+        self.__last_t = t
+        self.column.append(t)
+        return t
+
+    def view(self):
+        return self.column.view()
+
+    def last(self):
+        return self.column.last(default=0.0)
+
+# parse_hms over a column, each distinct time is parsed once
+def parse_hms_batch(texts):
+    unique, inverse = np.unique(np.asarray(texts, dtype=str), return_inverse=True)
+    return np.array([parse_hms(text) for text in unique.tolist()], dtype=float).reshape(-1)[inverse]
+
+# Seconds of day of each packet, GPS_TIME where MISSION_TIME is unusable and
+# NaN where neither is. Rows are independent, a session can be parsed in parts.
+def parse_times(mission_time, gps_time=None):
+    parsed = parse_hms_batch(mission_time)
+    if gps_time is not None:
+        gps = parse_hms_batch(gps_time)
+        gps[gps == 0.0] = np.nan
+        parsed = np.where(np.isnan(parsed), gps, parsed)
+    return parsed
+
+# Times of a whole logged session, like MissionTimebase but without arrival
+# times: packets sharing a whole second are spread evenly over it, packets
+# with no usable time are interpolated between their neighbours
+def timebase_batch(mission_time, gps_time=None):
+    return timebase_from_seconds(parse_times(mission_time, gps_time))
+
+# timebase_batch from times already parsed by parse_times
+def timebase_from_seconds(parsed):
+    n = len(parsed)
+    valid = np.flatnonzero(~np.isnan(parsed))
+    if len(valid) == 0:
+        return np.arange(n, dtype=float)
+
+    times = parsed[valid]
+    times += np.concatenate([[0.0], np.cumsum(np.diff(times) < -SECONDS_PER_DAY / 2)]) * SECONDS_PER_DAY
+    # After a clock reset the times carry on from the packet before it, one typical interval later
+    step = np.diff(times)
+    reset = step < -BACKWARD_JUMP_S
+    if reset.any():
+        forward = step[step > 0]
+        interval = float(np.median(forward)) if len(forward) else 0.0
+        times += np.concatenate([[0.0], np.cumsum(np.where(reset, interval - step, 0.0))])
+    start = np.concatenate([[True], times[1:] != times[:-1]])
+    group = np.cumsum(start) - 1
+    position = np.arange(len(times)) - np.flatnonzero(start)[group]
+    fraction = position / np.bincount(group)[group]
+    times = np.where(times == np.floor(times), times + fraction, times)
+
+    t = np.interp(np.arange(n), valid, times)
+    return t - t[0]